@@ -0,0 +1,48 @@
+"""Rows/sec of batch scoring versus one predict call per row.
+
+Run from the repository root::
+
+    python benchmarks/batch_scoring.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from climate_impact.scoring import feature_matrix, load_models, predict_indices, score_file
+
+DATA = "climate_change_data.csv"
+
+
+def main():
+    model1, model2 = load_models()
+    features = feature_matrix(pd.read_csv(DATA))
+
+    sample = features[:500]
+    start = time.perf_counter()
+    for row in sample:
+        model1.predict(row[None, :])[0]
+        model2.predict(row[None, :])[0]
+    per_row = len(sample) / (time.perf_counter() - start)
+    print(f"per-row predict:      {per_row:>12,.0f} rows/sec")
+
+    for engine in ("learned", "analytic"):
+        predict_indices(model1, model2, features, engine)
+        start = time.perf_counter()
+        for _ in range(10):
+            predict_indices(model1, model2, features, engine)
+        rate = 10 * len(features) / (time.perf_counter() - start)
+        print(f"in-memory {engine:<11} {rate:>12,.0f} rows/sec")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("scored.csv", "scored.parquet"):
+            stats = score_file(DATA, os.path.join(tmp, name), model1, model2)
+            print(f"batch -> {name:<14} {stats['rows_per_sec']:>12,.0f} rows/sec ({stats['rows']} rows)")
+
+
+if __name__ == "__main__":
+    main()
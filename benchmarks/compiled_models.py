@@ -0,0 +1,55 @@
+"""Compiled NumPy ensembles versus the pickled XGBoost models.
+
+Reports the maximum prediction difference, single-row latency and batch
+throughput for both models. Run from the repository root::
+
+    python benchmarks/compiled_models.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from climate_impact.forest import TreeEnsemble
+from climate_impact.scoring import feature_matrix
+
+
+def single_row_us(model, rows, repeat=2000):
+    row = rows[:1]
+    model.predict(row)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(row)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def batch_rows_per_sec(model, rows, repeat=5):
+    model.predict(rows)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(rows)
+    return len(rows) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    rows = feature_matrix(pd.read_csv("climate_change_data.csv"))
+    big = np.tile(rows, (10, 1))
+    print(f"{'model':<8}{'engine':<10}{'max |diff|':>12}{'1-row us':>12}{'rows/sec (100k)':>18}")
+    for name in ("model1", "model2"):
+        pickled = joblib.load(f"{name}.pkl")
+        compiled = TreeEnsemble.load(f"{name}.npz")
+        diff = np.abs(pickled.predict(rows) - compiled.predict(rows)).max()
+        for engine, model in (("xgboost", pickled), ("numpy", compiled)):
+            print(
+                f"{name:<8}{engine:<10}{diff if engine == 'numpy' else 0.0:>12.2e}"
+                f"{single_row_us(model, rows):>12.1f}{batch_rows_per_sec(model, big):>18,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Cost of explaining predictions.
+
+Times ``TreeEnsemble.contributions`` against ``predict`` per row for each
+model at several batch sizes, xgboost's ``pred_contribs`` on the pickled
+model for reference, and one full sensitivity sweep of both models (the
+Home page's "What drives this score" panel). Run from the repository root::
+
+    python benchmarks/contributions.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from climate_impact.explain import SWEEP_POINTS, contributions, sensitivity
+from climate_impact.schema import MODEL_SCHEMAS
+from climate_impact.scoring import feature_matrix, load_model, load_models
+
+BATCH_SIZES = (1, 100, 10_000, 100_000)
+
+
+def seconds(fn, rows, budget=1.0):
+    """Mean seconds per call, repeating for about ``budget`` seconds."""
+    fn(rows)
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(rows)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed > budget:
+            return elapsed / calls
+
+
+def main():
+    rows = feature_matrix(pd.read_csv("climate_change_data.csv"))
+    big = np.tile(rows, (max(BATCH_SIZES) // len(rows) + 1, 1))
+    print(f"{'model':<8}{'rows':>9}{'predict us/row':>16}{'contribs us/row':>17}{'xgboost us/row':>16}")
+    for name in ("model1", "model2"):
+        model = load_model(f"{name}.npz")
+        pickled = load_model(f"{name}.pkl")
+        schema = MODEL_SCHEMAS[name].bind(model)
+        for size in BATCH_SIZES:
+            batch = big[:size]
+            point = seconds(lambda r: model.predict(schema.view(r)), batch)
+            ours = seconds(lambda r: contributions(model, name, r), batch)
+            reference = seconds(lambda r: contributions(pickled, name, r), batch)
+            print(f"{name:<8}{size:>9,}{point / size * 1e6:>16.2f}{ours / size * 1e6:>17.2f}"
+                  f"{reference / size * 1e6:>16.2f}")
+    model1, model2 = load_models()
+    sweep = seconds(lambda r: sensitivity(model1, model2, r), rows[:1])
+    print(f"\nSensitivity sweep of both models ({SWEEP_POINTS} points x {rows.shape[1]} inputs): "
+          f"{sweep * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Per-interaction payload and render time: full preview versus one page.
+
+Streamlit sends ``st.dataframe`` contents to the browser as Arrow IPC bytes,
+so the payload is measured by serialising exactly as Streamlit does.
+Run from the repository root::
+
+    python benchmarks/dataset_paging.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+from synthetic import make_frame
+
+from climate_impact.paging import PagedView
+from climate_impact.timeindex import TimeIndex
+
+COLUMNS = ["Date", "Location", "Country", "Temperature", "CO2 Emissions"]
+
+
+def measure(render):
+    start = time.perf_counter()
+    frame = render()
+    payload = convert_pandas_df_to_arrow_bytes(frame)
+    return len(payload), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    frame = make_frame(args.rows)
+    for column in ("Location", "Country"):
+        frame[column] = frame[column].astype("category")
+    index = TimeIndex(frame)
+    view = PagedView(index.frame)
+    start, stop = index.bounds(2005, 2015)
+
+    # The first sort on a column includes building its permutation
+    interactions = {
+        "year filter": dict(),
+        "sort by Temperature": dict(sort_by="Temperature"),
+        "re-sort by Temperature": dict(sort_by="Temperature"),
+        "sort by Country desc": dict(sort_by="Country", ascending=False),
+        "next page (sorted)": dict(sort_by="Temperature", page=1),
+    }
+    print(f"{args.rows:,} rows, years 2005-2015 selected ({stop - start:,} rows)")
+    print(f"{'interaction':<24}{'mode':<8}{'payload MB':>12}{'render ms':>12}")
+    for name, query in interactions.items():
+        sort_by, ascending = query.get("sort_by"), query.get("ascending", True)
+
+        def full():
+            rows = index.frame.iloc[start:stop][COLUMNS]
+            return rows.sort_values(sort_by, ascending=ascending) if sort_by else rows
+
+        def paged():
+            return view.page(query.get("page", 0), args.page_size, start, stop, sort_by, ascending, COLUMNS)[0]
+
+        for mode, render in (("full", full), ("paged", paged)):
+            size, seconds = measure(render)
+            print(f"{name:<24}{mode:<8}{size / 1e6:>12.3f}{seconds * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
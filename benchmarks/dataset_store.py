@@ -0,0 +1,69 @@
+"""Cold load time and resident memory: CSV parsing versus the memory-mapped store.
+
+Each load runs in a fresh interpreter so module caches do not carry over.
+Run from the repository root (10M rows needs ~2 GB of temporary disk)::
+
+    python benchmarks/dataset_store.py --sizes 10000 1000000 10000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import write_csv
+
+from climate_impact.store import build_store
+
+LOADER = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+if {mode!r} == "csv":
+    import pandas as pd
+    frame = pd.read_csv({path!r})
+    frame["Date"] = pd.to_datetime(frame["Date"])
+else:
+    from climate_impact.store import open_store
+    frame = open_store({path!r}, rebuild=False).to_frame()
+    frame["Temperature"].mean()
+elapsed = time.perf_counter() - start
+rss_kb = next(int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmRSS"))
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_kb / 1024}}))
+"""
+
+
+def cold_load(mode, path):
+    code = LOADER.format(root=ROOT, mode=mode, path=path)
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    args = parser.parse_args()
+    print(f"{'rows':>12}{'mode':>7}{'load s':>10}{'RSS MB':>12}{'build s':>10}")
+    for rows in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv = os.path.join(tmp, "data.csv")
+            write_csv(csv, rows)
+            start = time.perf_counter()
+            build_store(csv)
+            build = time.perf_counter() - start
+            for mode in ("csv", "store"):
+                result = cold_load(mode, csv)
+                print(
+                    f"{rows:>12,}{mode:>7}{result['seconds']:>10.3f}{result['rss_mb']:>12.1f}"
+                    f"{build if mode == 'store' else float('nan'):>10.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
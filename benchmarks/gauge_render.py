@@ -0,0 +1,103 @@
+"""Per-prediction gauge rendering: a pyplot figure per call versus ``GaugeStrip``.
+
+``pyplot`` is the old Home page code: a new figure per prediction, saved
+the way ``st.pyplot`` saves it and never closed. ``pyplot-closed`` is the
+same with ``plt.close``. ``cached`` composites markers onto the
+pre-rendered background and encodes a PNG. Each mode runs in a fresh
+interpreter and reports render time percentiles and RSS growth. Run from
+the repository root::
+
+    python benchmarks/gauge_render.py --predictions 10000 --pyplot-predictions 1000
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+
+
+def pyplot_render(plt, prediction1, prediction2, close):
+    fig, ax = plt.subplots(1, 2, figsize=(10, 3))
+    for axis, value, bounds, title in ((ax[0], prediction1, [0, 100, 150, 200, 250], "Climate Risk Index"),
+                                       (ax[1], prediction2, [0, 25, 50, 75, 100], "Weather Severity Index")):
+        for i, color in enumerate(["green", "yellow", "orange", "red"]):
+            axis.barh([0], [bounds[i + 1] - bounds[i]], left=bounds[i], color=color, height=0.5)
+        axis.plot([value, value], [-0.25, 0.75], "k-", linewidth=2)
+        axis.set_xlim(bounds[0], bounds[-1])
+        axis.set_ylim(-0.5, 1)
+        axis.set_title(title)
+        axis.axis("off")
+    plt.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, bbox_inches="tight", dpi=200, format="png")
+    if close:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+def run(mode, predictions, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.column_stack([rng.uniform(0, 250, predictions), rng.uniform(0, 100, predictions)])
+    if mode == "cached":
+        from climate_impact.charts import GaugeStrip
+
+        gauges = GaugeStrip()
+        render = gauges.png
+    else:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import warnings
+
+        warnings.filterwarnings("ignore", message="More than 20 figures")
+        render = lambda v: pyplot_render(plt, v[0], v[1], close=mode == "pyplot-closed")
+    render(values[0])
+    start_rss = rss_mb()
+    times = np.empty(predictions)
+    for i, v in enumerate(values):
+        start = time.perf_counter()
+        render(v)
+        times[i] = time.perf_counter() - start
+    return {
+        "p50_ms": float(np.percentile(times, 50) * 1e3),
+        "p99_ms": float(np.percentile(times, 99) * 1e3),
+        "rss_start_mb": start_rss,
+        "rss_growth_mb": rss_mb() - start_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--predictions", type=int, default=10_000)
+    parser.add_argument("--pyplot-predictions", type=int, default=1_000,
+                        help="fewer by default: unclosed figures grow by megabytes each")
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(run(args.mode, args.predictions)))
+        return
+    print(f"{'mode':<15}{'predictions':>12}{'p50 ms':>9}{'p99 ms':>9}{'RSS MB':>9}{'growth MB':>11}")
+    for mode, count in (("pyplot", args.pyplot_predictions), ("pyplot-closed", args.pyplot_predictions),
+                        ("cached", args.predictions)):
+        out = subprocess.run([sys.executable, __file__, "--mode", mode, "--predictions", str(count)],
+                             check=True, capture_output=True, text=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:<15}{count:>12,}{result['p50_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+              f"{result['rss_start_mb']:>9.1f}{result['rss_growth_mb']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Ingest throughput and the cost of keeping the Dataset summary current.
+
+Appends synthetic readings to a copy of the dataset in batches and reports
+records/sec, then compares folding each batch into the summary cube (what
+the Dataset page does on its next render) with rebuilding the cube from
+every row. Run from the repository root::
+
+    python benchmarks/ingest.py --rows 200000 --batch-sizes 1000 10000 100000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_frame
+
+from climate_impact.ingest import Ingestor, summary_catch_up
+from climate_impact.store import load_dataset, open_store
+from climate_impact.summary import SummaryCube
+
+
+def with_year(frame):
+    return frame.assign(Year=frame["Date"].dt.year)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+    readings = make_frame(args.rows, seed=1)
+    print(f"{'batch':>9}{'records':>10}{'records/sec':>13}{'catch-up ms':>13}{'rebuild ms':>12}")
+    for batch_size in args.batch_sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv = os.path.join(tmp, "data.csv")
+            shutil.copy(os.path.join(ROOT, "climate_change_data.csv"), csv)
+            open_store(csv)
+            cube = SummaryCube(with_year(load_dataset(csv)), keys=["Year"])
+            catch_up = []
+
+            # Runs after each batch is appended, outside the ingest timing
+            def fold(rows):
+                start = time.perf_counter()
+                summary_catch_up(cube, csv)
+                catch_up.append(time.perf_counter() - start)
+
+            ingestor = Ingestor(csv, batch_size, on_batch=fold)
+            for start in range(0, len(readings), batch_size):
+                ingestor.submit(readings.iloc[start:start + batch_size])
+            ingestor.flush()
+            stats = ingestor.stats()
+            start = time.perf_counter()
+            SummaryCube(with_year(load_dataset(csv)), keys=["Year"])
+            rebuild = time.perf_counter() - start
+            print(f"{batch_size:>9,}{stats['records']:>10,}{stats['records_per_sec']:>13,.0f}"
+                  f"{sum(catch_up) / len(catch_up) * 1e3:>13.1f}{rebuild * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Cost of prediction intervals over point predictions.
+
+Times ``TreeEnsemble.predict`` against ``LeafIntervals.predict`` (point and
+interval from the same traversal) for each model at batch sizes of 1, 1k
+and 100k rows, and reports the held-out calibration of the tables. Run
+from the repository root::
+
+    python benchmarks/intervals.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from climate_impact.intervals import open_intervals
+from climate_impact.schema import MODEL_SCHEMAS
+from climate_impact.scoring import feature_matrix, load_model
+
+BATCH_SIZES = (1, 1_000, 100_000)
+
+
+def seconds(fn, rows, budget=1.0):
+    """Mean seconds per call, repeating for about ``budget`` seconds."""
+    fn(rows)
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(rows)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed > budget:
+            return elapsed / calls
+
+
+def main():
+    rows = feature_matrix(pd.read_csv("climate_change_data.csv"))
+    big = np.tile(rows, (max(BATCH_SIZES) // len(rows) + 1, 1))
+    print(f"{'model':<8}{'rows':>9}{'point ms':>11}{'interval ms':>13}{'overhead':>10}")
+    for name in ("model1", "model2"):
+        model = load_model(f"{name}.npz")
+        intervals = open_intervals(f"{name}.npz", name)
+        schema = MODEL_SCHEMAS[name].bind(model)
+        for size in BATCH_SIZES:
+            batch = big[:size]
+            point = seconds(lambda r: model.predict(schema.view(r)), batch)
+            interval = seconds(lambda r: intervals.predict(model, r), batch)
+            print(f"{name:<8}{size:>9,}{point * 1e3:>11.3f}{interval * 1e3:>13.3f}{interval / point:>9.2f}x")
+        for group, (covered, width, rows) in intervals.calibration.items():
+            print(f"  {group} the data's range: {intervals.coverage:.0%} target, "
+                  f"{covered:.1%} of {rows:,} held-out rows covered, mean width {width:.2f}")
+
+
+if __name__ == "__main__":
+    main()
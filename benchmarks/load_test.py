@@ -0,0 +1,88 @@
+"""Load test for the prediction service.
+
+Starts ``python -m climate_impact.service`` (unless ``--url`` points at a
+running one), sends single-row JSON requests from ``--concurrency``
+concurrent clients and reports latency percentiles and requests/sec.
+Run from the repository root::
+
+    python benchmarks/load_test.py --requests 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def run(url, total, concurrency):
+    from tornado.httpclient import AsyncHTTPClient
+
+    AsyncHTTPClient.configure(None, max_clients=concurrency)
+    client = AsyncHTTPClient()
+    rng = np.random.default_rng(0)
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            body = json.dumps({"rows": [rng.uniform(0, 100, 6).round(1).tolist()]})
+            start = time.perf_counter()
+            await client.fetch(f"{url}/predict", method="POST", body=body)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    health = json.loads((await client.fetch(f"{url}/health")).body)
+    return np.array(latencies), elapsed, health
+
+
+def wait_until_up(url, timeout=30):
+    import urllib.request
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{url}/health", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Service at {url} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="existing service, e.g. http://localhost:8600")
+    parser.add_argument("--port", type=int, default=8601)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        url = f"http://localhost:{args.port}"
+        server = subprocess.Popen([sys.executable, "-m", "climate_impact.service", "--port", str(args.port)], cwd=ROOT)
+    try:
+        wait_until_up(url)
+        latencies, elapsed, health = asyncio.run(run(url, args.requests, args.concurrency))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"p50 {p50:.2f} ms, p99 {p99:.2f} ms, {args.requests / elapsed:,.0f} requests/sec")
+    if health.get("batches"):
+        print(f"{health['requests'] / health['batches']:.1f} requests per model call on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Interpolated response surfaces versus the compiled models.
+
+Builds (or reuses) each model's surface and reports its grid, the error
+measured at build time, the error on the dataset's rows, and single-row
+latency of the model, the surface and the Home page's full surface query.
+Run from the repository root::
+
+    python benchmarks/response_surface.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from climate_impact.scoring import feature_matrix, load_model
+from climate_impact.surface import open_surface
+
+
+def single_row_us(fn, row, repeat=2000):
+    fn(row)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(row)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    rows = feature_matrix(pd.read_csv("climate_change_data.csv"))
+    print(f"{'model':<8}{'grid':>22}{'MB':>6}{'p99 probe':>11}{'p99 data':>10}{'max data':>10}"
+          f"{'model us':>10}{'surface us':>12}")
+    for name in ("model1", "model2"):
+        model = load_model(f"{name}.npz")
+        surface = open_surface(f"{name}.npz", name)
+        error = np.abs(surface(rows) - model.predict(rows))
+        print(
+            f"{name:<8}{'x'.join(map(str, surface.shape)):>22}{surface.values.nbytes / 2 ** 20:>6.1f}"
+            f"{surface.error['p99']:>11.2f}{np.percentile(error, 99):>10.2f}{error.max():>10.2f}"
+            f"{single_row_us(model.predict, rows[:1]):>10.1f}{single_row_us(surface, rows[:1]):>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
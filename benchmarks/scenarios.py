@@ -0,0 +1,42 @@
+"""Scenario simulation throughput by chunk size and worker count.
+
+Simulates the global region 30 years ahead with the compiled models and
+reports trajectories/sec and the sampled states one task holds. Run from
+the repository root::
+
+    python benchmarks/scenarios.py --trajectories 100000 --workers 1 4
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from climate_impact.analytics import GLOBAL, compute_trends
+from climate_impact.scenarios import ScenarioBasis, simulate
+from climate_impact.schema import FEATURE_COLUMNS
+from climate_impact.store import load_dataset
+from climate_impact.timeindex import TimeIndex
+
+YEARS = 30
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trajectories", type=int, default=50_000)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[500, 2_000, 8_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+    frame = TimeIndex(load_dataset("climate_change_data.csv")).frame
+    basis = ScenarioBasis.fit(frame, GLOBAL, compute_trends(frame))
+    print(f"{'workers':>8}{'chunk':>8}{'seconds':>9}{'trajectories/sec':>18}{'MB per task':>13}")
+    for workers in dict.fromkeys(args.workers):
+        for chunk in args.chunks:
+            result = simulate(basis, YEARS, args.trajectories, chunk, workers=workers)
+            task_mb = chunk * YEARS * len(FEATURE_COLUMNS) * 4 / 2 ** 20
+            print(f"{workers:>8}{chunk:>8,}{result.seconds:>9.2f}{result.trajectories_per_sec:>18,.0f}"
+                  f"{task_mb:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
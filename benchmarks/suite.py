@@ -0,0 +1,161 @@
+"""End-to-end benchmark suite for the app's hot paths.
+
+Times model loading, predictions at 1, 1k and 100k rows, loading,
+filtering, paging and describing the dataset, and building the charts at
+several synthetic dataset sizes. Every measurement is a ``timing`` span, so
+the results use the same names and statistics as the app's Performance page
+(open the app with ``?admin=1``). ``--json`` saves them; ``--compare``
+flags spans whose median slowed down by more than ``--threshold`` (and
+``--min-ms``) against a saved run, and exits non-zero if any did. Run from the repository root::
+
+    python benchmarks/suite.py --json before.json
+    python benchmarks/suite.py --compare before.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from synthetic import make_frame, write_csv
+
+from climate_impact.paging import PagedView
+from climate_impact.schema import FEATURE_COLUMNS
+from climate_impact.scoring import feature_matrix, load_model, predict_indices, predict_with_intervals
+from climate_impact.store import build_store, load_dataset
+from climate_impact.summary import SummaryCube
+from climate_impact.timeindex import TimeIndex
+from climate_impact.timing import Timings, compare
+
+PREDICT_ROWS = (1, 1_000, 100_000)
+DATA_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def label(rows):
+    return f"{rows // 1_000_000}M" if rows >= 1_000_000 else f"{rows // 1_000}k" if rows >= 1_000 else str(rows)
+
+
+def bench_models(timings, repeat):
+    from climate_impact.intervals import open_intervals
+
+    for path in ("model1.npz", "model2.npz", "model1.pkl", "model2.pkl"):
+        for _ in range(repeat):
+            with timings.span(f"model.load {path}"):
+                load_model(path)
+    model1, model2 = load_model("model1.npz"), load_model("model2.npz")
+    intervals = open_intervals("model1.npz", "model1"), open_intervals("model2.npz", "model2")
+    rows = feature_matrix(make_frame(max(PREDICT_ROWS)))
+    for size in PREDICT_ROWS:
+        batch = rows[:size]
+        for _ in range(repeat):
+            with timings.span(f"model.predict {label(size)} rows"):
+                predict_indices(model1, model2, batch)
+            with timings.span(f"model.predict_intervals {label(size)} rows"):
+                predict_with_intervals(model1, model2, intervals, batch)
+            with timings.span(f"model.predict_analytic {label(size)} rows"):
+                predict_indices(model1, model2, batch, engine="analytic")
+
+
+def bench_dataset(timings, rows, repeat, directory):
+    name = label(rows)
+    csv_path = os.path.join(directory, f"data-{name}.csv")
+    write_csv(csv_path, rows)
+    with timings.span(f"dataset.build_store {name}"):
+        build_store(csv_path)
+    for _ in range(repeat):
+        with timings.span(f"dataset.load {name}"):
+            frame = load_dataset(csv_path)
+    with timings.span(f"dataset.index {name}"):
+        index = TimeIndex(frame)
+    with timings.span(f"dataset.summary_build {name}"):
+        cube = SummaryCube(index.frame, keys=["Year"])
+    view = PagedView(index.frame)
+    rng = np.random.default_rng(0)
+    for _ in range(repeat):
+        first, last = sorted(rng.integers(index.min_year, index.max_year + 1, 2))
+        start, stop = index.bounds(first, last)
+        with timings.span(f"dataset.filter {name}"):
+            index.between(first, last)
+        with timings.span(f"dataset.page {name}"):
+            view.page(0, 100, start, stop)
+        with timings.span(f"dataset.page_sorted {name}"):
+            view.page(0, 100, start, stop, sort_by="Temperature")
+        with timings.span(f"dataset.describe {name}"):
+            cube.describe(list(FEATURE_COLUMNS), Year=(first, last))
+        with timings.span(f"dataset.describe_rows {name}"):
+            index.between(first, last)[list(FEATURE_COLUMNS)].describe()
+    return index.frame
+
+
+def bench_charts(timings, frame, repeat):
+    """Build and serialize the line chart of ``frame``'s daily means, as ``st.altair_chart`` does."""
+    import altair as alt
+
+    alt.data_transformers.disable_max_rows()
+    name = label(len(frame))
+    daily = frame.groupby(frame["Date"].dt.floor("D"))["Temperature"].mean().reset_index()
+    for points, data in (("yearly", daily.iloc[::365]), ("daily", daily), ("rows", frame[["Date", "Temperature"]])):
+        for _ in range(repeat):
+            with timings.span(f"chart.line {name} {points}"):
+                alt.Chart(data).mark_line().encode(x="Date:T", y="Temperature:Q").to_dict()
+
+
+def bench_static_charts(timings, repeat):
+    from climate_impact.charts import COMPARISON_SPEC, GaugeStrip, comparison_data
+
+    gauges = GaugeStrip()
+    rng = np.random.default_rng(0)
+    for _ in range(repeat):
+        with timings.span("chart.comparison"):
+            json.dumps({**COMPARISON_SPEC, "data": {"values": comparison_data(
+                list(FEATURE_COLUMNS), rng.uniform(0, 100, 6), rng.uniform(0, 100, 6)).to_dict("records")}})
+        with timings.span("chart.gauges"):
+            # New marker positions each time, so the image cache does not answer
+            gauges.png([rng.uniform(0, 250), rng.uniform(0, 100)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DATA_SIZES), help="synthetic dataset rows")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of each measurement")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="median slowdown that counts as a regression")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    timings = Timings()
+    bench_models(timings, args.repeat)
+    bench_static_charts(timings, args.repeat)
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.sizes:
+            frame = bench_dataset(timings, rows, args.repeat, directory)
+            bench_charts(timings, frame, args.repeat)
+
+    report = timings.report()
+    width = max(map(len, report)) + 2
+    print(f"{'span':<{width}}{'count':>6}{'p50 ms':>11}{'p90 ms':>11}{'max ms':>11}")
+    for name, stats in report.items():
+        print(f"{name:<{width}}{stats['count']:>6}{stats['p50_ms']:>11.3f}{stats['p90_ms']:>11.3f}"
+              f"{stats['max_ms']:>11.3f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(timings.to_json(source="benchmarks/suite.py", sizes=args.sizes, repeat=args.repeat))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["spans"]
+        regressions = compare(report, baseline, args.threshold, args.min_ms)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ms ({after / before - 1:+.0%})")
+        if not regressions:
+            print(f"No span slowed down by more than {args.threshold:.0%}.")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Synthetic datasets with the schema and value ranges of climate_change_data.csv."""
+import numpy as np
+import pandas as pd
+
+START, END = pd.Timestamp("2000-01-01"), pd.Timestamp("2022-12-31")
+
+
+def make_frame(rows, seed=0, n_locations=8000, n_countries=243):
+    """Return ``rows`` random observations spread evenly from 2000 to 2022."""
+    rng = np.random.default_rng(seed)
+    dates = pd.to_datetime(np.linspace(START.value, END.value, rows).astype("int64"))
+    locations = np.array([f"Location {i}" for i in range(n_locations)], dtype=object)
+    countries = np.array([f"Country {i}" for i in range(n_countries)], dtype=object)
+    return pd.DataFrame({
+        "Date": dates,
+        "Location": locations[rng.integers(0, n_locations, rows)],
+        "Country": countries[rng.integers(0, n_countries, rows)],
+        "Temperature": rng.normal(15, 5, rows),
+        "CO2 Emissions": rng.normal(400, 50, rows),
+        "Sea Level Rise": rng.normal(0, 1, rows),
+        "Precipitation": rng.uniform(0, 100, rows),
+        "Humidity": rng.uniform(0, 100, rows),
+        "Wind Speed": rng.uniform(0, 50, rows),
+    })
+
+
+def write_csv(path, rows, seed=0, chunk=1_000_000):
+    """Write a synthetic CSV in chunks so large sizes fit in memory."""
+    for i, start in enumerate(range(0, rows, chunk)):
+        frame = make_frame(min(chunk, rows - start), seed + i)
+        frame["Date"] = frame["Date"].dt.strftime("%Y-%m-%d %H:%M:%S.%f000")
+        frame.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
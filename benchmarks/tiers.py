@@ -0,0 +1,56 @@
+"""Chart render cost against dataset size: every row versus the pre-aggregated tiers.
+
+For each size, builds an Altair line chart of Temperature over the whole
+history from every row and from the tier ``Tiers.view`` picks, and
+serializes both as ``st.altair_chart`` does. Also reports the time to build
+the tiers and to fold in 1% more rows. Per-row charts are skipped above
+``--raw-max`` rows. Run from the repository root::
+
+    python benchmarks/tiers.py --sizes 10000 100000 1000000 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import altair as alt
+from synthetic import make_frame
+
+from climate_impact.tiers import DEFAULT_POINTS, Tiers
+
+alt.data_transformers.disable_max_rows()
+
+
+def render_ms(frame, y="Temperature"):
+    start = time.perf_counter()
+    alt.Chart(frame).mark_line().encode(x="Date:T", y=f"{y}:Q").to_dict()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--raw-max", type=int, default=1_000_000, help="largest size to chart row by row")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS)
+    args = parser.parse_args()
+    print(f"{'rows':>12}{'raw ms':>10}{'tier':>7}{'points':>8}{'tier ms':>9}{'build s':>9}{'+1% ms':>9}")
+    for rows in args.sizes:
+        frame = make_frame(rows)
+        raw = f"{render_ms(frame[['Date', 'Temperature']]):>10.1f}" if rows <= args.raw_max else f"{'-':>10}"
+        start = time.perf_counter()
+        tiers = Tiers(frame)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        tiers.update(make_frame(max(rows // 100, 1), seed=1))
+        update = time.perf_counter() - start
+        start = time.perf_counter()
+        series, tier = tiers.view("Global", "Temperature", args.points)
+        tiered = (time.perf_counter() - start) * 1e3 + render_ms(series)
+        print(f"{rows:>12,}{raw}{tier:>7}{len(series):>8,}{tiered:>9.1f}{build:>9.2f}{update * 1e3:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
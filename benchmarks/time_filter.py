@@ -0,0 +1,52 @@
+"""Year-range filter latency: boolean mask versus the sorted TimeIndex.
+
+Run from the repository root::
+
+    python benchmarks/time_filter.py --sizes 10000 1000000 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from synthetic import make_frame
+
+from climate_impact.timeindex import TimeIndex
+
+
+def median_ms(fn, ranges):
+    times = []
+    for first, last in ranges:
+        start = time.perf_counter()
+        fn(first, last)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>12}{'mask ms':>10}{'index ms':>10}{'build s':>10}")
+    for rows in args.sizes:
+        index_start = time.perf_counter()
+        index = TimeIndex(make_frame(rows))
+        build = time.perf_counter() - index_start
+        frame = index.frame
+        ranges = np.sort(rng.integers(index.min_year, index.max_year + 1, (args.queries, 2)), axis=1)
+
+        def mask(first, last, frame=frame):
+            return frame[(frame["Year"] >= first) & (frame["Year"] <= last)]
+
+        print(f"{rows:>12,}{median_ms(mask, ranges):>10.3f}{median_ms(index.between, ranges):>10.3f}{build:>10.2f}")
+        del index, frame, mask
+
+
+if __name__ == "__main__":
+    main()
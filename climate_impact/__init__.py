@@ -0,0 +1 @@
+"""Scoring, data and analytics helpers behind the Climate Impact Predictor app."""
@@ -0,0 +1,98 @@
+"""Closed-form scoring engine and drift monitoring against the learned models.
+
+Both indices are defined in Untitled.ipynb as fixed linear combinations of
+the inputs, which the models only approximate:
+
+    Climate_Risk_Index = 0.3·CO2 + 0.2·Sea Level + 0.2·Precipitation + 0.3·Temperature
+    Weather_Severity   = 0.4·Humidity + 0.3·Wind Speed + 0.3·Precipitation
+
+so the analytic engine scores any batch with one ``(n, 6) @ (6, 2)`` product.
+``DriftMonitor`` samples analytic requests, scores them with the learned
+models as well, and keeps the residuals to show when the two diverge.
+"""
+import threading
+
+import numpy as np
+
+from climate_impact.schema import FEATURE_COLUMNS, FEATURE_DTYPE, as_rows
+
+_FORMULAS = {
+    "Climate_Risk_Index": {"CO2 Emissions": 0.3, "Sea Level Rise": 0.2, "Precipitation": 0.2, "Temperature": 0.3},
+    "Weather_Severity_Index": {"Humidity": 0.4, "Wind Speed": 0.3, "Precipitation": 0.3},
+}
+INDEX_NAMES = tuple(_FORMULAS)
+WEIGHTS = np.array(
+    [[_FORMULAS[index].get(column, 0.0) for index in INDEX_NAMES] for column in FEATURE_COLUMNS],
+    dtype=FEATURE_DTYPE,
+)
+
+
+def predict_indices(features):
+    """Compute both indices for a batch with a single matrix multiply."""
+    scores = as_rows(features) @ WEIGHTS
+    return scores[:, 0], scores[:, 1]
+
+
+class DriftMonitor:
+    """Residuals (analytic - learned) for a random sample of scored rows.
+
+    ``reference`` scores a row matrix with the learned models and returns
+    ``(risk, severity)``. Each observed row is compared with probability
+    ``sample_rate``; the latest ``capacity`` residuals are kept. Safe to share
+    between threads.
+    """
+
+    def __init__(self, reference, sample_rate=0.05, capacity=10_000, seed=None):
+        self.reference = reference
+        self.sample_rate = sample_rate
+        self.capacity = capacity
+        self.observed = 0
+        self._residuals = np.empty((capacity, len(INDEX_NAMES)), dtype=np.float64)
+        self._count = 0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def observe(self, rows, risk, severity):
+        """Possibly compare some of ``rows`` with the learned models."""
+        with self._lock:
+            self.observed += len(rows)
+            picked = np.flatnonzero(self._rng.random(len(rows)) < self.sample_rate)
+        if not len(picked):
+            return
+        learned = np.column_stack(self.reference(rows[picked]))
+        analytic = np.column_stack([np.asarray(risk)[picked], np.asarray(severity)[picked]])
+        residuals = (analytic - learned)[-self.capacity:]
+        with self._lock:
+            slots = (self._count + np.arange(len(residuals))) % self.capacity
+            self._residuals[slots] = residuals
+            self._count += len(residuals)
+
+    def residuals(self):
+        """Return the retained residuals, ``(n, 2)`` in ``INDEX_NAMES`` order."""
+        with self._lock:
+            return self._residuals[:min(self._count, self.capacity)].copy()
+
+    def report(self):
+        """Summary of the residual distribution per index."""
+        residuals = self.residuals()
+        summary = {"observed": self.observed, "compared": self._count}
+        for i, name in enumerate(INDEX_NAMES):
+            values = residuals[:, i]
+            if not len(values):
+                summary[name] = None
+                continue
+            p50, p90, p99 = np.percentile(np.abs(values), [50, 90, 99])
+            summary[name] = {
+                "mean": float(values.mean()),
+                "std": float(values.std()),
+                "abs_p50": float(p50),
+                "abs_p90": float(p90),
+                "abs_p99": float(p99),
+                "abs_max": float(np.abs(values).max()),
+            }
+        return summary
+
+    def drifted(self, tolerance):
+        """True when the 99th-percentile absolute residual of either index exceeds ``tolerance``."""
+        report = self.report()
+        return any(report[name] and report[name]["abs_p99"] > tolerance for name in INDEX_NAMES)
@@ -0,0 +1,155 @@
+"""Yearly trends of every measure, globally and per country.
+
+``compute_trends`` aggregates the dataset into yearly means for all
+parameters and countries with a single groupby, then fits a least-squares
+line to every (group, parameter) series at once from the closed-form normal
+equations, so the cost does not depend on how many series are fitted.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from climate_impact import analytic
+from climate_impact.schema import FEATURE_COLUMNS, as_rows
+
+GLOBAL = "Global"
+COUNTRY_COLUMN = "Country"
+YEAR_COLUMN = "Year"
+PARAMETERS = FEATURE_COLUMNS + analytic.INDEX_NAMES
+
+# Names used on the Analytics page
+PARAMETER_LABELS = {
+    "Temperature": "Temperature",
+    "CO₂ Emissions": "CO2 Emissions",
+    "Sea Level": "Sea Level Rise",
+    "Precipitation": "Precipitation",
+    "Humidity": "Humidity",
+    "Wind Speed": "Wind Speed",
+    "Weather Severity": "Weather_Severity_Index",
+    "Climate Risk": "Climate_Risk_Index",
+}
+
+
+@dataclass
+class Trends:
+    """Yearly means and fitted lines for ``groups`` x ``parameters``.
+
+    ``means`` is ``(groups, years, parameters)`` with NaN for years without
+    data; ``slope``, ``intercept`` and ``recent_slope`` (fitted on the later
+    half of the years) are ``(groups, parameters)``.
+    """
+
+    groups: list
+    years: np.ndarray
+    parameters: tuple
+    means: np.ndarray
+    counts: np.ndarray
+    slope: np.ndarray
+    intercept: np.ndarray
+    recent_slope: np.ndarray
+
+    def _position(self, group, parameter):
+        return self.groups.index(group), self.parameters.index(parameter)
+
+    def series(self, group, parameter, last_years=None):
+        """``Year``, ``parameter`` and ``Trend`` columns for one group."""
+        g, p = self._position(group, parameter)
+        frame = pd.DataFrame({
+            YEAR_COLUMN: self.years,
+            parameter: self.means[g, :, p],
+            "Trend": self.intercept[g, p] + self.slope[g, p] * self.years,
+        })
+        frame = frame[self.counts[g] > 0]
+        if last_years:
+            frame = frame[frame[YEAR_COLUMN] > self.years[-1] - last_years]
+        return frame.reset_index(drop=True)
+
+    def summary(self, group, parameter):
+        """Slope, total fitted change and recent slope of one series."""
+        g, p = self._position(group, parameter)
+        observed = self.years[self.counts[g] > 0]
+        span = observed[-1] - observed[0] if len(observed) else 0
+        return {
+            "slope": float(self.slope[g, p]),
+            "total_change": float(self.slope[g, p] * span),
+            "recent_slope": float(self.recent_slope[g, p]),
+            "first_year": int(observed[0]) if len(observed) else None,
+            "last_year": int(observed[-1]) if len(observed) else None,
+        }
+
+
+def with_indices(frame):
+    """Append both indices, computed from their formulas, to a frame of measures."""
+    risk, severity = analytic.predict_indices(as_rows(frame[list(FEATURE_COLUMNS)].to_numpy()))
+    columns = {c: frame[c] for c in frame.columns}
+    columns.update(dict(zip(analytic.INDEX_NAMES, (risk, severity))))
+    return pd.DataFrame(columns, index=frame.index, copy=False)
+
+
+def yearly_means(frame):
+    """Yearly means per country plus the global series.
+
+    Returns ``(groups, years, means, counts)`` where ``means`` is
+    ``(groups, years, parameters)``; the global group is first.
+    """
+    frame = with_indices(frame)
+    parameters = list(PARAMETERS)
+    by_country = COUNTRY_COLUMN in frame.columns
+    keys = [COUNTRY_COLUMN, YEAR_COLUMN] if by_country else [YEAR_COLUMN]
+    grouped = frame.groupby(keys, observed=True, sort=True)[parameters]
+    sums, counts = grouped.sum(), grouped.count()
+
+    years = np.arange(frame[YEAR_COLUMN].min(), frame[YEAR_COLUMN].max() + 1)
+    countries = list(sums.index.get_level_values(0).unique()) if by_country else []
+    groups = [GLOBAL] + [str(c) for c in countries]
+    total = np.zeros((len(groups), len(years), len(parameters)))
+    n = np.zeros_like(total)
+    year_pos = sums.index.get_level_values(-1).to_numpy() - years[0]
+    group_pos = (
+        pd.Index(countries).get_indexer(sums.index.get_level_values(0)) + 1 if by_country
+        else np.zeros(len(sums), dtype=int)
+    )
+    np.add.at(total, (group_pos, year_pos), sums.to_numpy())
+    np.add.at(n, (group_pos, year_pos), counts.to_numpy())
+    if by_country:
+        total[0] = total[1:].sum(axis=0)
+        n[0] = n[1:].sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = total / n
+    return groups, years, means, n[..., 0]
+
+
+def fit_lines(years, means, weights):
+    """Least-squares ``intercept + slope * year`` for every (group, parameter) series.
+
+    ``weights`` is ``(groups, years)`` (zero where a year is missing). Returns
+    ``(slope, intercept)``, each ``(groups, parameters)``; series with fewer
+    than two years get a zero slope.
+    """
+    w = weights[..., None] * ~np.isnan(means)
+    x = (years - years.mean())[None, :, None]
+    y = np.nan_to_num(means)
+    sw = w.sum(axis=1)
+    sx, sy = (w * x).sum(axis=1), (w * y).sum(axis=1)
+    sxx, sxy = (w * x * x).sum(axis=1), (w * x * y).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denominator = sw * sxx - sx * sx
+        slope = np.where(denominator > 0, (sw * sxy - sx * sy) / denominator, 0.0)
+        intercept = (sy - slope * sx) / sw - slope * years.mean()
+    return slope, intercept
+
+
+def compute_trends(frame):
+    """Fit yearly trends for every parameter, globally and per country.
+
+    ``frame`` needs a ``Year`` column (see ``TimeIndex``) and the measure
+    columns; ``Country`` is optional.
+    """
+    groups, years, means, counts = yearly_means(frame)
+    # Each year counts once, however many readings it has
+    present = (counts > 0).astype(np.float64)
+    slope, intercept = fit_lines(years, means, present)
+    recent = present * (years >= years[len(years) // 2])
+    recent_slope, _ = fit_lines(years, means, recent)
+    return Trends(groups, years, PARAMETERS, means, counts, slope, intercept, recent_slope)
@@ -0,0 +1,251 @@
+"""Per-country and per-location baselines of every measure and both indices.
+
+A baseline is the row count, mean and percentiles (0, 1, ..., 100) of the
+six measures and the two indices over a group of rows: all of them, one
+country's, or one location's. Locations are (Location, Country) pairs, as
+a place name recurs across countries. Indices are the notebook formulas
+(``climate_impact.analytic``), so the baselines do not depend on the
+models.
+
+Keys are dictionary-encoded with the store's category codes: ``locations``
+and ``countries`` hold the names once, and ``sites`` the ``(country,
+location)`` code pairs sorted by country, so a country's locations are one
+contiguous slice. Locations with fewer than ``MIN_LOCATION_ROWS`` rows share
+their country's baseline. Finding a group is a dict lookup and a
+percentile is an interpolation on its 101-point grid, so neither depends
+on the size of the dataset; ``percentile`` does either for a whole batch
+at once, and ``rank_everywhere`` ranks values against every group.
+
+Tables are written next to the dataset, stamped with the store version,
+and rebuilt when the data changes.
+
+Usage::
+
+    python -m climate_impact.baselines climate_change_data.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from climate_impact import analytic
+from climate_impact.schema import FEATURE_COLUMNS
+
+BASELINES_VERSION = 1
+MEASURES = FEATURE_COLUMNS + analytic.INDEX_NAMES
+PERCENTILES = np.arange(101, dtype=np.float64)
+# Locations with fewer rows than this are compared with their country
+MIN_LOCATION_ROWS = 10
+GLOBAL = 0
+
+
+def baselines_path(csv_path):
+    """File the baseline tables for ``csv_path`` live in."""
+    return os.path.splitext(csv_path)[0] + ".baselines.npz"
+
+
+class Baselines:
+    """Baseline tables for the global, country and location groups.
+
+    Group ``GLOBAL`` is every row, groups ``1..len(countries)`` the
+    countries in code order, and the rest the locations with their own
+    baseline. ``counts`` is ``(groups,)``, ``means`` ``(groups, measures)``
+    and ``grid`` ``(groups, measures, 101)`` float32 percentiles.
+    """
+
+    def __init__(self, locations, countries, sites, site_groups, counts, means, grid, version=""):
+        self.locations = np.asarray(locations, dtype=object)
+        self.countries = np.asarray(countries, dtype=object)
+        self.sites = np.asarray(sites, dtype=np.int32).reshape(-1, 2)
+        self.site_groups = np.asarray(site_groups, dtype=np.int32)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.grid = np.ascontiguousarray(grid, dtype=np.float32)
+        self.version = str(version)
+        self._country_codes = {name: code for code, name in enumerate(self.countries)}
+        self._location_codes = {name: code for code, name in enumerate(self.locations)}
+        self._site_index = {(int(c), int(loc)): i for i, (c, loc) in enumerate(self.sites)}
+        self._country_starts = np.searchsorted(self.sites[:, 0], np.arange(len(self.countries) + 1))
+
+    @classmethod
+    def from_store(cls, store, min_location_rows=MIN_LOCATION_ROWS):
+        """Compute the tables from a ``ColumnStore`` in one sort per measure."""
+        countries = np.asarray(store.raw("Country"), dtype=np.int64)
+        locations = np.asarray(store.raw("Location"), dtype=np.int64)
+        n_countries, n_locations = len(store.categories("Country")), len(store.categories("Location"))
+        keys, site_of_row, site_counts = np.unique(countries * n_locations + locations, return_inverse=True,
+                                                   return_counts=True)
+        sites = np.stack([keys // n_locations, keys % n_locations], axis=1)
+        own = site_counts >= min_location_rows
+        site_groups = 1 + sites[:, 0]
+        site_groups[own] = 1 + n_countries + np.arange(own.sum())
+        n_groups = 1 + n_countries + int(own.sum())
+
+        # Each row counts towards the global group, its country and, if it has one, its location's group
+        features = np.column_stack([np.asarray(store.raw(c), dtype=np.float64) for c in FEATURE_COLUMNS])
+        values = np.column_stack([features, *analytic.predict_indices(features)]).astype(np.float64)
+        located = own[site_of_row]
+        groups = np.concatenate([np.zeros(len(values), dtype=np.int64), 1 + countries,
+                                 site_groups[site_of_row[located]]])
+        rows = np.concatenate([np.arange(len(values)), np.arange(len(values)), np.flatnonzero(located)])
+        counts = np.bincount(groups, minlength=n_groups)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        means = np.full((n_groups, len(MEASURES)), np.nan)
+        grid = np.full((n_groups, len(MEASURES), len(PERCENTILES)), np.nan)
+        filled = counts > 0
+        # Linear interpolation between order statistics, as np.percentile does
+        position = (PERCENTILES / 100)[None, :] * (counts[filled] - 1)[:, None]
+        below = np.floor(position).astype(np.int64)
+        fraction = position - below
+        above = np.minimum(below + 1, (counts[filled] - 1)[:, None])
+        for m in range(len(MEASURES)):
+            column = values[rows, m]
+            means[:, m] = np.bincount(groups, column, n_groups) / np.maximum(counts, 1)
+            ordered = column[np.lexsort((column, groups))]
+            low = ordered[starts[filled][:, None] + below]
+            high = ordered[starts[filled][:, None] + above]
+            grid[filled, m] = low + fraction * (high - low)
+        means[~filled] = np.nan
+        return cls(store.categories("Location"), store.categories("Country"), sites, site_groups, counts, means,
+                   grid, store.version)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format"]) != BASELINES_VERSION:
+                raise ValueError(f"{path}: unsupported baseline table version {int(data['format'])}")
+            return cls(data["locations"].astype(object), data["countries"].astype(object), data["sites"],
+                       data["site_groups"], data["counts"], data["means"], data["grid"], str(data["version"]))
+
+    def save(self, path):
+        np.savez_compressed(
+            path, format=BASELINES_VERSION, version=self.version, locations=self.locations.astype(str),
+            countries=self.countries.astype(str), sites=self.sites, site_groups=self.site_groups,
+            counts=self.counts, means=self.means, grid=self.grid,
+        )
+
+    def __len__(self):
+        """Number of groups."""
+        return len(self.counts)
+
+    def locations_in(self, country):
+        """Names of the locations recorded in ``country``, in code order."""
+        code = self._country_codes.get(country)
+        if code is None:
+            return []
+        return list(self.locations[self.sites[self._country_starts[code]:self._country_starts[code + 1], 1]])
+
+    def group(self, country=None, location=None):
+        """Baseline group of a location, falling back to its country and then to all rows."""
+        code = self._country_codes.get(country)
+        if code is None:
+            return GLOBAL
+        site = self._site_index.get((code, self._location_codes.get(location, -1)))
+        return int(self.site_groups[site]) if site is not None else 1 + code
+
+    def groups(self, countries, locations=None):
+        """``group`` for arrays of names, without a Python loop over rows."""
+        country_codes = pd.Categorical(countries, categories=self.countries).codes.astype(np.int64)
+        result = np.where(country_codes >= 0, 1 + country_codes, GLOBAL)
+        if locations is None or not len(self.sites):
+            return result
+        location_codes = pd.Categorical(locations, categories=self.locations).codes.astype(np.int64)
+        # Sites are sorted by (country, location) code, so the pair's key is found by binary search
+        width = max(len(self.locations), 1)
+        keys = self.sites[:, 0].astype(np.int64) * width + self.sites[:, 1]
+        wanted = country_codes * width + location_codes
+        found = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        hit = (keys[found] == wanted) & (country_codes >= 0) & (location_codes >= 0)
+        result[hit] = self.site_groups[found[hit]]
+        return result
+
+    def describe(self, group):
+        """Readable name of a group."""
+        if group == GLOBAL:
+            return "all locations"
+        if group <= len(self.countries):
+            return str(self.countries[group - 1])
+        site = int(np.flatnonzero(self.site_groups == group)[0])
+        country, location = self.sites[site]
+        return f"{self.locations[location]}, {self.countries[country]}"
+
+    def percentile(self, values, groups, measure):
+        """Percentile (0-100) of each of ``values`` within its group's baseline of ``measure``."""
+        m = MEASURES.index(measure)
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        grid = self.grid[np.broadcast_to(groups, values.shape), m].astype(np.float64)
+        return _interpolate_rank(grid, values)
+
+    def rank_everywhere(self, values):
+        """Percentile of one value per measure against every group's baseline.
+
+        ``values`` maps measure names to values; returns a DataFrame with one
+        row per country and per location with its own baseline, holding the
+        group's row count, and the baseline mean and percentile per measure.
+        """
+        columns = {"Baseline": [self.describe(g) for g in range(1, len(self))],
+                   "Rows": self.counts[1:]}
+        for measure, value in values.items():
+            m = MEASURES.index(measure)
+            grid = self.grid[1:, m].astype(np.float64)
+            columns[f"{measure} mean"] = self.means[1:, m]
+            columns[f"{measure} percentile"] = _interpolate_rank(grid, np.full(len(grid), value, dtype=np.float64))
+        return pd.DataFrame(columns)
+
+
+def _interpolate_rank(grid, values):
+    """Inverse of a percentile grid per row: where each value falls, linearly between grid points."""
+    above = (grid <= values[:, None]).sum(axis=1)
+    last = grid.shape[1] - 1
+    k = np.clip(above, 1, last)
+    rows = np.arange(len(values))
+    low, high = grid[rows, k - 1], grid[rows, k]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(high > low, (values - low) / (high - low), 1.0)
+    rank = PERCENTILES[k - 1] + np.clip(fraction, 0.0, 1.0)
+    rank = np.where(above == 0, 0.0, np.where(above > last, 100.0, rank))
+    return np.where(np.isnan(grid[:, 0]), np.nan, rank)
+
+
+def build_baselines(csv_path="climate_change_data.csv", path=None, min_location_rows=MIN_LOCATION_ROWS):
+    """Compute and save the baselines of the dataset at ``csv_path``."""
+    from climate_impact.store import open_store
+
+    baselines = Baselines.from_store(open_store(csv_path), min_location_rows)
+    baselines.save(path or baselines_path(csv_path))
+    return baselines
+
+
+def open_baselines(csv_path="climate_change_data.csv", rebuild=True):
+    """Return up-to-date baselines for ``csv_path``, building them if needed.
+
+    Returns ``None`` when they are stale or missing and ``rebuild`` is False.
+    """
+    from climate_impact.store import dataset_version
+
+    try:
+        baselines = Baselines.load(baselines_path(csv_path))
+        if baselines.version == dataset_version(csv_path):
+            return baselines
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_baselines(csv_path) if rebuild else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build per-country and per-location baselines of the dataset.")
+    parser.add_argument("csv", nargs="?", default="climate_change_data.csv")
+    parser.add_argument("--min-location-rows", type=int, default=MIN_LOCATION_ROWS,
+                        help="rows a location needs for its own baseline")
+    args = parser.parse_args(argv)
+    baselines = build_baselines(args.csv, min_location_rows=args.min_location_rows)
+    own = len(baselines) - 1 - len(baselines.countries)
+    print(f"Wrote {baselines_path(args.csv)}: {len(baselines.countries):,} countries, "
+          f"{len(baselines.sites):,} locations ({own:,} with their own baseline)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Prediction cache keyed on quantized inputs.
+
+The Home page sliders move in steps of 0.1, so identical parameter vectors
+recur across reruns and sessions. ``PredictionCache`` stores each model's
+prediction under the row's values rounded to that step, restricted to the
+columns the model was fit on (``ModelSchema.bind``), so a model that
+ignores a feature also ignores it in its key. Given the model's
+``intervals.LeafIntervals``, it caches the ``(point, low, high)`` triple
+instead, under keys of their own. Entries are bounded by an LRU size limit
+and an optional TTL, and a model's entries are dropped when the digest of
+its file changes.
+"""
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+from climate_impact.schema import MODEL_SCHEMAS, as_rows
+
+DEFAULT_MAXSIZE = 100_000
+DEFAULT_STEP = 0.1
+
+# path -> ((size, mtime_ns), digest), shared by every session thread
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def model_digest(path):
+    """SHA-256 of a model file, recomputed only when its size or mtime changes."""
+    stat = os.stat(path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        cached = _digests.get(path)
+    if cached is None or cached[0] != stamp:
+        # Hash outside the lock; two threads may both hash a changed file, and either result is right
+        with open(path, "rb") as f:
+            cached = (stamp, hashlib.sha256(f.read()).hexdigest())
+        with _digests_lock:
+            _digests[path] = cached
+    return cached[1]
+
+
+class PredictionCache:
+    """Thread-safe LRU/TTL cache of per-model predictions, shared across sessions."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=None, step=DEFAULT_STEP):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.step = step
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def quantize(self, rows):
+        """Round ``rows`` to the cache step; returns ``(integer keys, quantized values)``."""
+        steps = np.rint(np.asarray(rows, dtype=np.float64) / self.step).astype(np.int64)
+        return steps, (steps * self.step).astype(np.float32)
+
+    def _check_version(self, name, version):
+        """Drop ``name``'s entries if its model changed. Caller holds the lock."""
+        if self._versions.get(name) != version:
+            if name in self._versions:
+                stale = [key for key in self._entries if key[0] == name]
+                for key in stale:
+                    del self._entries[key]
+                self.invalidations += len(stale)
+            self._versions[name] = version
+
+    def predict(self, name, model, version, features):
+        """Predictions of ``model`` for a full feature matrix, served from the cache where possible."""
+        return self._predict(name, model, version, features, count=True)
+
+    def predict_with_intervals(self, name, model, version, intervals, features):
+        """Cached ``(point, low, high)`` of ``intervals.predict(model, features)``."""
+        return self._predict(name, model, version, features, count=True, intervals=intervals)
+
+    def _predict(self, name, model, version, features, count, intervals=None):
+        schema = MODEL_SCHEMAS[name].bind(model)
+        steps, quantized = self.quantize(as_rows(features))
+        # Interval triples are keyed apart from bare predictions of the same row
+        tag = (name,) if intervals is None else (name, "intervals")
+        keys = [tag + tuple(row) for row in schema.view(steps).tolist()]
+        out = np.empty((len(keys), 1 if intervals is None else 3), dtype=np.float32)
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(name, version)
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl is not None and now - entry[1] > self.ttl:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    out[i] = entry[0]
+            if count:
+                self.hits += len(keys) - len(missing)
+                self.misses += len(missing)
+        if missing:
+            if intervals is None:
+                out[missing, 0] = model.predict(schema.view(quantized[missing]))
+            else:
+                out[missing] = np.stack(intervals.predict(model, quantized[missing]), axis=1)
+            computed = out[missing, 0] if intervals is None else out[missing]
+            self._store(name, version, [keys[i] for i in missing], computed, now)
+        return out[:, 0] if intervals is None else tuple(out.T)
+
+    def predict_indices(self, model1, model2, versions, features, intervals=None):
+        """Cached ``(risk, severity)``; ``versions`` maps model name to its file digest.
+
+        With ``intervals``, the pair of ``LeafIntervals``, each index is a
+        ``(point, low, high)`` triple as from ``scoring.predict_with_intervals``.
+        """
+        if intervals is not None:
+            return (
+                self.predict_with_intervals("model1", model1, versions["model1"], intervals[0], features),
+                self.predict_with_intervals("model2", model2, versions["model2"], intervals[1], features),
+            )
+        return (
+            self.predict("model1", model1, versions["model1"], features),
+            self.predict("model2", model2, versions["model2"], features),
+        )
+
+    def _store(self, name, version, keys, values, now):
+        with self._lock:
+            if self._versions.get(name) != version:
+                return
+            # Scalars for predictions, lists for interval triples
+            for key, value in zip(keys, values.tolist()):
+                self._entries[key] = (value, now)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def warm(self, name, model, version, features, intervals=None):
+        """Pre-populate ``name``'s entries (its triples, given ``intervals``) for ``features``."""
+        # Warming is not user traffic, so it leaves the hit and miss counts alone
+        self._predict(name, model, version, features, count=False, intervals=intervals)
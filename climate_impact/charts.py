@@ -0,0 +1,155 @@
+"""Pre-rendered charts for the Home page.
+
+The gauges' colour bands never change, so ``GaugeStrip`` draws them once
+with Matplotlib's Agg canvas (outside pyplot, so no figure outlives the
+call) and keeps the pixels. Each prediction copies that background, paints
+the markers into it and encodes a PNG, and recently drawn marker positions
+are served from an LRU of encoded images. ``COMPARISON_SPEC`` is the
+Parameter Comparison chart as a constant Vega-Lite spec; only its data
+changes between reruns. ``CONTRIBUTION_SPEC`` and ``SENSITIVITY_SPEC`` draw
+the frames of ``climate_impact.explain`` the same way.
+"""
+from collections import OrderedDict
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+
+from climate_impact.scoring import RISK_BOUNDS, SEVERITY_BOUNDS
+from climate_impact.timing import timed
+
+BAND_COLORS = ("green", "yellow", "orange", "red")
+# (title, band edges) per gauge; the outer edges are the drawn axis range
+GAUGES = (
+    ("Climate Risk Index", (0,) + RISK_BOUNDS + (250,)),
+    ("Weather Severity Index", (0,) + SEVERITY_BOUNDS + (100,)),
+)
+# Matches st.pyplot's output: a 10x3 in figure saved at 200 dpi with a tight bbox
+FIGSIZE = (10, 3)
+DPI = 200
+MARKER_WIDTH_PT = 2
+MAX_CACHED_IMAGES = 256
+
+
+class GaugeStrip:
+    """Side-by-side band gauges rendered once, with markers composited per call."""
+
+    def __init__(self, gauges=GAUGES, figsize=FIGSIZE, dpi=DPI):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=figsize, dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        axes = fig.subplots(1, len(gauges), squeeze=False)[0]
+        for ax, (title, edges) in zip(axes, gauges):
+            for left, right, color in zip(edges[:-1], edges[1:], BAND_COLORS):
+                ax.barh([0], [right - left], left=left, color=color, height=0.5)
+            ax.set_xlim(edges[0], edges[-1])
+            ax.set_ylim(-0.5, 1)
+            ax.set_title(title)
+            ax.axis("off")
+        fig.tight_layout()
+        canvas.draw()
+        pixels = np.asarray(canvas.buffer_rgba())[:, :, :3]
+        height, width = pixels.shape[:2]
+        # Crop like savefig(bbox_inches="tight"), which pads by 0.1 in
+        bbox = fig.get_tightbbox(canvas.get_renderer()).padded(0.1)
+        x0, x1 = max(int(bbox.x0 * dpi), 0), min(int(np.ceil(bbox.x1 * dpi)), width)
+        top, bottom = max(height - int(np.ceil(bbox.y1 * dpi)), 0), min(height - int(bbox.y0 * dpi), height)
+        self.background = np.ascontiguousarray(pixels[top:bottom, x0:x1])
+        # Pixel geometry of each marker: value range -> columns, fixed rows
+        self._markers = []
+        for ax, (_, edges) in zip(axes, gauges):
+            (left, low), (right, high) = ax.transData.transform([(edges[0], -0.25), (edges[-1], 0.75)])
+            self._markers.append((edges[0], edges[-1], left - x0, right - x0,
+                                  height - int(round(high)) - top, height - int(round(low)) - top))
+        self._half_width = max(int(round(MARKER_WIDTH_PT * dpi / 72 / 2)), 1)
+        fig.clear()
+        del fig, canvas
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def columns(self, values):
+        """Pixel column of each gauge's marker, or None when off the scale."""
+        columns = []
+        for value, (lo, hi, left, right, _, _) in zip(values, self._markers):
+            value = float(value)
+            columns.append(int(round(left + (value - lo) / (hi - lo) * (right - left))) if lo <= value <= hi else None)
+        return tuple(columns)
+
+    def draw(self, values):
+        """The gauge image as an ``(h, w, 3)`` uint8 array with markers at ``values``."""
+        image = self.background.copy()
+        for column, (_, _, _, _, top, bottom) in zip(self.columns(values), self._markers):
+            if column is not None:
+                image[top:bottom, max(column - self._half_width, 0):column + self._half_width] = 0
+        return image
+
+    @timed("chart.gauges")
+    def png(self, values):
+        """PNG bytes of ``draw(values)``, cached by marker pixel position."""
+        from PIL import Image
+
+        key = self.columns(values)
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+        buffer = io.BytesIO()
+        Image.fromarray(self.draw(values)).save(buffer, format="PNG", compress_level=1)
+        encoded = buffer.getvalue()
+        with self._lock:
+            self._images[key] = encoded
+            while len(self._images) > MAX_CACHED_IMAGES:
+                self._images.popitem(last=False)
+        return encoded
+
+
+COMPARISON_SPEC = {
+    "mark": "bar",
+    "encoding": {
+        "x": {"field": "value", "type": "quantitative", "title": "Value"},
+        "y": {"field": "Parameter", "type": "nominal", "title": None},
+        "color": {"field": "variable", "type": "nominal", "legend": {"title": None}},
+        "row": {"field": "Parameter", "type": "nominal", "header": {"labelAngle": 0}},
+    },
+    "height": 40,
+    "resolve": {"scale": {"y": "independent"}},
+}
+
+
+def comparison_data(names, values, averages, labels=("Your Input", "Global Average")):
+    """Long-form rows for ``COMPARISON_SPEC``: each parameter's input, then its average."""
+    return pd.DataFrame({
+        "Parameter": list(names) * 2,
+        "variable": [labels[0]] * len(names) + [labels[1]] * len(names),
+        "value": list(values) + list(averages),
+    })
+
+
+# Long-form rows from ``explain.explain`` with the Baseline term left out
+CONTRIBUTION_SPEC = {
+    "mark": "bar",
+    "encoding": {
+        "x": {"field": "contribution", "type": "quantitative", "title": "Contribution"},
+        "y": {"field": "Parameter", "type": "nominal", "title": None, "sort": None},
+        "color": {"condition": {"test": "datum.contribution < 0", "value": "#2e7d32"}, "value": "#c62828"},
+        "column": {"field": "Index", "type": "nominal", "title": None},
+    },
+    "resolve": {"scale": {"x": "independent"}},
+}
+
+# Long-form rows from ``explain.sensitivity``, one panel per swept input
+SENSITIVITY_SPEC = {
+    "mark": "line",
+    "encoding": {
+        "x": {"field": "value", "type": "quantitative", "title": None},
+        "y": {"field": "score", "type": "quantitative", "title": "Index"},
+        "color": {"field": "Index", "type": "nominal", "legend": {"title": None, "orient": "bottom"}},
+        "facet": {"field": "Parameter", "type": "nominal", "columns": 3, "title": None, "sort": None},
+    },
+    "width": 150,
+    "height": 110,
+    "resolve": {"scale": {"x": "independent"}},
+}
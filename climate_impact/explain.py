@@ -0,0 +1,123 @@
+"""Why a prediction came out as it did: feature contributions and sensitivity sweeps.
+
+``contributions`` splits each index into one term per input plus a bias.
+For the learned engine that is the tree-path split of the compiled
+ensembles (``TreeEnsemble.contributions``); pickled models go through
+xgboost's ``pred_contribs`` with ``approx_contribs``, which computes the
+same thing. For the analytic engine each term is the input times its
+formula weight.
+
+``sensitivity`` varies one input at a time over its slider range, holding
+the others at the given row. The whole grid (``points`` per input) is
+scored with one ``scoring.predict_indices`` call, so a sweep costs two
+batched predictions regardless of the number of inputs.
+
+Usage::
+
+    python -m climate_impact.explain 15 400 0 50 50 25
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from climate_impact import analytic, scoring
+from climate_impact.schema import FEATURE_COLUMNS, FEATURES, MODEL_SCHEMAS, as_rows
+
+SWEEP_POINTS = 41
+_INDEX_MODELS = dict(zip(analytic.INDEX_NAMES, ("model1", "model2")))
+
+
+def contributions(model, name, features):
+    """``(terms, bias)``: ``(n_rows, len(FEATURES))`` contributions over the full columns and ``(n_rows,)``."""
+    schema = MODEL_SCHEMAS[name].bind(model)
+    rows = as_rows(features)
+    view = schema.view(rows)
+    if hasattr(model, "contributions"):
+        raw = model.contributions(view)
+    else:
+        import xgboost as xgb
+
+        matrix = xgb.DMatrix(view, feature_names=[str(c) for c in schema.columns])
+        raw = model.get_booster().predict(matrix, pred_contribs=True, approx_contribs=True)
+    terms = np.zeros((len(rows), len(FEATURES)))
+    terms[:, list(schema.indices)] = raw[:, :-1]
+    return terms, np.asarray(raw[:, -1], dtype=np.float64)
+
+
+def explain(model1, model2, features, engine="learned"):
+    """Long-form contributions of one input row to both indices.
+
+    Columns: ``Index``, ``Parameter`` (a feature column or ``Baseline`` for
+    the bias) and ``contribution``; each index's rows sum to its prediction.
+    """
+    row = as_rows(features)[:1]
+    frames = []
+    for index, name in _INDEX_MODELS.items():
+        if engine == "analytic":
+            terms = row.astype(np.float64) * analytic.WEIGHTS[:, analytic.INDEX_NAMES.index(index)]
+            bias = np.zeros(1)
+        else:
+            terms, bias = contributions(model1 if name == "model1" else model2, name, row)
+        frames.append(pd.DataFrame({
+            "Index": index,
+            "Parameter": list(FEATURE_COLUMNS) + ["Baseline"],
+            "contribution": np.append(terms[0], bias[0]),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def sweep_grid(features, points=SWEEP_POINTS):
+    """``(grid, values)``: rows varying one input at a time, and the ``(n_inputs, points)`` swept values.
+
+    Block ``i`` of ``points`` rows of ``grid`` sweeps input ``i`` from its
+    slider minimum to maximum with every other input as in ``features``.
+    """
+    row = as_rows(features)[0]
+    values = np.linspace([f.min_value for f in FEATURES], [f.max_value for f in FEATURES], points,
+                         dtype=row.dtype).T
+    grid = np.tile(row, (len(FEATURES) * points, 1))
+    grid[np.arange(len(grid)), np.repeat(np.arange(len(FEATURES)), points)] = values.ravel()
+    return grid, values
+
+
+def sensitivity(model1, model2, features, engine="learned", points=SWEEP_POINTS):
+    """Both indices along each input's sweep, long-form.
+
+    Columns: ``Parameter``, ``value`` (the swept input), ``Index`` and
+    ``score``.
+    """
+    grid, values = sweep_grid(features, points)
+    risk, severity = scoring.predict_indices(model1, model2, grid, engine)
+    parameters = np.repeat(np.asarray(FEATURE_COLUMNS, dtype=object), points)
+    return pd.DataFrame({
+        "Parameter": np.concatenate([parameters, parameters]),
+        "value": np.concatenate([values.ravel(), values.ravel()]).astype(np.float64),
+        "Index": np.repeat(analytic.INDEX_NAMES, len(grid)),
+        "score": np.concatenate([risk, severity]).astype(np.float64),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Explain the prediction for one row of inputs.")
+    parser.add_argument("values", type=float, nargs=len(FEATURES), metavar="VALUE",
+                        help="inputs in the order " + ", ".join(FEATURE_COLUMNS))
+    parser.add_argument("--model1", default="model1.npz")
+    parser.add_argument("--model2", default="model2.npz")
+    parser.add_argument("--engine", choices=scoring.ENGINES, default="learned")
+    args = parser.parse_args(argv)
+    model1, model2 = scoring.load_models(args.model1, args.model2)
+    table = explain(model1, model2, args.values, args.engine).pivot(index="Parameter", columns="Index",
+                                                                    values="contribution")
+    table = table.loc[list(FEATURE_COLUMNS) + ["Baseline"]]
+    table.loc["Prediction"] = table.sum()
+    print(table.round(3).to_string())
+    swept = sensitivity(model1, model2, args.values, args.engine).groupby(["Index", "Parameter"])["score"]
+    print("\nRange of each index as one input sweeps its slider range:")
+    print((swept.max() - swept.min()).unstack("Index").loc[list(FEATURE_COLUMNS)].round(2).to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""Pure-NumPy evaluator for the XGBoost tree ensembles.
+
+``export_model`` flattens a fitted ``XGBRegressor`` into packed arrays (one
+row of nodes per tree, leaves pointing back at themselves) saved as ``.npz``.
+``TreeEnsemble`` loads them and walks every tree for a whole batch at once,
+one level per step, so scoring needs neither xgboost nor a DMatrix.
+``contributions`` splits each prediction among the features along the
+same walk, from the training cover of every node.
+
+Usage::
+
+    python -m climate_impact.forest model1.pkl model1.npz
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+# Rows evaluated per step; keeps the (rows x trees) index matrices cache-sized
+BATCH_ROWS = 2048
+
+
+class TreeEnsemble:
+    """A gradient-boosted regression ensemble stored as flat node arrays.
+
+    ``feature``, ``threshold``, ``left``, ``right``, ``default_left`` and
+    ``value`` are ``(n_trees, n_nodes)`` arrays; child ids are global offsets
+    into the flattened node arrays. Leaves are their own children with a
+    +inf threshold, so every row can take exactly ``depth`` steps.
+    ``cover`` (training rows per node) is optional; files compiled before it
+    was recorded lack it and cannot explain predictions.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value, base_score, feature_names,
+                 cover=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.base_score = np.float32(base_score)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.n_trees, self.n_nodes = self.feature.shape
+        self.depth = _depth(self.left.ravel(), self.right.ravel(), self.n_trees, self.n_nodes)
+        self._roots = np.arange(self.n_trees, dtype=np.int32) * self.n_nodes
+        # Flat lookup tables: ``_children[2 * node + go_right]`` is the next node
+        self._feature = self.feature.ravel()
+        self._threshold = self.threshold.ravel()
+        self._default_right = ~self.default_left.ravel()
+        self._children = np.stack([self.left.ravel(), self.right.ravel()], axis=1).ravel()
+        self._value = self.value.ravel()
+        self.cover = None if cover is None else np.ascontiguousarray(cover, dtype=np.float32)
+        self._expected = None if cover is None else _expected_values(
+            self._children, self._value, self.cover.ravel(), self.n_trees, self.n_nodes)
+
+    @classmethod
+    def from_xgboost(cls, model):
+        """Flatten a fitted ``XGBRegressor`` (or ``Booster``)."""
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        raw = json.loads(booster.save_raw("json"))
+        learner = raw["learner"]
+        if learner["objective"]["name"] != "reg:squarederror":
+            raise ValueError(f"Unsupported objective {learner['objective']['name']}")
+        trees = learner["gradient_booster"]["model"]["trees"]
+        n_trees, n_nodes = len(trees), max(len(t["left_children"]) for t in trees)
+
+        feature = np.zeros((n_trees, n_nodes), dtype=np.int32)
+        threshold = np.full((n_trees, n_nodes), np.inf, dtype=np.float32)
+        # Padding nodes beyond a tree's size are unreachable self-loops
+        left = np.arange(n_trees * n_nodes, dtype=np.int32).reshape(n_trees, n_nodes)
+        right = left.copy()
+        default_left = np.ones((n_trees, n_nodes), dtype=bool)
+        value = np.zeros((n_trees, n_nodes), dtype=np.float32)
+        cover = np.zeros((n_trees, n_nodes), dtype=np.float32)
+        for t, tree in enumerate(trees):
+            size = len(tree["left_children"])
+            self_ids = left[t, :size].copy()
+            is_leaf = np.asarray(tree["left_children"]) == -1
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            feature[t, :size] = np.where(is_leaf, 0, tree["split_indices"])
+            threshold[t, :size] = np.where(is_leaf, np.inf, conditions)
+            left[t, :size] = np.where(is_leaf, self_ids, t * n_nodes + np.asarray(tree["left_children"]))
+            right[t, :size] = np.where(is_leaf, self_ids, t * n_nodes + np.asarray(tree["right_children"]))
+            default_left[t, :size] = np.asarray(tree["default_left"], dtype=bool) | is_leaf
+            value[t, :size] = np.where(is_leaf, conditions, 0.0)
+            cover[t, :size] = tree["sum_hessian"]
+
+        names = booster.feature_names or [f"f{i}" for i in range(booster.num_features())]
+        # xgboost >= 3 writes the base score as a one-element vector, "[1.3E2]"
+        base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+        return cls(feature, threshold, left, right, default_left, value, base_score, names, cover)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["feature"], data["threshold"], data["left"], data["right"], data["default_left"],
+                data["value"], data["base_score"], [str(n) for n in data["feature_names"]],
+                data["cover"] if "cover" in data.files else None,
+            )
+
+    def save(self, path):
+        optional = {} if self.cover is None else {"cover": self.cover}
+        np.savez_compressed(
+            path,
+            feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+            default_left=self.default_left, value=self.value, base_score=self.base_score,
+            feature_names=np.asarray([str(n) for n in self.feature_names_in_]), **optional,
+        )
+
+    def leaves(self, X):
+        """Return the global leaf id every row reaches in every tree, ``(n_rows, n_trees)``."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Feature shape mismatch, expected: {self.n_features_in_}, got {X.shape}")
+        flat = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.int32) * self.n_features_in_)[:, None]
+        has_missing = np.isnan(flat).any()
+        node = np.broadcast_to(self._roots, (len(X), self.n_trees))
+        for _ in range(self.depth):
+            x = flat.take(row_offsets + self._feature.take(node))
+            go_right = x >= self._threshold.take(node)
+            if has_missing:
+                go_right = np.where(np.isnan(x), self._default_right.take(node), go_right)
+            node = self._children.take(2 * node + go_right)
+        return node
+
+    def predict(self, X):
+        """Predict a batch; matches ``XGBRegressor.predict`` to float32 precision."""
+        return (self.leaf_sums(X, self._value)[0] + self.base_score).astype(np.float32)
+
+    def contributions(self, X):
+        """Per-feature contributions of every prediction, ``(n_rows, n_features + 1)`` float64.
+
+        Each split on a row's path credits its feature with the change in
+        the cover-weighted mean of the leaves below (the tree-path method
+        of ``Booster.predict(..., pred_contribs=True, approx_contribs=True)``).
+        The last column is the bias: the base score plus every tree's mean.
+        A row's contributions sum to its prediction.
+        """
+        if self._expected is None:
+            raise ValueError("This ensemble has no node covers; recompile it with climate_impact.forest")
+        X = np.asarray(X)
+        n_features = self.n_features_in_
+        out = np.zeros((len(X), n_features + 1), dtype=np.float64)
+        out[:, -1] = self.base_score + self._expected[self._roots].sum(dtype=np.float64)
+        for start in range(0, len(X), BATCH_ROWS):
+            batch = np.ascontiguousarray(X[start:start + BATCH_ROWS], dtype=np.float32)
+            flat = batch.ravel()
+            row_offsets = (np.arange(len(batch), dtype=np.int32) * n_features)[:, None]
+            has_missing = np.isnan(flat).any()
+            # Bins are (row, feature) pairs; leaves step to themselves and credit nothing
+            bins = np.arange(len(batch), dtype=np.int64)[:, None] * n_features
+            sums = np.zeros(len(batch) * n_features, dtype=np.float64)
+            node = np.broadcast_to(self._roots, (len(batch), self.n_trees))
+            for _ in range(self.depth):
+                feature = self._feature.take(node)
+                x = flat.take(row_offsets + feature)
+                go_right = x >= self._threshold.take(node)
+                if has_missing:
+                    go_right = np.where(np.isnan(x), self._default_right.take(node), go_right)
+                child = self._children.take(2 * node + go_right)
+                gain = self._expected.take(child) - self._expected.take(node)
+                sums += np.bincount((bins + feature).ravel(), gain.ravel(), len(sums))
+                node = child
+            out[start:start + len(batch), :-1] = sums.reshape(len(batch), n_features)
+        return out
+
+    def leaf_sums(self, X, *tables):
+        """Sum per-node ``tables`` over the leaves each row reaches, in one traversal.
+
+        Each table is a flat ``(n_trees * n_nodes,)`` array laid out like
+        ``value``; returns a float64 ``(len(tables), n_rows)`` array.
+        """
+        X = np.asarray(X)
+        out = np.empty((len(tables), len(X)), dtype=np.float64)
+        for start in range(0, len(X), BATCH_ROWS):
+            leaves = self.leaves(X[start:start + BATCH_ROWS])
+            for i, table in enumerate(tables):
+                out[i, start:start + BATCH_ROWS] = table.take(leaves).sum(axis=1, dtype=np.float64)
+        return out
+
+
+def _expected_values(children, value, cover, n_trees, n_nodes):
+    """Cover-weighted mean leaf value below every node, flat like ``value``."""
+    expected = value.astype(np.float64)
+    left, right = children[0::2], children[1::2]
+    internal = left != np.arange(n_trees * n_nodes)
+    # Children follow their parent within a tree, so one sweep from the last column up fills every node
+    for j in range(n_nodes - 1, -1, -1):
+        nodes = np.arange(n_trees) * n_nodes + j
+        nodes = nodes[internal[nodes]]
+        weights = cover[left[nodes]] + cover[right[nodes]]
+        expected[nodes] = np.where(
+            weights > 0,
+            (cover[left[nodes]] * expected[left[nodes]] + cover[right[nodes]] * expected[right[nodes]])
+            / np.where(weights > 0, weights, 1.0),
+            0.0,
+        )
+    return expected
+
+
+def _depth(left, right, n_trees, n_nodes):
+    """Number of steps needed for every root to reach a leaf."""
+    node = np.arange(n_trees) * n_nodes
+    frontier = np.concatenate([node, node])
+    depth = 0
+    while True:
+        children = np.concatenate([left[frontier], right[frontier]])
+        moving = children != np.concatenate([frontier, frontier])
+        if not moving.any():
+            return depth
+        frontier = children[moving]
+        depth += 1
+
+
+def export_model(model_path, output_path):
+    """Load a pickled XGBoost model and write its compiled ``.npz`` form."""
+    import joblib
+
+    ensemble = TreeEnsemble.from_xgboost(joblib.load(model_path))
+    ensemble.save(output_path)
+    return ensemble
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a pickled XGBoost model into NumPy arrays.")
+    parser.add_argument("model", help="pickled XGBRegressor, e.g. model1.pkl")
+    parser.add_argument("output", help="destination .npz file")
+    args = parser.parse_args(argv)
+    ensemble = export_model(args.model, args.output)
+    print(f"Wrote {args.output}: {ensemble.n_trees} trees, depth {ensemble.depth}, {ensemble.n_features_in_} features")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""Streaming ingestion of new station readings, with incremental model refresh.
+
+Readings have the CSV's schema (Date, Location, Country and the six
+measures). ``Ingestor`` buffers them and appends each batch of valid rows
+to the dataset store and CSV with ``store.append_rows``; rows with an
+unparseable date, no location or a measure outside the slider bounds are
+counted by reason and dropped. ``read_stream`` feeds it CSV lines as they
+arrive (a file, a pipe or stdin), flushing on batch size or age.
+
+``ModelRefresher`` runs on a background thread. Once enough rows have been
+appended since the latest models were trained, it continues boosting them
+(warm start: the existing trees are kept and new ones are added, fit on
+the notebook formulas) on the older rows and the new ones together, so
+the added trees do not chase the few new rows. A fifth of the new rows is
+held out; a quarter of the rest picks the number of trees to add, up to
+``rounds``, by stopping once their RMSE has not improved for
+``REFRESH_PATIENCE`` rounds, and the models are then refit with that many
+on every other row. A model that does worse on the held-out rows than
+before is kept as it was; if either improved, a new
+``artifacts/<version>/`` is published through ``training.write_artifacts``.
+The app and the prediction service follow ``artifacts/LATEST``, so they
+swap to the new models on their next request while calls already holding
+the old models finish with them.
+
+Usage::
+
+    tail -f readings.csv | python -m climate_impact.ingest - --refresh-every 600
+"""
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from climate_impact import analytic, store
+from climate_impact.schema import FEATURE_COLUMNS, MODEL_SCHEMAS, out_of_range
+
+INGEST_COLUMNS = (store.DATE_COLUMN,) + store.CATEGORICAL_COLUMNS + FEATURE_COLUMNS
+DEFAULT_BATCH_SIZE = 10_000
+# Oldest a buffered reading may get before its batch is flushed anyway
+DEFAULT_MAX_DELAY = 5.0
+DEFAULT_REFRESH_ROWS = 1_000
+# Most trees a refresh adds; it stops earlier once the validation rows stop improving for REFRESH_PATIENCE rounds
+DEFAULT_REFRESH_ROUNDS = 200
+REFRESH_PATIENCE = 10
+BUNDLED_MODELS = {"model1": "model1.pkl", "model2": "model2.pkl"}
+CONTINUED_PARAMS = ("objective", "learning_rate", "max_depth", "subsample", "colsample_bytree", "min_child_weight",
+                    "reg_alpha", "reg_lambda")
+# Serializes summary_catch_up calls that do not pass a lock of their own
+_catch_up_lock = threading.Lock()
+
+
+def validate(frame):
+    """``(valid rows, rejected counts by reason)``; raises ``KeyError`` if a column is missing."""
+    missing = [c for c in INGEST_COLUMNS if c not in frame.columns]
+    if missing:
+        raise KeyError(f"Missing columns: {', '.join(missing)}")
+    frame = frame[list(INGEST_COLUMNS)]
+    dates = pd.to_datetime(frame[store.DATE_COLUMN], format="mixed", errors="coerce")
+    bad_date = dates.isna().to_numpy()
+    no_location = frame[list(store.CATEGORICAL_COLUMNS)].isna().any(axis=1).to_numpy()
+    values = frame[list(FEATURE_COLUMNS)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32)
+    bad_values = out_of_range(values)
+    valid = ~(bad_date | no_location | bad_values)
+    rejected = {"date": int(bad_date.sum()), "location": int((no_location & ~bad_date).sum()),
+                "out of range": int((bad_values & ~bad_date & ~no_location).sum())}
+    frame = frame.assign(**{store.DATE_COLUMN: dates})
+    return frame[valid].reset_index(drop=True), {reason: n for reason, n in rejected.items() if n}
+
+
+class Ingestor:
+    """Batches readings into ``store.append_rows`` and tracks throughput.
+
+    ``on_batch(rows)`` is called with each appended batch. Safe to share
+    between threads; appends are serialised.
+    """
+
+    def __init__(self, csv_path="climate_change_data.csv", batch_size=DEFAULT_BATCH_SIZE, on_batch=None):
+        self.csv_path = csv_path
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.records = self.appended = self.batches = 0
+        self.rejected = {}
+        self.seconds = 0.0
+        self._pending = []
+        self._pending_rows = 0
+        self._lock = threading.Lock()
+
+    def submit(self, frame):
+        """Queue readings; appends whenever ``batch_size`` are waiting."""
+        with self._lock:
+            self._pending.append(frame)
+            self._pending_rows += len(frame)
+            if self._pending_rows >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        """Append whatever is queued."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        batch = pd.concat(self._pending, ignore_index=True)
+        self._pending, self._pending_rows = [], 0
+        rows, rejected = validate(batch)
+        if len(rows):
+            store.append_rows(self.csv_path, rows)
+        self.seconds += time.perf_counter() - start
+        self.records += len(batch)
+        self.appended += len(rows)
+        self.batches += 1
+        for reason, n in rejected.items():
+            self.rejected[reason] = self.rejected.get(reason, 0) + n
+        if self.on_batch is not None and len(rows):
+            self.on_batch(rows)
+
+    def stats(self):
+        return {
+            "records": self.records,
+            "appended": self.appended,
+            "rejected": dict(self.rejected),
+            "batches": self.batches,
+            "seconds": self.seconds,
+            "records_per_sec": self.records / self.seconds if self.seconds else 0.0,
+        }
+
+
+def read_stream(lines, ingestor, max_delay=DEFAULT_MAX_DELAY):
+    """Feed CSV ``lines`` (header first) to ``ingestor`` as they arrive, then flush.
+
+    A partial batch is submitted once its oldest line is ``max_delay``
+    seconds old, checked as each line arrives.
+    """
+    lines = iter(lines)
+    header = next(lines, None)
+    if header is None:
+        return ingestor.stats()
+    buffered, oldest = [], None
+    for line in lines:
+        if not line.strip():
+            continue
+        buffered.append(line)
+        oldest = oldest or time.monotonic()
+        if len(buffered) >= ingestor.batch_size or time.monotonic() - oldest >= max_delay:
+            ingestor.submit(pd.read_csv(io.StringIO(header + "".join(buffered))))
+            buffered, oldest = [], None
+    if buffered:
+        ingestor.submit(pd.read_csv(io.StringIO(header + "".join(buffered))))
+    ingestor.flush()
+    return ingestor.stats()
+
+
+class ModelRefresher:
+    """Continue boosting the latest models on newly ingested rows, on a daemon thread."""
+
+    def __init__(self, csv_path="climate_change_data.csv", output=None, every=600.0,
+                 min_rows=DEFAULT_REFRESH_ROWS, rounds=DEFAULT_REFRESH_ROUNDS, threads=None, log=print):
+        from climate_impact.training import ARTIFACTS_DIR
+
+        self.csv_path = csv_path
+        self.output = output or ARTIFACTS_DIR
+        self.every = every
+        self.min_rows = min_rows
+        self.rounds = rounds
+        self.threads = threads or os.cpu_count() or 1
+        self.log = log
+        self.refreshes = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def poke(self):
+        """Check for enough new rows now instead of at the next interval."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.every)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                self.log(f"Model refresh failed: {e}")
+
+    def base(self):
+        """``(pickled model paths, rows they were trained on, version)`` of the latest models."""
+        from climate_impact.training import latest_artifacts, verify_artifacts
+
+        directory = latest_artifacts(self.output)
+        if directory is not None:
+            manifest, _, _ = verify_artifacts(directory)
+            paths = {name: os.path.join(directory, entry["files"]["pkl"]["path"])
+                     for name, entry in manifest["models"].items()}
+            return paths, manifest["data"]["rows"], manifest["version"]
+        # The bundled models were fit on the CSV as shipped
+        opened = store.open_store(self.csv_path)
+        return dict(BUNDLED_MODELS), opened.meta.get("base_rows", len(opened)), None
+
+    def _rounds(self, previous, X, target, fit, validation):
+        """Trees to add to ``previous``: boost until ``validation`` RMSE stops improving, at most ``rounds``."""
+        import xgboost as xgb
+
+        probe = xgb.XGBRegressor(**_continued_params(previous), n_estimators=self.rounds,
+                                 early_stopping_rounds=REFRESH_PATIENCE, n_jobs=self.threads)
+        probe.fit(X.iloc[fit], target[fit], eval_set=[(X.iloc[validation], target[validation])],
+                  xgb_model=previous.get_booster(), verbose=False)
+        # best_iteration counts the previous trees too
+        return max(probe.best_iteration + 1 - previous.get_booster().num_boosted_rounds(), 1)
+
+    def refresh(self):
+        """Refresh now if enough rows are new; returns the new artifact directory or None."""
+        import joblib
+        import xgboost as xgb
+
+        from climate_impact.training import TrainResult, file_sha256, regression_metrics, write_artifacts
+
+        with self._lock:
+            started = time.perf_counter()
+            paths, trained_rows, parent = self.base()
+            opened = store.open_store(self.csv_path)
+            if len(opened) - trained_rows < self.min_rows:
+                self.log(f"{len(opened) - trained_rows:,} new rows; waiting for {self.min_rows:,}")
+                return None
+            rows = opened.to_frame(list(FEATURE_COLUMNS))
+            targets = dict(zip(analytic.INDEX_NAMES, analytic.predict_indices(rows.to_numpy(dtype=np.float32))))
+            n_new = len(rows) - trained_rows
+            # New rows: a fifth held out to judge the refresh, a quarter of the rest to stop boosting early
+            order = trained_rows + np.random.default_rng(len(opened)).permutation(n_new)
+            holdout, rest = order[:n_new // 5], order[n_new // 5:]
+            validation = rest[:len(rest) // 4]
+            fit = np.concatenate([np.arange(trained_rows), rest])
+            finals = []
+            for name, path in paths.items():
+                previous = joblib.load(path)
+                columns = [str(c) for c in previous.feature_names_in_]
+                target = targets[MODEL_SCHEMAS[name].target]
+                X = rows[columns].astype(np.float32)
+                before, before_r2 = regression_metrics(target[holdout], previous.predict(X.iloc[holdout]))
+                fit_start = time.perf_counter()
+                added = self._rounds(previous, X, target, np.setdiff1d(fit, validation), validation)
+                model = xgb.XGBRegressor(**_continued_params(previous), n_estimators=added, n_jobs=self.threads)
+                model.fit(X.iloc[fit], target[fit], xgb_model=previous.get_booster())
+                seconds = time.perf_counter() - fit_start
+                rmse, r2 = regression_metrics(target[holdout], model.predict(X.iloc[holdout]))
+                # A continuation that does worse on the held-out rows is dropped
+                kept = rmse > before
+                if kept:
+                    model, rmse, r2 = previous, before, before_r2
+                params = {"warm_start_rounds": 0 if kept else added,
+                          "n_trees": model.get_booster().num_boosted_rounds(), "new_rows": n_new,
+                          "holdout_rmse_before": before, "kept_previous": kept}
+                finals.append(TrainResult(name, params, rmse, r2, len(fit), len(holdout), seconds, model))
+            if all(result.params["kept_previous"] for result in finals):
+                self.log(f"No model improved on {n_new:,} new rows; keeping {parent or 'the bundled models'}")
+                return None
+            data_hash = file_sha256(self.csv_path)
+            version = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{data_hash[:8]}"
+            # The held-out new rows are unseen by the previous and the continued models alike
+            features = rows.to_numpy(dtype=np.float32)
+            calibration = (features[fit], features[holdout])
+            directory = write_artifacts(self.output, version, self.csv_path, data_hash, len(opened), finals, {},
+                                        None, time.perf_counter() - started, calibration, parent=parent)
+            self.refreshes += 1
+            for result in finals:
+                outcome = "kept" if result.params["kept_previous"] else "refreshed"
+                self.log(f"{result.name} {outcome} on {n_new:,} new rows: holdout RMSE "
+                         f"{result.params['holdout_rmse_before']:.3f} -> {result.rmse:.3f} ({directory})")
+            return directory
+
+
+def _continued_params(model):
+    """Hyperparameters to keep boosting ``model`` with.
+
+    Read from the estimator's attributes: ``get_params`` fails on models
+    pickled by older xgboost releases, like the bundled ones.
+    """
+    params = {key: getattr(model, key, None) for key in CONTINUED_PARAMS}
+    return {key: value for key, value in params.items() if value is not None}
+
+
+def summary_catch_up(cube, csv_path="climate_change_data.csv", lock=None):
+    """Fold rows appended to the store since ``cube`` last saw them into ``cube``.
+
+    ``cube`` is a ``SummaryCube`` keyed on ``Year``, or ``tiers.Tiers``,
+    whose ``rows`` count the store rows it has seen. Callers sharing
+    ``cube`` across threads must share ``lock``; without one, every call
+    takes a module-wide lock. Returns the number of rows added.
+    """
+    opened = store.open_store(csv_path, rebuild=False)
+    if opened is None or len(opened) <= cube.rows:
+        return 0
+    with lock or _catch_up_lock:
+        if len(opened) <= cube.rows:
+            return 0
+        new = opened.to_frame(start=cube.rows)
+        new = new.assign(Year=new[store.DATE_COLUMN].dt.year.astype(np.int32))
+        cube.update(new)
+        return len(new)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append new readings to the dataset and refresh the models.")
+    parser.add_argument("source", help="CSV of readings with the dataset's columns, or - for stdin")
+    parser.add_argument("--dataset", default="climate_change_data.csv")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-delay", type=float, default=DEFAULT_MAX_DELAY,
+                        help="seconds a reading may wait for its batch to fill")
+    parser.add_argument("--refresh-every", type=float,
+                        help="seconds between background model refreshes (default: no refresh)")
+    parser.add_argument("--refresh-rows", type=int, default=DEFAULT_REFRESH_ROWS,
+                        help="new rows needed before a refresh")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_REFRESH_ROUNDS, help="most boosting rounds a refresh adds")
+    parser.add_argument("--refresh-now", action="store_true", help="refresh once after ingesting")
+    args = parser.parse_args(argv)
+
+    refresher = None
+    if args.refresh_every or args.refresh_now:
+        refresher = ModelRefresher(args.dataset, every=args.refresh_every or float("inf"),
+                                   min_rows=args.refresh_rows, rounds=args.rounds)
+        if args.refresh_every:
+            refresher.start()
+
+    def report(rows):
+        stats = ingestor.stats()
+        print(f"Appended {len(rows):,} rows; {stats['records']:,} records at {stats['records_per_sec']:,.0f} records/sec")
+
+    ingestor = Ingestor(args.dataset, args.batch_size, on_batch=report)
+    source = sys.stdin if args.source == "-" else open(args.source)
+    try:
+        stats = read_stream(source, ingestor, args.max_delay)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    rejected = ", ".join(f"{n:,} {reason}" for reason, n in stats["rejected"].items()) or "none"
+    print(f"Ingested {stats['appended']:,} of {stats['records']:,} records in {stats['batches']} batches "
+          f"({stats['records_per_sec']:,.0f} records/sec); rejected: {rejected}")
+    if refresher is not None:
+        if args.refresh_now:
+            if refresher.refresh() is None:
+                print("Models not refreshed")
+        refresher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""Prediction intervals for the compiled tree ensembles.
+
+Every leaf of every tree stores the lower and upper quantile of the
+residuals (true index minus prediction) of the calibration rows that reach
+it. A row's band is the mean of those quantiles over the leaves it reaches,
+so it is read off the same traversal as the point prediction
+(``TreeEnsemble.leaf_sums``): one pass, five sums instead of one. Leaves
+reached by too few rows fall back to the quantiles of all residuals.
+
+The true indices are the notebook formulas (``climate_impact.analytic``).
+Calibration rows must be rows the model was not fit on, or the residuals
+are too small and so are the bands: for the bundled models that is the
+notebook's held-out test split (``notebook_split``), for trained artifacts
+the pipeline's test split. Uniform probes over the slider bounds that fall
+outside the range of the training data calibrate the rows beyond it. The
+trees are accurate inside that range and cannot extrapolate beyond it, so
+rows inside and outside get separate tables and margins; a shared table
+would lend the extrapolation error to every in-range row.
+
+Half the rows of each group fill its tables, a quarter set a
+split-conformal margin so that ``coverage`` of them fall inside, and the
+last quarter, used for neither, measures the coverage actually reached
+(``calibration``). That measured coverage is what the app and CLI report.
+Tables are stored next to the model with its digest and are small enough
+to commit.
+
+Usage::
+
+    python -m climate_impact.intervals model1.npz
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from climate_impact import analytic
+from climate_impact.cache import model_digest
+from climate_impact.schema import FEATURE_COLUMNS, FEATURE_DTYPE, FEATURES, MODEL_SCHEMAS, as_rows
+from climate_impact.scoring import load_model
+
+INTERVALS_VERSION = 2
+DEFAULT_COVERAGE = 0.9
+# Shares of each group's calibration rows: leaf tables, conformal margin, and the rest to measure coverage
+FILL_SHARE, MARGIN_SHARE = 0.5, 0.25
+# The notebook's train_test_split
+NOTEBOOK_TEST_SIZE, NOTEBOOK_SEED = 0.2, 42
+# Leaves reached by fewer calibration rows use the global residual quantiles
+MIN_LEAF_ROWS = 20
+# Calibration groups, indexed by whether a row is inside the data's range
+GROUPS = ("outside", "inside")
+
+
+def intervals_path(model_path):
+    """File the interval tables for ``model_path`` live in."""
+    return os.path.splitext(model_path)[0] + ".intervals.npz"
+
+
+class LeafIntervals:
+    """Per-leaf residual quantiles and conformal margins for one ensemble.
+
+    ``lower``, ``upper`` are ``(2, n_trees * n_nodes)`` and ``margin`` is
+    ``(2,)``, indexed by ``GROUPS``; ``support`` is the ``(2, n_columns)``
+    box of the data, over the columns the model was fit on.
+    """
+
+    def __init__(self, name, lower, upper, margin, support, coverage, model, calibration=None):
+        self.name = name
+        self.lower = np.ascontiguousarray(lower, dtype=np.float32)
+        self.upper = np.ascontiguousarray(upper, dtype=np.float32)
+        self.margin = np.asarray(margin, dtype=np.float64)
+        self.support = np.asarray(support, dtype=FEATURE_DTYPE)
+        self.coverage = float(coverage)
+        self.model = str(model)
+        # Per group: (coverage, mean width, rows) measured on calibration rows used for neither tables nor margin
+        self.calibration = dict(calibration or {})
+
+    def measured_coverage(self, group="inside"):
+        """Coverage reached on the evaluation rows of ``group``, or None if it had none."""
+        entry = self.calibration.get(group)
+        return entry[0] if entry else None
+
+    @classmethod
+    def fit(cls, model, name, rows, targets, support_rows, coverage=DEFAULT_COVERAGE, model_version="", seed=0):
+        """Fit to full feature ``rows``, which the model was not fit on, with true ``targets``.
+
+        ``support_rows`` are the rows the model was fit on (full features);
+        their bounding box separates the two groups.
+        """
+        schema = MODEL_SCHEMAS[name].bind(model)
+        rows = as_rows(rows)
+        view = schema.view(rows)
+        support = _support(schema.view(as_rows(support_rows)))
+        residuals = np.asarray(targets, dtype=np.float64) - model.predict(view)
+        inside = ((view >= support[0]) & (view <= support[1])).all(axis=1)
+        alpha = (1.0 - coverage) / 2
+        order = np.random.default_rng(seed).permutation(len(rows))
+        first, second = int(len(order) * FILL_SHARE), int(len(order) * (FILL_SHARE + MARGIN_SHARE))
+        fill, hold, evaluate = order[:first], order[first:second], order[second:]
+
+        lower = np.zeros((len(GROUPS), model.n_trees * model.n_nodes))
+        upper = np.zeros_like(lower)
+        for group in range(len(GROUPS)):
+            rows_in = fill[inside[fill] == group]
+            if len(rows_in):
+                lower[group], upper[group] = _leaf_quantiles(model, view[rows_in], residuals[rows_in],
+                                                             (alpha, 1.0 - alpha))
+        intervals = cls(name, lower, upper, np.zeros(len(GROUPS)), support, coverage, model_version)
+
+        point, low, high = intervals.predict(model, rows[hold])
+        truth = point + residuals[hold]
+        # Split-conformal: shift each group's bands until ``coverage`` of its margin rows fall inside
+        scores = np.maximum(low - truth, truth - high)
+        for group in range(len(GROUPS)):
+            mask = inside[hold] == group
+            if not mask.any():
+                continue
+            level = min(np.ceil((mask.sum() + 1) * coverage) / mask.sum(), 1.0)
+            margin = float(np.quantile(scores[mask], level, method="higher"))
+            # A negative margin narrows the band, but never past its midpoint
+            intervals.margin[group] = max(margin, -float(((high - low)[mask] / 2).min()))
+
+        # Coverage is measured on rows that shaped neither the tables nor the margins
+        point, low, high = intervals.predict(model, rows[evaluate])
+        truth = point + residuals[evaluate]
+        for group, label in enumerate(GROUPS):
+            mask = inside[evaluate] == group
+            if mask.any():
+                covered = (truth[mask] >= low[mask]) & (truth[mask] <= high[mask])
+                intervals.calibration[label] = (float(covered.mean()), float((high - low)[mask].mean()),
+                                                int(mask.sum()))
+        return intervals
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != INTERVALS_VERSION:
+                raise ValueError(f"{path}: unsupported interval table version {int(data['version'])}")
+            calibration = {str(k): (float(c), float(w), int(n)) for k, c, w, n in
+                           zip(data["calibration_groups"], data["calibration_coverage"], data["calibration_width"],
+                               data["calibration_rows"])}
+            return cls(str(data["name"]), data["lower"], data["upper"], data["margin"], data["support"],
+                       float(data["coverage"]), str(data["model"]), calibration)
+
+    def save(self, path):
+        groups = [g for g in GROUPS if g in self.calibration]
+        np.savez_compressed(
+            path, version=INTERVALS_VERSION, name=self.name, lower=self.lower, upper=self.upper,
+            margin=self.margin, support=self.support, coverage=self.coverage, model=self.model,
+            calibration_groups=np.asarray(groups, dtype=str),
+            calibration_coverage=np.asarray([self.calibration[g][0] for g in groups]),
+            calibration_width=np.asarray([self.calibration[g][1] for g in groups]),
+            calibration_rows=np.asarray([self.calibration[g][2] for g in groups], dtype=np.int64),
+        )
+
+    def inside(self, model, features):
+        """Boolean mask of rows within the range of the data the model was fit on."""
+        view = MODEL_SCHEMAS[self.name].bind(model).view(as_rows(features))
+        return ((view >= self.support[0]) & (view <= self.support[1])).all(axis=1)
+
+    def predict(self, model, features):
+        """``(point, lower, upper)`` float32 arrays for a full feature matrix, in one traversal."""
+        view = MODEL_SCHEMAS[self.name].bind(model).view(as_rows(features))
+        point, *bands = model.leaf_sums(view, model.value.ravel(), *self.lower, *self.upper)
+        point += model.base_score
+        group = ((view >= self.support[0]) & (view <= self.support[1])).all(axis=1).astype(np.intp)
+        rows = np.arange(len(view))
+        # Bands are stacked (lower per group, upper per group)
+        bands = np.asarray(bands) / model.n_trees
+        margin = self.margin[group]
+        # Residuals beyond the data are one-sided; keep the estimate itself inside its band
+        low = np.minimum(point + bands[group, rows] - margin, point)
+        high = np.maximum(point + bands[len(GROUPS) + group, rows] + margin, point)
+        return point.astype(np.float32), low.astype(np.float32), high.astype(np.float32)
+
+
+def _support(view):
+    """``(2, n_columns)`` bounding box of ``view``'s rows."""
+    return np.stack([view.min(axis=0), view.max(axis=0)])
+
+
+def _leaf_quantiles(model, view, residuals, quantiles):
+    """Per-node residual quantiles of the rows reaching each leaf, flat like ``model.value``."""
+    leaves = model.leaves(view).ravel()
+    repeated = np.repeat(residuals, model.n_trees)
+    order = np.lexsort((repeated, leaves))
+    leaves, repeated = leaves[order], repeated[order]
+    counts = np.bincount(leaves, minlength=model.n_trees * model.n_nodes)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    enough = counts >= MIN_LEAF_ROWS
+    tables = []
+    for q in quantiles:
+        table = np.full(len(counts), np.quantile(residuals, q), dtype=np.float64)
+        # Nearest-rank quantile within each leaf's sorted run of residuals
+        table[enough] = repeated[starts[enough] + np.floor(q * (counts[enough] - 1)).astype(np.int64)]
+        tables.append(table)
+    return tables
+
+
+def notebook_split(dataset="climate_change_data.csv"):
+    """``(train, test)`` feature rows of the bundled models, split as in Untitled.ipynb.
+
+    The notebook split the CSV as shipped; rows appended since by
+    ``climate_impact.ingest`` are in neither.
+    """
+    from sklearn.model_selection import train_test_split
+
+    from climate_impact.scoring import feature_matrix
+    from climate_impact.store import load_dataset, open_store
+
+    rows = feature_matrix(load_dataset(dataset, columns=list(FEATURE_COLUMNS)))
+    try:
+        rows = rows[:open_store(dataset, rebuild=False).meta.get("base_rows", len(rows))]
+    except Exception:
+        pass
+    train, test = train_test_split(np.arange(len(rows)), test_size=NOTEBOOK_TEST_SIZE, random_state=NOTEBOOK_SEED)
+    return rows[train], rows[test]
+
+
+def uniform_probes(n, seed=0):
+    """``n`` rows drawn uniformly over the slider bounds."""
+    rng = np.random.default_rng(seed)
+    lo = np.array([f.min_value for f in FEATURES])
+    hi = np.array([f.max_value for f in FEATURES])
+    return rng.uniform(lo, hi, (n, len(FEATURES))).astype(FEATURE_DTYPE)
+
+
+def build_intervals(model_path, name, path=None, dataset="climate_change_data.csv", coverage=DEFAULT_COVERAGE,
+                    fit_rows=None, held_out=None):
+    """Calibrate and save interval tables for the model in ``model_path``.
+
+    ``fit_rows`` are the feature rows the model was trained on and
+    ``held_out`` rows it never saw; both default to ``notebook_split``.
+    """
+    model = load_model(model_path)
+    if not hasattr(model, "leaf_sums"):
+        raise ValueError(f"{model_path}: intervals need a compiled .npz ensemble")
+    if fit_rows is None or held_out is None:
+        fit_rows, held_out = notebook_split(dataset)
+    # Probes only stand in for rows beyond the training data; inside it the held-out rows are the real thing
+    schema = MODEL_SCHEMAS[name].bind(model)
+    support = _support(schema.view(as_rows(fit_rows)))
+    probes = uniform_probes(len(held_out))
+    probe_view = schema.view(probes)
+    probes = probes[~((probe_view >= support[0]) & (probe_view <= support[1])).all(axis=1)]
+    rows = np.concatenate([as_rows(held_out), probes])
+    target = analytic.INDEX_NAMES.index(MODEL_SCHEMAS[name].target)
+    targets = analytic.predict_indices(rows)[target]
+    intervals = LeafIntervals.fit(model, name, rows, targets, fit_rows, coverage, model_digest(model_path))
+    intervals.save(path or intervals_path(model_path))
+    return intervals
+
+
+def open_intervals(model_path, name, rebuild=True):
+    """Return the up-to-date interval tables for ``model_path``, calibrating them if needed.
+
+    Tables calibrated against a different model file are stale. Returns
+    ``None`` when they are stale or missing and ``rebuild`` is False.
+    """
+    try:
+        intervals = LeafIntervals.load(intervals_path(model_path))
+        if intervals.name == name and intervals.model == model_digest(model_path):
+            return intervals
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_intervals(model_path, name) if rebuild else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate prediction intervals for a compiled model.")
+    parser.add_argument("model", help="compiled .npz model")
+    parser.add_argument("output", nargs="?", help="table file (default: <model>.intervals.npz)")
+    parser.add_argument("--name", choices=sorted(MODEL_SCHEMAS),
+                        help="model schema (default: from the file name)")
+    parser.add_argument("--dataset", default="climate_change_data.csv")
+    parser.add_argument("--coverage", type=float, default=DEFAULT_COVERAGE)
+    args = parser.parse_args(argv)
+    name = args.name or os.path.splitext(os.path.basename(args.model))[0]
+    if name not in MODEL_SCHEMAS:
+        parser.error(f"cannot infer the schema from {args.model}; pass --name")
+    intervals = build_intervals(args.model, name, args.output, args.dataset, args.coverage)
+    print(f"Wrote {args.output or intervals_path(args.model)}, calibrated for {intervals.coverage:.0%} coverage")
+    for group, (covered, width, rows) in intervals.calibration.items():
+        print(f"  {group} the data's range: {covered:.1%} of {rows:,} held-out rows covered, mean width {width:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""Background analysis jobs for the Analytics page.
+
+``JobRunner`` runs analyses in a process pool so the Streamlit script
+thread only polls for progress. An analysis is split into one task per
+year; each worker memory-maps the dataset store once and returns partial
+sums, which are merged when every year is in. Finished results are kept in
+an LRU cache, and a request for a key that is already running joins the
+running job, so concurrent sessions share the work. A job that fails is
+dropped, so the next identical request starts afresh, and a pool broken by
+a dying worker is replaced.
+
+Workers key their memory-mapped dataset on the request's ``version``, so
+rows appended since (``climate_impact.ingest``) are seen by the next
+request that carries the new version.
+"""
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+import multiprocessing
+import threading
+
+import numpy as np
+import pandas as pd
+
+from climate_impact import analytic
+from climate_impact.analytics import COUNTRY_COLUMN, GLOBAL, YEAR_COLUMN, fit_lines, with_indices
+
+DEFAULT_CACHE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class CorrelationRequest:
+    """Relationship between two parameters over the last ``years`` years of a region."""
+
+    column1: str
+    column2: str
+    years: int
+    region: str = GLOBAL
+    csv_path: str = "climate_change_data.csv"
+    version: str = ""
+
+
+# Per-process dataset, opened on first use: (csv_path, version) -> TimeIndex
+_worker_index = {}
+_worker_lock = threading.Lock()
+
+
+def _time_index(csv_path, version=""):
+    """The dataset at ``csv_path`` as of ``version``; older versions are dropped."""
+    key = (csv_path, version)
+    with _worker_lock:
+        index = _worker_index.get(key)
+        if index is None:
+            from climate_impact.store import load_dataset
+            from climate_impact.timeindex import TimeIndex
+
+            for stale in [k for k in _worker_index if k[0] == csv_path]:
+                del _worker_index[stale]
+            index = _worker_index[key] = TimeIndex(load_dataset(csv_path))
+        return index
+
+
+def year_range(request):
+    """``(first, last)`` years covered by ``request``."""
+    index = _time_index(request.csv_path, request.version)
+    return max(index.min_year, index.max_year - request.years + 1), index.max_year
+
+
+def correlation_partial(request, year):
+    """Sums needed to merge means and a Pearson correlation, for one year."""
+    rows = _time_index(request.csv_path, request.version).between(year, year)
+    if request.region != GLOBAL:
+        rows = rows[rows[COUNTRY_COLUMN] == request.region]
+    if {request.column1, request.column2} & set(analytic.INDEX_NAMES):
+        rows = with_indices(rows)
+    x = rows[request.column1].to_numpy(dtype=np.float64)
+    y = rows[request.column2].to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    return np.array([year, len(x), x.sum(), y.sum(), (x * x).sum(), (y * y).sum(), (x * y).sum()])
+
+
+def merge_correlation(request, partials):
+    """Combine per-year sums into yearly means, trends and the correlation."""
+    stats = np.array(sorted(partials, key=lambda p: p[0]))
+    years, n, sx, sy, sxx, syy, sxy = stats.T
+    total = stats[:, 1:].sum(axis=0)
+    count, tx, ty, txx, tyy, txy = total
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = txy - tx * ty / count
+        correlation = covariance / np.sqrt((txx - tx * tx / count) * (tyy - ty * ty / count))
+        regression_slope = covariance / (txx - tx * tx / count)
+        yearly = pd.DataFrame({
+            YEAR_COLUMN: years.astype(int),
+            request.column1: sx / n,
+            request.column2: sy / n,
+            "Readings": n.astype(int),
+        })
+    means = yearly[[request.column1, request.column2]].to_numpy()[None]
+    slope, _ = fit_lines(years, means, (n > 0).astype(np.float64)[None])
+    return {
+        "yearly": yearly[yearly["Readings"] > 0].reset_index(drop=True),
+        "readings": int(count),
+        "correlation": float(correlation),
+        "regression_slope": float(regression_slope),
+        "slope1": float(slope[0, 0]),
+        "slope2": float(slope[0, 1]),
+    }
+
+
+class Job:
+    """A running (or finished) analysis split into per-year tasks."""
+
+    def __init__(self, request, futures, on_done):
+        self.request = request
+        self._futures = futures
+        self._on_done = on_done
+        self._result = None
+        self._lock = threading.Lock()
+
+    @property
+    def progress(self):
+        if not self._futures:
+            return 1.0
+        return sum(f.done() for f in self._futures) / len(self._futures)
+
+    def done(self):
+        return all(f.done() for f in self._futures)
+
+    def failed(self):
+        """Whether any task has finished with an error."""
+        return any(f.done() and not f.cancelled() and f.exception() is not None for f in self._futures)
+
+    def wait(self, timeout=None):
+        """Block until another task finishes, or ``timeout`` seconds pass."""
+        pending = [f for f in self._futures if not f.done()]
+        if pending:
+            wait(pending, timeout, return_when=FIRST_COMPLETED)
+
+    def result(self, timeout=None):
+        """Merged result; blocks until every task has finished and re-raises task errors."""
+        with self._lock:
+            if self._result is None:
+                try:
+                    partials = [f.result(timeout) for f in self._futures]
+                    self._result = merge_correlation(self.request, partials)
+                except TimeoutError:
+                    # Still running; the job stays joinable
+                    raise
+                except BaseException as error:
+                    self._on_done(self, error)
+                    raise
+                self._on_done(self)
+            return self._result
+
+
+class JobRunner:
+    """Process pool plus an LRU of finished results, shared across sessions."""
+
+    def __init__(self, max_workers=None, cache_size=DEFAULT_CACHE_SIZE):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._executor = None
+        self._running = {}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn: forking a threaded Streamlit server is not safe
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def cached(self, request):
+        """Finished result for ``request``, or None."""
+        with self._lock:
+            result = self._results.get(request)
+            if result is not None:
+                self._results.move_to_end(request)
+                self.hits += 1
+            return result
+
+    def submit(self, request):
+        """Start ``request`` (or join the identical running job) and return its ``Job``."""
+        with self._lock:
+            job = self._running.get(request)
+            if job is not None and not job.failed():
+                return job
+            self.misses += 1
+            first, last = year_range(request)
+            try:
+                futures = self._submit_years(request, first, last)
+            except BrokenProcessPool:
+                # A worker died since the last job; start a new pool and try once more
+                self._reset_pool()
+                futures = self._submit_years(request, first, last)
+            job = self._running[request] = Job(request, futures, self._finish)
+            return job
+
+    def _submit_years(self, request, first, last):
+        pool = self._pool()
+        return [pool.submit(correlation_partial, request, year) for year in range(first, last + 1)]
+
+    def _reset_pool(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _finish(self, job, error=None):
+        with self._lock:
+            if self._running.get(job.request) is job:
+                del self._running[job.request]
+            if isinstance(error, BrokenProcessPool):
+                self._reset_pool()
+            if error is not None:
+                return
+            self._results[job.request] = job._result
+            self._results.move_to_end(job.request)
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+
+    def map(self, fn, tasks):
+        """``fn(task)`` for every task, run in the shared pool; for analyses that are not per-year."""
+        with self._lock:
+            pool = self._pool()
+        try:
+            return list(pool.map(fn, tasks))
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is pool:
+                    self._reset_pool()
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,92 @@
+"""Server-side paging of a large frame for the dataset preview.
+
+Only one page of rows is materialised and sent to the browser per rerun.
+``PagedView`` keeps an argsort permutation per sort column (computed on
+first use) and, for the current row range, the part of that permutation
+falling inside it, so flipping through pages of the same query only costs
+a slice of the permutation plus a ``take`` of ``page_size`` rows.
+"""
+from collections import OrderedDict
+import threading
+
+import numpy as np
+import pandas as pd
+
+from climate_impact.timing import timed
+
+DEFAULT_PAGE_SIZE = 100
+# Filtered permutations kept for recent (column, direction, range) queries
+MAX_CACHED_QUERIES = 16
+
+
+class PagedView:
+    """Sorted, filtered, paginated access to ``frame``.
+
+    Filtering is by positional row range (``start``, ``stop``), which is how
+    ``TimeIndex.bounds`` expresses a year range. Safe to share between
+    sessions.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._orders = {}
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def order(self, column):
+        """Stable ascending permutation of all rows by ``column``; missing values last."""
+        with self._lock:
+            order = self._orders.get(column)
+        if order is None:
+            values = self.frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Rank the categories once, then sort the integer codes
+                ranks = np.argsort(np.argsort(values.cat.categories.to_numpy(dtype=str), kind="stable"))
+                codes = values.cat.codes.to_numpy()
+                values = np.where(codes >= 0, ranks[codes], len(ranks))
+            else:
+                values = values.to_numpy()
+            dtype = np.int32 if len(self.frame) < 2**31 else np.int64
+            order = np.argsort(values, kind="stable").astype(dtype, copy=False)
+            with self._lock:
+                self._orders[column] = order
+        return order
+
+    def rows(self, start=0, stop=None, sort_by=None, ascending=True):
+        """Positions of the rows in ``[start, stop)`` in display order."""
+        stop = len(self.frame) if stop is None else stop
+        if sort_by is None:
+            positions = np.arange(start, stop)
+            return positions if ascending else positions[::-1]
+        key = (sort_by, ascending, start, stop)
+        with self._lock:
+            positions = self._queries.get(key)
+            if positions is not None:
+                self._queries.move_to_end(key)
+                return positions
+        order = self.order(sort_by)
+        if start > 0 or stop < len(self.frame):
+            order = order[(order >= start) & (order < stop)]
+        positions = order if ascending else order[::-1]
+        with self._lock:
+            self._queries[key] = positions
+            while len(self._queries) > MAX_CACHED_QUERIES:
+                self._queries.popitem(last=False)
+        return positions
+
+    @timed("dataset.page")
+    def page(self, page=0, page_size=DEFAULT_PAGE_SIZE, start=0, stop=None, sort_by=None, ascending=True, columns=None):
+        """Return ``(window, total_rows)`` for one page of the sorted, filtered rows."""
+        positions = self.rows(start, stop, sort_by, ascending)
+        window = positions[page * page_size:(page + 1) * page_size]
+        window = self.frame.take(window)
+        if columns is not None:
+            window = window[list(columns)]
+        # Arrow would ship each categorical's full dictionary with the page
+        for column in window.select_dtypes("category").columns:
+            window[column] = window[column].astype(object)
+        return window, len(positions)
+
+
+def page_count(total_rows, page_size):
+    return max(1, -(-total_rows // page_size))
@@ -0,0 +1,263 @@
+"""Monte Carlo projections of both indices from the dataset's trends.
+
+``ScenarioBasis.fit`` takes a region's fitted trend for each measure
+(``analytics.compute_trends``: the line through its yearly means), the
+standard error of each slope, and the covariance of the readings around
+their yearly means. A trajectory draws one slope per measure from its
+error and, for every future year, one reading per measure from that
+covariance around the trend line, clipped to the slider bounds. Every
+sampled state is scored by the models (or the formulas), and each year's
+band membership and index distribution are accumulated.
+
+Trajectories are split into chunks of ``chunk`` that run as independent
+tasks in a spawn process pool: each draws from its own child of one
+``SeedSequence`` (so results depend on the seed, not on the number of
+workers), scores ``chunk * years`` states in one batch per model, and
+returns per-year band counts and fixed-bin histograms. These merge by
+addition, so memory is bounded by the chunk size whatever the number of
+trajectories.
+
+Usage::
+
+    python -m climate_impact.scenarios --region Latvia --years 30 --trajectories 100000
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from climate_impact import analytic, scoring
+from climate_impact.analytics import COUNTRY_COLUMN, GLOBAL, YEAR_COLUMN, compute_trends
+from climate_impact.schema import FEATURE_COLUMNS, FEATURE_DTYPE, FEATURES
+
+DEFAULT_YEARS = 30
+DEFAULT_TRAJECTORIES = 10_000
+# Trajectories per task; a task holds chunk * years * 6 float32 states
+DEFAULT_CHUNK = 2_000
+# Histogram range per index, wide enough for every input within the slider bounds
+INDEX_RANGES = {"Climate_Risk_Index": (0.0, 500.0), "Weather_Severity_Index": (0.0, 250.0)}
+HISTOGRAM_BINS = 500
+BANDS = {
+    "Climate_Risk_Index": (scoring.RISK_BOUNDS, scoring.RISK_LABELS),
+    "Weather_Severity_Index": (scoring.SEVERITY_BOUNDS, scoring.SEVERITY_LABELS),
+}
+_LOW = np.array([f.min_value for f in FEATURES], dtype=FEATURE_DTYPE)
+_HIGH = np.array([f.max_value for f in FEATURES], dtype=FEATURE_DTYPE)
+
+
+@dataclass(frozen=True)
+class ScenarioBasis:
+    """Trend lines and noise of one region's measures, in ``FEATURE_COLUMNS`` order."""
+
+    region: str
+    last_year: int
+    # Trend value at ``center``, the mean observed year; slopes pivot about it
+    center: float
+    level: tuple
+    slope: tuple
+    slope_error: tuple
+    # Lower Cholesky factor of the readings' covariance around their yearly means, row-major
+    noise: tuple
+
+    @classmethod
+    def fit(cls, frame, region=GLOBAL, trends=None):
+        """Fit to a frame with ``Year``, the measures and optionally ``Country``."""
+        trends = trends if trends is not None else compute_trends(frame)
+        g = trends.groups.index(region)
+        p = [trends.parameters.index(c) for c in FEATURE_COLUMNS]
+        years, means = trends.years, trends.means[g][:, p]
+        present = trends.counts[g] > 0
+        slope, intercept = trends.slope[g, p], trends.intercept[g, p]
+
+        # Standard error of each slope from the scatter of the yearly means about their line
+        x = years[present] - years[present].mean()
+        residuals = means[present] - (intercept + slope * years[present, None])
+        dof = max(int(present.sum()) - 2, 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slope_error = np.sqrt((residuals ** 2).sum(axis=0) / dof / (x ** 2).sum())
+        slope_error = np.nan_to_num(slope_error)
+
+        rows = frame if region == GLOBAL else frame[frame[COUNTRY_COLUMN] == region]
+        values = rows[list(FEATURE_COLUMNS)].to_numpy(dtype=np.float64)
+        deviations = values - means[rows[YEAR_COLUMN].to_numpy() - years[0]]
+        deviations = deviations[~np.isnan(deviations).any(axis=1)]
+        covariance = np.cov(deviations, rowvar=False) if len(deviations) > 1 else np.zeros((len(p), len(p)))
+        # A little jitter keeps the factorisation defined for degenerate regions
+        noise = np.linalg.cholesky(covariance + np.eye(len(p)) * 1e-9 * max(np.trace(covariance), 1.0))
+        center = float(years[present].mean())
+        return cls(region, int(years[present][-1]), center, tuple(intercept + slope * center), tuple(slope),
+                   tuple(slope_error), tuple(noise.ravel()))
+
+    def sample(self, rng, trajectories, years):
+        """``(trajectories, len(years), 6)`` float32 states for ``years``."""
+        n = len(FEATURE_COLUMNS)
+        slopes = np.asarray(self.slope) + rng.standard_normal((trajectories, 1, n)) * np.asarray(self.slope_error)
+        elapsed = np.asarray(years, dtype=np.float64)[None, :, None] - self.center
+        trend = np.asarray(self.level) + slopes * elapsed
+        noise = rng.standard_normal((trajectories, len(years), n)) @ np.asarray(self.noise).reshape(n, n).T
+        return np.clip(trend + noise, _LOW, _HIGH).astype(FEATURE_DTYPE)
+
+
+@dataclass(frozen=True)
+class ScenarioTask:
+    """One chunk of trajectories, as sent to a worker."""
+
+    basis: ScenarioBasis
+    years: tuple
+    trajectories: int
+    seed: np.random.SeedSequence
+    engine: str = "learned"
+    model_paths: tuple = ("model1.npz", "model2.npz")
+
+
+# Per-worker models, loaded on first use
+_worker_models = {}
+
+
+def _models(paths):
+    models = _worker_models.get(paths)
+    if models is None:
+        models = _worker_models[paths] = scoring.load_models(*paths)
+    return models
+
+
+def simulate_chunk(task):
+    """Per-year band counts ``{index: (years, bands)}`` and histograms ``{index: (years, bins)}``."""
+    rng = np.random.default_rng(task.seed)
+    states = task.basis.sample(rng, task.trajectories, task.years)
+    model1, model2 = _models(task.model_paths) if task.engine == "learned" else (None, None)
+    flat = states.reshape(-1, len(FEATURE_COLUMNS))
+    scores = dict(zip(analytic.INDEX_NAMES, scoring.predict_indices(model1, model2, flat, task.engine)))
+    year_of = np.tile(np.arange(len(task.years)), task.trajectories)
+    counts, histograms = {}, {}
+    for index, values in scores.items():
+        bounds, labels = BANDS[index]
+        band = scoring.classify(values, bounds)
+        counts[index] = np.bincount(year_of * len(labels) + band,
+                                    minlength=len(task.years) * len(labels)).reshape(len(task.years), len(labels))
+        low, high = INDEX_RANGES[index]
+        bins = np.clip(((values - low) / (high - low) * HISTOGRAM_BINS).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+        histograms[index] = np.bincount(year_of * HISTOGRAM_BINS + bins,
+                                        minlength=len(task.years) * HISTOGRAM_BINS).reshape(len(task.years), -1)
+    return counts, histograms
+
+
+@dataclass
+class ScenarioResult:
+    """Merged outcome of a simulation; ``counts`` and ``histograms`` are keyed by index name."""
+
+    region: str
+    years: np.ndarray
+    trajectories: int
+    counts: dict
+    histograms: dict
+    seconds: float
+
+    @property
+    def trajectories_per_sec(self):
+        return self.trajectories / self.seconds if self.seconds else float("inf")
+
+    def band_shares(self, index):
+        """Share of trajectories in each band per year, one column per band label."""
+        counts = self.counts[index]
+        return pd.DataFrame(counts / counts.sum(axis=1, keepdims=True), index=pd.Index(self.years, name=YEAR_COLUMN),
+                            columns=list(BANDS[index][1]))
+
+    def quantiles(self, index, qs=(0.05, 0.5, 0.95)):
+        """Per-year quantiles of ``index``, read from the histograms (within one bin)."""
+        low, high = INDEX_RANGES[index]
+        width = (high - low) / HISTOGRAM_BINS
+        cumulative = np.cumsum(self.histograms[index], axis=1)
+        total = cumulative[:, -1:]
+        columns = {}
+        for q in qs:
+            b = (cumulative < q * total).sum(axis=1)
+            before = np.where(b > 0, cumulative[np.arange(len(b)), np.maximum(b - 1, 0)], 0)
+            inside = self.histograms[index][np.arange(len(b)), np.minimum(b, HISTOGRAM_BINS - 1)]
+            fraction = np.where(inside > 0, (q * total[:, 0] - before) / np.maximum(inside, 1), 0.0)
+            columns[f"p{round(q * 100)}"] = low + (b + fraction) * width
+        return pd.DataFrame(columns, index=pd.Index(self.years, name=YEAR_COLUMN))
+
+    def long_bands(self):
+        """Long-form ``Year``, ``Index``, ``Band`` and ``share`` rows for charting."""
+        frames = []
+        for index in BANDS:
+            shares = self.band_shares(index).reset_index().melt(YEAR_COLUMN, var_name="Band", value_name="share")
+            frames.append(shares.assign(Index=index))
+        return pd.concat(frames, ignore_index=True)
+
+
+def plan(basis, years=DEFAULT_YEARS, trajectories=DEFAULT_TRAJECTORIES, chunk=DEFAULT_CHUNK, seed=0,
+         engine="learned", model_paths=("model1.npz", "model2.npz")):
+    """The ``ScenarioTask`` chunks of a simulation ``years`` past the basis' last year."""
+    future = tuple(range(basis.last_year + 1, basis.last_year + years + 1))
+    sizes = [min(chunk, trajectories - start) for start in range(0, trajectories, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return [ScenarioTask(basis, future, size, s, engine, tuple(model_paths)) for size, s in zip(sizes, seeds)]
+
+
+def merge(basis, tasks, partials, seconds):
+    """Add up the chunks' counts and histograms."""
+    counts = {index: sum(p[0][index] for p in partials) for index in BANDS}
+    histograms = {index: sum(p[1][index] for p in partials) for index in BANDS}
+    return ScenarioResult(basis.region, np.asarray(tasks[0].years), sum(t.trajectories for t in tasks),
+                          counts, histograms, seconds)
+
+
+def simulate(basis, years=DEFAULT_YEARS, trajectories=DEFAULT_TRAJECTORIES, chunk=DEFAULT_CHUNK, seed=0,
+             engine="learned", model_paths=("model1.npz", "model2.npz"), workers=None, executor=None):
+    """Run a simulation, in ``executor`` if given, else a pool of ``workers`` (1: in this process)."""
+    tasks = plan(basis, years, trajectories, chunk, seed, engine, model_paths)
+    start = time.perf_counter()
+    if executor is not None:
+        partials = list(executor.map(simulate_chunk, tasks))
+    elif workers == 1 or len(tasks) == 1:
+        partials = [simulate_chunk(task) for task in tasks]
+    else:
+        # spawn: forking a threaded Streamlit server is not safe
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            partials = list(pool.map(simulate_chunk, tasks))
+    return merge(basis, tasks, partials, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Project both indices forward from the dataset's trends.")
+    parser.add_argument("--dataset", default="climate_change_data.csv")
+    parser.add_argument("--region", default=GLOBAL, help=f"country, or {GLOBAL} (default)")
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS)
+    parser.add_argument("--trajectories", type=int, default=DEFAULT_TRAJECTORIES)
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="trajectories per task")
+    parser.add_argument("--workers", type=int, help="processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=scoring.ENGINES, default="learned")
+    parser.add_argument("--model1", default="model1.npz")
+    parser.add_argument("--model2", default="model2.npz")
+    args = parser.parse_args(argv)
+
+    from climate_impact.store import load_dataset
+    from climate_impact.timeindex import TimeIndex
+
+    frame = TimeIndex(load_dataset(args.dataset)).frame
+    trends = compute_trends(frame)
+    if args.region not in trends.groups:
+        parser.error(f"unknown region {args.region!r}")
+    basis = ScenarioBasis.fit(frame, args.region, trends)
+    result = simulate(basis, args.years, args.trajectories, args.chunk, args.seed, args.engine,
+                      (args.model1, args.model2), args.workers)
+    print(f"Simulated {result.trajectories:,} trajectories x {len(result.years)} years for {args.region} "
+          f"in {result.seconds:.2f}s ({result.trajectories_per_sec:,.0f} trajectories/sec)")
+    shown = sorted({result.years[0], result.years[len(result.years) // 2], result.years[-1]})
+    for index in BANDS:
+        table = result.band_shares(index).loc[shown].join(result.quantiles(index).loc[shown])
+        print(f"\n{index}:")
+        print(table.to_string(float_format=lambda v: f"{v:.2f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
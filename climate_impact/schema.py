@@ -0,0 +1,114 @@
+"""Feature schema of the app's inputs and of each model.
+
+``FEATURES`` is the canonical column order of a full parameter row, with the
+slider bounds used on the Home page. Each ``ModelSchema`` names the subset of
+those columns a model consumes and precomputes how to select it from a full
+row matrix, so callers build one matrix and hand every model its own view.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Feature:
+    column: str
+    label: str
+    min_value: float
+    max_value: float
+    help: str
+    default: float = 0.0
+    step: float = 0.1
+
+
+FEATURES = (
+    Feature("Temperature", "Temperature (°C)", -20.0, 50.0, "Average temperature in Celsius"),
+    Feature("CO2 Emissions", "CO₂ Emissions (ppm)", 0.0, 1000.0, "Carbon dioxide levels in parts per million"),
+    Feature("Sea Level Rise", "Sea Level Rise (mm)", -50.0, 500.0, "Sea level rise in millimeters"),
+    Feature("Precipitation", "Precipitation (mm)", 0.0, 500.0, "Average precipitation in millimeters"),
+    Feature("Humidity", "Humidity (%)", 0.0, 100.0, "Relative humidity percentage"),
+    Feature("Wind Speed", "Wind Speed (km/h)", 0.0, 200.0, "Average wind speed in kilometers per hour"),
+)
+FEATURE_COLUMNS = tuple(f.column for f in FEATURES)
+FEATURE_DTYPE = np.float32
+
+_MIN = np.array([f.min_value for f in FEATURES], dtype=FEATURE_DTYPE)
+_MAX = np.array([f.max_value for f in FEATURES], dtype=FEATURE_DTYPE)
+
+
+@dataclass(frozen=True)
+class ModelSchema:
+    name: str
+    target: str
+    columns: tuple
+    indices: tuple = field(init=False, repr=False)
+    selector: object = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        unknown = [c for c in self.columns if c not in FEATURE_COLUMNS]
+        if unknown:
+            raise ValueError(f"{self.name}: unknown feature columns {unknown}")
+        indices = tuple(FEATURE_COLUMNS.index(c) for c in self.columns)
+        # A contiguous run of columns is selected with a slice, which numpy
+        # returns as a view; anything else needs an index array (a copy).
+        if indices == tuple(range(indices[0], indices[0] + len(indices))):
+            selector = slice(indices[0], indices[0] + len(indices))
+        else:
+            selector = np.array(indices)
+        object.__setattr__(self, "indices", indices)
+        object.__setattr__(self, "selector", selector)
+
+    @property
+    def features(self):
+        return tuple(FEATURES[i] for i in self.indices)
+
+    def view(self, rows):
+        """Select this model's columns from a full ``(n, len(FEATURES))`` matrix."""
+        return rows[:, self.selector]
+
+    def bind(self, model):
+        """Return the schema matching the columns ``model`` was actually fit on."""
+        fitted = getattr(model, "feature_names_in_", None)
+        if fitted is None:
+            return self
+        return _schema(self.name, self.target, tuple(str(c) for c in fitted))
+
+
+@lru_cache(maxsize=None)
+def _schema(name, target, columns):
+    return ModelSchema(name, target, columns)
+
+
+# Inputs each target is computed from in Untitled.ipynb
+MODEL_SCHEMAS = {
+    "model1": ModelSchema(
+        "model1", "Climate_Risk_Index", ("Temperature", "CO2 Emissions", "Sea Level Rise", "Precipitation")
+    ),
+    "model2": ModelSchema("model2", "Weather_Severity_Index", ("Precipitation", "Humidity", "Wind Speed")),
+}
+
+
+def as_rows(values):
+    """Return ``values`` as a C-contiguous float32 ``(n, len(FEATURES))`` matrix."""
+    rows = np.ascontiguousarray(values, dtype=FEATURE_DTYPE)
+    if rows.ndim == 1:
+        rows = rows[None, :]
+    if rows.ndim != 2 or rows.shape[1] != len(FEATURES):
+        raise ValueError(f"Expected rows of {len(FEATURES)} features, got shape {rows.shape}")
+    return rows
+
+
+def out_of_range(rows):
+    """Boolean mask of rows with a missing value or one outside the slider bounds."""
+    return ~((rows >= _MIN) & (rows <= _MAX)).all(axis=1)
+
+
+def validate(rows):
+    """Raise ``ValueError`` naming the columns that contain invalid values."""
+    bad = ~((rows >= _MIN) & (rows <= _MAX))
+    if bad.any():
+        counts = bad.sum(axis=0)
+        details = ", ".join(f"{c} ({n} rows)" for c, n in zip(FEATURE_COLUMNS, counts) if n)
+        raise ValueError(f"Values missing or out of range in {details}")
+    return rows
@@ -0,0 +1,239 @@
+"""Batch scoring of parameter rows through the climate risk models.
+
+Rows follow the schema of ``climate_change_data.csv``; any extra columns
+(Date, Location, Country, ...) are carried through to the output untouched.
+
+Usage::
+
+    python -m climate_impact.scoring climate_change_data.csv scored.parquet
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from climate_impact import analytic
+from climate_impact.forest import TreeEnsemble
+from climate_impact.schema import FEATURE_COLUMNS, FEATURE_DTYPE, MODEL_SCHEMAS, as_rows, out_of_range
+from climate_impact.timing import timed
+
+# Upper bounds (inclusive) of each band, matching the Home page gauges
+RISK_BOUNDS = (100.0, 150.0, 200.0)
+RISK_LABELS = ("Low", "Moderate", "High", "Severe")
+SEVERITY_BOUNDS = (25.0, 50.0, 75.0)
+SEVERITY_LABELS = ("Mild", "Moderate", "Severe", "Very Severe")
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# "learned" runs model1/model2; "analytic" evaluates the notebook formulas
+ENGINES = ("learned", "analytic")
+
+
+@timed("model.load")
+def load_model(path):
+    """Load a compiled ``.npz`` ensemble, or a pickled model for any other extension."""
+    if str(path).endswith(".npz"):
+        return TreeEnsemble.load(path)
+    import joblib
+
+    return joblib.load(path)
+
+
+def load_models(model1_path="model1.npz", model2_path="model2.npz"):
+    """Load the Climate Risk and Weather Severity models."""
+    return load_model(model1_path), load_model(model2_path)
+
+
+def classify(values, bounds):
+    """Return the band index of every value; a value equal to a bound falls in the lower band."""
+    return np.searchsorted(np.asarray(bounds), values, side="left")
+
+
+def feature_matrix(frame):
+    """Build the contiguous float32 model input from a frame's feature columns."""
+    missing = [c for c in FEATURE_COLUMNS if c not in frame.columns]
+    if missing:
+        raise KeyError(f"Missing feature columns: {', '.join(missing)}")
+    return np.ascontiguousarray(frame.loc[:, list(FEATURE_COLUMNS)].to_numpy(dtype=FEATURE_DTYPE))
+
+
+def predict(model, name, rows):
+    """Predict with ``model`` on its own columns of the full feature matrix ``rows``."""
+    return model.predict(MODEL_SCHEMAS[name].bind(model).view(rows))
+
+
+@timed("model.predict")
+def predict_indices(model1, model2, features, engine="learned", monitor=None):
+    """Predict both indices for a feature matrix with one call per model.
+
+    With ``engine="analytic"`` the models are skipped in favour of the closed
+    form; pass an ``analytic.DriftMonitor`` to compare a sample against them.
+    """
+    rows = as_rows(features)
+    if engine == "analytic":
+        risk, severity = analytic.predict_indices(rows)
+        if monitor is not None:
+            monitor.observe(rows, risk, severity)
+        return risk, severity
+    if engine != "learned":
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    return predict(model1, "model1", rows), predict(model2, "model2", rows)
+
+
+@timed("model.predict_intervals")
+def predict_with_intervals(model1, model2, intervals, features):
+    """``(risk, low, high), (severity, low, high)`` with one traversal per model.
+
+    ``intervals`` is the pair of ``intervals.LeafIntervals`` for ``model1`` and ``model2``.
+    """
+    rows = as_rows(features)
+    return intervals[0].predict(model1, rows), intervals[1].predict(model2, rows)
+
+
+def drift_monitor(model1, model2, sample_rate=0.05, **kwargs):
+    """Build a ``DriftMonitor`` that compares analytic scores with these models."""
+    return analytic.DriftMonitor(lambda rows: predict_indices(model1, model2, rows), sample_rate, **kwargs)
+
+
+def score_frame(frame, model1, model2, engine="learned", monitor=None, intervals=None, baselines=None):
+    """Return ``frame`` with both indices and their bands appended.
+
+    ``In_Range`` marks rows whose inputs all lie within the slider bounds the
+    models are meant to be used in. With ``intervals`` (see
+    ``predict_with_intervals``) and the learned engine, each index also gets
+    ``_Low`` and ``_High`` columns. With ``baselines``
+    (``climate_impact.baselines``), each index gets a ``_Percentile`` column
+    against the row's location, country or, lacking both, all rows.
+    """
+    rows = feature_matrix(frame)
+    scored = frame.copy()
+    if intervals is not None and engine == "learned":
+        (risk, risk_low, risk_high), (severity, severity_low, severity_high) = predict_with_intervals(
+            model1, model2, intervals, rows)
+        scored["Climate_Risk_Index"] = risk
+        scored["Climate_Risk_Index_Low"] = risk_low
+        scored["Climate_Risk_Index_High"] = risk_high
+        scored["Weather_Severity_Index"] = severity
+        scored["Weather_Severity_Index_Low"] = severity_low
+        scored["Weather_Severity_Index_High"] = severity_high
+    else:
+        risk, severity = predict_indices(model1, model2, rows, engine, monitor)
+        scored["Climate_Risk_Index"] = risk
+        scored["Weather_Severity_Index"] = severity
+    scored["Risk_Band"] = pd.Categorical.from_codes(classify(risk, RISK_BOUNDS), RISK_LABELS)
+    scored["Severity_Band"] = pd.Categorical.from_codes(
+        classify(severity, SEVERITY_BOUNDS), SEVERITY_LABELS
+    )
+    scored["In_Range"] = ~out_of_range(rows)
+    if baselines is not None:
+        groups = baselines.groups(frame["Country"] if "Country" in frame.columns else np.full(len(frame), None),
+                                  frame["Location"] if "Location" in frame.columns else None)
+        scored["Climate_Risk_Index_Percentile"] = baselines.percentile(risk, groups, "Climate_Risk_Index")
+        scored["Weather_Severity_Index_Percentile"] = baselines.percentile(severity, groups, "Weather_Severity_Index")
+    return scored
+
+
+def iter_scored(source, model1, model2, chunksize=DEFAULT_CHUNKSIZE, engine="learned", monitor=None,
+                intervals=None, baselines=None):
+    """Yield scored chunks of a CSV path or file-like object."""
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        yield score_frame(chunk, model1, model2, engine, monitor, intervals, baselines)
+
+
+def score_file(source, destination, model1, model2, chunksize=DEFAULT_CHUNKSIZE, engine="learned", monitor=None,
+               intervals=None, baselines=None):
+    """Stream ``source`` through both models into a CSV or Parquet ``destination``.
+
+    The output format follows the destination's extension. Returns a dict with
+    the row count, the number of out-of-range rows, elapsed seconds and rows/sec.
+    """
+    parquet = str(destination).endswith(".parquet")
+    writer = None
+    rows = 0
+    invalid = 0
+    start = time.perf_counter()
+    try:
+        for scored in iter_scored(source, model1, model2, chunksize, engine, monitor, intervals, baselines):
+            if parquet:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(scored, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(destination, table.schema)
+                writer.write_table(table)
+            else:
+                scored.to_csv(destination, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+            rows += len(scored)
+            invalid += int((~scored["In_Range"]).sum())
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "out_of_range": invalid, "seconds": elapsed, "rows_per_sec": rows / elapsed if elapsed else float("inf")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of climate parameters in bulk.")
+    parser.add_argument("source", help="input CSV with the climate_change_data.csv columns")
+    parser.add_argument("destination", help="output .csv or .parquet file")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--model1", default="model1.npz", help="compiled .npz or pickled model")
+    parser.add_argument("--model2", default="model2.npz", help="compiled .npz or pickled model")
+    parser.add_argument("--engine", choices=ENGINES, default="learned")
+    parser.add_argument(
+        "--compare-rate", type=float, default=0.0,
+        help="with --engine analytic, fraction of rows also scored by the models to report drift",
+    )
+    parser.add_argument(
+        "--intervals", action="store_true",
+        help="with --engine learned, add _Low/_High columns from the models' calibrated interval tables",
+    )
+    parser.add_argument(
+        "--baselines", metavar="DATASET", nargs="?", const="climate_change_data.csv",
+        help="add _Percentile columns against each row's location or country in DATASET (default: the bundled data)",
+    )
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        parser.error(f"{args.source} does not exist")
+    model1, model2 = load_models(args.model1, args.model2)
+    monitor = None
+    if args.engine == "analytic" and args.compare_rate > 0:
+        monitor = drift_monitor(model1, model2, args.compare_rate)
+    intervals = None
+    if args.intervals and args.engine == "learned":
+        from climate_impact.intervals import open_intervals
+
+        try:
+            intervals = (open_intervals(args.model1, "model1"), open_intervals(args.model2, "model2"))
+        except ValueError as e:
+            parser.error(str(e))
+    baselines = None
+    if args.baselines:
+        from climate_impact.baselines import open_baselines
+
+        baselines = open_baselines(args.baselines)
+    stats = score_file(args.source, args.destination, model1, model2, args.chunksize, args.engine, monitor,
+                       intervals, baselines)
+    print(f"Scored {stats['rows']} rows in {stats['seconds']:.3f}s ({stats['rows_per_sec']:,.0f} rows/sec)")
+    if stats["out_of_range"]:
+        print(f"Warning: {stats['out_of_range']} rows have values outside the supported input ranges")
+    if monitor is not None:
+        report = monitor.report()
+        print(f"Compared {report['compared']} of {report['observed']} rows with the learned models (analytic - learned):")
+        for name in analytic.INDEX_NAMES:
+            r = report[name]
+            if r:
+                print(
+                    f"  {name}: mean {r['mean']:+.3f}, std {r['std']:.3f}, "
+                    f"|p50| {r['abs_p50']:.3f}, |p99| {r['abs_p99']:.3f}, |max| {r['abs_max']:.3f}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Headless prediction API.
+
+``predict_impact(rows)`` scores rows without Streamlit, loading the models
+once per process. ``python -m climate_impact.service`` serves it over HTTP
+with Tornado (installed with Streamlit):
+
+- ``POST /predict`` with a JSON body ``{"rows": [...]}``, where each row is
+  an object keyed by feature column or a list in ``FEATURE_COLUMNS`` order,
+  or an Arrow IPC stream (``Content-Type: application/vnd.apache.arrow.stream``)
+  with the feature columns, answered in the same format;
+- ``GET /health``.
+
+Requests arriving within a few milliseconds of each other are merged by
+``MicroBatcher`` into a single predict call per model. Models refreshed by
+``python -m climate_impact.training`` or ``climate_impact.ingest`` are
+picked up on the next request.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from climate_impact import scoring
+from climate_impact.schema import FEATURE_COLUMNS, as_rows
+from climate_impact.training import latest_artifacts, verify_artifacts
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+OUTPUT_COLUMNS = ("Climate_Risk_Index", "Weather_Severity_Index", "Risk_Band", "Severity_Band")
+
+_models = None
+_models_lock = threading.Lock()
+
+
+def get_models():
+    """``(model1, model2)`` from the latest trained artifacts, else the bundled models.
+
+    ``artifacts/LATEST`` is read on every call; a new version is verified and
+    loaded once, then swapped in. Calls already holding the previous pair
+    finish with it.
+    """
+    global _models
+    directory = latest_artifacts()
+    with _models_lock:
+        if _models is None or _models[0] != directory:
+            paths = None
+            if directory is not None:
+                try:
+                    paths = verify_artifacts(directory)[1]
+                except ValueError as e:
+                    print(f"{e}; using the bundled models", file=sys.stderr)
+            models = scoring.load_models(paths["model1"], paths["model2"]) if paths else scoring.load_models()
+            _models = (directory, models)
+        return _models[1]
+
+
+def to_rows(rows):
+    """Feature matrix from a DataFrame, a list of row dicts, or a sequence of 6-value rows."""
+    if isinstance(rows, pd.DataFrame):
+        return scoring.feature_matrix(rows)
+    if len(rows) and isinstance(rows[0], dict):
+        try:
+            return as_rows([[row[c] for c in FEATURE_COLUMNS] for row in rows])
+        except KeyError as e:
+            raise ValueError(f"Missing feature {e}") from None
+    return as_rows(np.asarray(rows, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS)))
+
+
+def score(features, engine="learned"):
+    """Both indices and their bands for a feature matrix, as a dict of arrays."""
+    model1, model2 = get_models()
+    risk, severity = scoring.predict_indices(model1, model2, features, engine)
+    return {
+        "Climate_Risk_Index": risk,
+        "Weather_Severity_Index": severity,
+        "Risk_Band": np.asarray(scoring.RISK_LABELS)[scoring.classify(risk, scoring.RISK_BOUNDS)],
+        "Severity_Band": np.asarray(scoring.SEVERITY_LABELS)[scoring.classify(severity, scoring.SEVERITY_BOUNDS)],
+    }
+
+
+def predict_impact(rows, engine="learned"):
+    """Score ``rows`` and return one dict per row with both indices and bands."""
+    result = score(to_rows(rows), engine)
+    return [
+        {"Climate_Risk_Index": float(r), "Weather_Severity_Index": float(s), "Risk_Band": rb, "Severity_Band": sb}
+        for r, s, rb, sb in zip(*(result[c] for c in OUTPUT_COLUMNS))
+    ]
+
+
+class MicroBatcher:
+    """Merge concurrent scoring calls into one model call.
+
+    The first request in an empty queue waits up to ``max_wait`` seconds for
+    others (or until ``max_rows`` rows are queued); the merged batch is then
+    scored in a worker thread so the event loop keeps accepting requests.
+    """
+
+    def __init__(self, max_rows=4096, max_wait=0.002, engine="learned"):
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.engine = engine
+        self.batches = 0
+        self.requests = 0
+        self._queue = None
+
+    async def score(self, features):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            rows = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                rows += len(item[0])
+            self.batches += 1
+            self.requests += len(pending)
+            try:
+                merged = np.concatenate([features for features, _ in pending])
+                result = await loop.run_in_executor(None, score, merged, self.engine)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            start = 0
+            for features, future in pending:
+                stop = start + len(features)
+                if not future.done():
+                    future.set_result({c: v[start:stop] for c, v in result.items()})
+                start = stop
+
+
+def make_app(batcher=None):
+    """Tornado application serving ``/predict`` and ``/health``."""
+    import tornado.web
+
+    batcher = batcher or MicroBatcher()
+
+    class PredictHandler(tornado.web.RequestHandler):
+        def write_error(self, status_code, **kwargs):
+            self.finish({"error": self._reason})
+
+        async def post(self):
+            arrow = self.request.headers.get("Content-Type", "").startswith(ARROW_STREAM)
+            try:
+                if arrow:
+                    import pyarrow as pa
+
+                    features = scoring.feature_matrix(pa.ipc.open_stream(self.request.body).read_pandas())
+                else:
+                    body = json.loads(self.request.body)
+                    features = to_rows(body["rows"] if isinstance(body, dict) else body)
+            except (ValueError, KeyError, TypeError) as e:
+                raise tornado.web.HTTPError(400, reason=str(e).splitlines()[0][:200])
+            result = await batcher.score(features)
+            if arrow:
+                import pyarrow as pa
+
+                table = pa.table({c: result[c] for c in OUTPUT_COLUMNS})
+                sink = pa.BufferOutputStream()
+                with pa.ipc.new_stream(sink, table.schema) as writer:
+                    writer.write_table(table)
+                self.set_header("Content-Type", ARROW_STREAM)
+                self.write(sink.getvalue().to_pybytes())
+            else:
+                self.write({"predictions": [
+                    {c: (float(v) if isinstance(v, np.floating) else str(v)) for c, v in zip(OUTPUT_COLUMNS, values)}
+                    for values in zip(*(result[c] for c in OUTPUT_COLUMNS))
+                ]})
+
+    class HealthHandler(tornado.web.RequestHandler):
+        def get(self):
+            self.write({"status": "ok", "batches": batcher.batches, "requests": batcher.requests})
+
+    return tornado.web.Application([(r"/predict", PredictHandler), (r"/health", HealthHandler)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve climate impact predictions over HTTP.")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--engine", choices=scoring.ENGINES, default="learned")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="micro-batching window")
+    args = parser.parse_args(argv)
+
+    get_models()
+
+    async def serve():
+        make_app(MicroBatcher(max_wait=args.max_wait_ms / 1000, engine=args.engine)).listen(args.port)
+        print(f"Serving predictions on http://localhost:{args.port}/predict")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
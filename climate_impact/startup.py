@@ -0,0 +1,155 @@
+"""Cold-start helpers: deferred model loading and an import-time profiler.
+
+The app only imports what the current page needs, and only the Home and
+Batch Scoring pages load the models. ``ModelLoader`` loads each model on
+first use (or on a background thread with ``warm``) and reloads it when
+the digest of its file changes.
+
+``python -m climate_impact.startup`` reports what each page costs before
+its first paint: every page is imported in a fresh interpreter under
+``-X importtime``, split into the modules shared by all pages and the
+page's own, plus the model load for pages that predict. ``PAGES`` mirrors
+the imports in ``streamlit_app.py`` and should be kept in step with it.
+
+Usage::
+
+    python -m climate_impact.startup --top 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from climate_impact.cache import model_digest
+
+# Imported by every page, before the page is chosen
+COMMON_MODULES = ("streamlit", "numpy", "pandas", "climate_impact.scoring", "climate_impact.startup",
+                  "climate_impact.store", "climate_impact.timing", "climate_impact.training")
+# page: (modules imported when the page first renders, whether it loads the models)
+PAGES = {
+    # Matplotlib is only imported once the gauges are first drawn, after Predict
+    "home": (("climate_impact.baselines", "climate_impact.cache", "climate_impact.charts", "climate_impact.explain",
+              "climate_impact.intervals", "climate_impact.schema", "climate_impact.surface"), True),
+    "dataset": (("climate_impact.ingest", "climate_impact.paging", "climate_impact.summary",
+                 "climate_impact.timeindex"), False),
+    "batch": (("climate_impact.baselines", "climate_impact.intervals"), True),
+    "about": ((), False),
+    "analytics": (("altair", "climate_impact.analytics", "climate_impact.ingest", "climate_impact.jobs",
+                   "climate_impact.scenarios", "climate_impact.tiers"), False),
+    "performance": ((), False),
+}
+MARKER = "climate_impact.startup:"
+
+
+class ModelLoader:
+    """Thread-safe, load-on-first-use access to the models in ``paths`` (name -> file)."""
+
+    def __init__(self, paths):
+        self.paths = dict(paths)
+        self._models = {}
+        self._locks = {name: threading.Lock() for name in self.paths}
+        self._thread = None
+
+    def get(self, name):
+        """``(model, digest)`` for ``name``, loading it now if it is not loaded or its file changed."""
+        from climate_impact.scoring import load_model
+
+        path = self.paths[name]
+        version = model_digest(path)
+        with self._locks[name]:
+            loaded = self._models.get(name)
+            if loaded is None or loaded[1] != version:
+                loaded = self._models[name] = (load_model(path), version)
+        return loaded
+
+    def warm(self):
+        """Load every model on a daemon thread; ``get`` waits for a model still loading."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._warm, name="model-warmup", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _warm(self):
+        for name in self.paths:
+            try:
+                self.get(name)
+            except Exception:
+                # Reported to whoever calls get() for it
+                pass
+
+
+def parse_importtime(stderr):
+    """Top-level ``(module, cumulative us)`` per section of ``-X importtime`` output.
+
+    Sections are delimited by ``MARKER`` lines; nested imports are counted in
+    their importer's cumulative time.
+    """
+    sections = {}
+    current = None
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            current = sections.setdefault(line[len(MARKER):], [])
+            continue
+        if current is None or not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            current.append((name.strip(), int(cumulative)))
+    return sections
+
+
+def profile_page(page, model_paths=None):
+    """Import and model-load cost of ``page`` in a fresh interpreter.
+
+    Returns a dict with ``common`` and ``page`` lists of ``(module, ms)`` and
+    ``models_ms`` (``None`` when the page does not load the models).
+    """
+    modules, needs_models = PAGES[page]
+    mark = f"import sys; sys.stderr.write({MARKER!r} + %r + '\\n'); sys.stderr.flush()"
+    code = [mark % "common", *(f"import {m}" for m in COMMON_MODULES), mark % "page", *(f"import {m}" for m in modules)]
+    if needs_models:
+        code += [
+            "import json, time",
+            "start = time.perf_counter()",
+            f"from climate_impact.scoring import load_model; [load_model(p) for p in {list(model_paths or ())!r}]",
+            "print(json.dumps(time.perf_counter() - start))",
+        ]
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "\n".join(code)],
+                            capture_output=True, text=True, check=True, cwd=os.getcwd())
+    sections = parse_importtime(result.stderr)
+    return {
+        "common": [(name, us / 1e3) for name, us in sections.get("common", [])],
+        "page": [(name, us / 1e3) for name, us in sections.get("page", [])],
+        "models_ms": json.loads(result.stdout.strip().splitlines()[-1]) * 1e3 if needs_models else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report each page's import and model-load cost at cold start.")
+    parser.add_argument("--page", action="append", choices=list(PAGES), dest="pages",
+                        help="page to profile; repeat for several (default: all)")
+    parser.add_argument("--top", type=int, default=0, help="also list each page's N slowest own imports")
+    parser.add_argument("--model1", default="model1.npz")
+    parser.add_argument("--model2", default="model2.npz")
+    args = parser.parse_args(argv)
+
+    print(f"{'page':<11}{'common ms':>11}{'page ms':>10}{'models ms':>11}{'total ms':>10}")
+    details = []
+    for page in args.pages or PAGES:
+        profile = profile_page(page, [args.model1, args.model2])
+        common = sum(ms for _, ms in profile["common"])
+        own = sum(ms for _, ms in profile["page"])
+        models = profile["models_ms"]
+        models_text = "-" if models is None else f"{models:.0f}"
+        print(f"{page:<11}{common:>11.0f}{own:>10.0f}{models_text:>11}{common + own + (models or 0):>10.0f}")
+        details.append((page, sorted(profile["page"], key=lambda item: -item[1])[:args.top]))
+    for page, slowest in details:
+        if slowest:
+            print(f"\n{page}: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in slowest))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
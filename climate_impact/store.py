@@ -0,0 +1,275 @@
+"""Columnar, memory-mapped copy of the climate dataset.
+
+``climate_change_data.csv`` is converted once into a directory of raw
+little-endian column files plus ``meta.json``:
+
+- numeric measures are stored as float64,
+- ``Date`` as int64 nanoseconds since the epoch,
+- ``Location`` and ``Country`` as int32 codes into a category list.
+
+Columns are opened with ``np.memmap``, so every Streamlit worker shares the
+same pages through the OS page cache and nothing is parsed on load. When
+the store is missing or stale it is rebuilt; if that fails the CSV is read
+directly. ``append_rows`` adds rows to both the store and the CSV without a
+rebuild; readers only see rows once ``meta.json`` counts them.
+
+Usage::
+
+    python -m climate_impact.store climate_change_data.csv
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from climate_impact.timing import timed
+
+STORE_VERSION = 1
+DATE_COLUMN = "Date"
+CATEGORICAL_COLUMNS = ("Location", "Country")
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+CSV_CHUNKSIZE = 1_000_000
+
+_DTYPES = {"numeric": "<f8", "datetime": "<i8", "categorical": "<i4"}
+
+
+def store_path(csv_path):
+    """Directory the store for ``csv_path`` lives in."""
+    return os.path.splitext(csv_path)[0] + ".store"
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _column_file(directory, index):
+    return os.path.join(directory, f"{index:03d}.bin")
+
+
+class ColumnStore:
+    """Read-only view of a store directory; columns are memory-mapped on access."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.columns = [c["name"] for c in self.meta["columns"]]
+        self._specs = {c["name"]: (i, c) for i, c in enumerate(self.meta["columns"])}
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def version(self):
+        """Identifies the stored data; changes whenever rows are rebuilt or appended."""
+        return f"{self.meta['source'].get('size')}-{self.meta['source'].get('mtime_ns')}-{self.meta['rows']}"
+
+    @property
+    def build(self):
+        """Identifies this build of the store; unlike ``version``, appending rows keeps it."""
+        return f"{self.meta.get('build', '')}-{self.meta.get('base_rows', self.meta['rows'])}"
+
+    def raw(self, name):
+        """Memory-mapped storage of a column (codes for categoricals, ns for dates)."""
+        index, spec = self._specs[name]
+        if not len(self):
+            return np.empty(0, dtype=_DTYPES[spec["kind"]])
+        return np.memmap(_column_file(self.directory, index), dtype=_DTYPES[spec["kind"]], mode="r", shape=(len(self),))
+
+    def categories(self, name):
+        return self._specs[name][1]["categories"]
+
+    def column(self, name):
+        """Column in its pandas-facing type; numeric and date columns are zero-copy."""
+        kind = self._specs[name][1]["kind"]
+        values = self.raw(name)
+        if kind == "datetime":
+            return values.view("datetime64[ns]")
+        if kind == "categorical":
+            return pd.Categorical.from_codes(values, self.categories(name))
+        return values
+
+    def to_frame(self, columns=None, start=0):
+        """Rows from ``start`` on (all by default) as a DataFrame over the mapped columns."""
+        return pd.DataFrame({name: self.column(name)[start:] for name in columns or self.columns}, copy=False)
+
+
+def build_store(csv_path, directory=None, chunksize=CSV_CHUNKSIZE):
+    """Convert ``csv_path`` into a column store and return it.
+
+    The CSV is streamed in chunks, written to a temporary directory and moved
+    into place at the end, so concurrent readers never see a partial store.
+    """
+    directory = directory or store_path(csv_path)
+    parent = os.path.dirname(os.path.abspath(directory))
+    tmp = tempfile.mkdtemp(prefix=".store-", dir=parent)
+    os.chmod(tmp, 0o755)
+    try:
+        columns, files, rows = None, [], 0
+        categories = {}
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            if columns is None:
+                columns = [{"name": name, "kind": _kind(name)} for name in chunk.columns]
+                files = [open(_column_file(tmp, i), "wb") for i in range(len(columns))]
+            for spec, f in zip(columns, files):
+                f.write(_encode(chunk[spec["name"]], spec, categories).tobytes())
+            rows += len(chunk)
+        for f in files:
+            f.close()
+        for spec in columns or []:
+            if spec["kind"] == "categorical":
+                spec["categories"] = list(categories[spec["name"]])
+        _write_meta(tmp, {
+            "version": STORE_VERSION,
+            "build": uuid.uuid4().hex,
+            "rows": rows,
+            "columns": columns or [],
+            "source": _source_stamp(csv_path),
+        })
+        if os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            # Another process finished first; its store is equivalent
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return ColumnStore(directory)
+
+
+def append_rows(csv_path, frame):
+    """Append ``frame`` (the CSV's columns) to the store and the CSV; returns the store.
+
+    Column files are cut back to the rows ``meta.json`` counts and extended,
+    then the CSV is appended, then the new meta is written. A crash before
+    the meta leaves extra bytes readers never map, or a changed CSV that
+    makes the next open rebuild the store. There must be a single writer.
+    """
+    store = open_store(csv_path)
+    columns = store.meta["columns"]
+    names = [spec["name"] for spec in columns]
+    missing = [name for name in names if name not in frame.columns]
+    if missing:
+        raise KeyError(f"Missing columns: {', '.join(missing)}")
+    frame = frame[names]
+    categories = {spec["name"]: {value: i for i, value in enumerate(spec["categories"])}
+                  for spec in columns if spec["kind"] == "categorical"}
+    encoded = [_encode(frame[spec["name"]], spec, categories) for spec in columns]
+    for i, (spec, values) in enumerate(zip(columns, encoded)):
+        path = _column_file(store.directory, i)
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.truncate(len(store) * np.dtype(_DTYPES[spec["kind"]]).itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(values).tobytes())
+    text = frame.copy()
+    if DATE_COLUMN in text.columns:
+        # Nanosecond precision, as in the bundled CSV
+        text[DATE_COLUMN] = pd.to_datetime(text[DATE_COLUMN], format=DATE_FORMAT).dt.strftime(DATE_FORMAT + "000")
+    text.to_csv(csv_path, mode="a", header=False, index=False)
+    meta = dict(store.meta)
+    meta["columns"] = [dict(spec) for spec in columns]
+    for spec in meta["columns"]:
+        if spec["kind"] == "categorical":
+            spec["categories"] = list(categories[spec["name"]])
+    # Rows that came with the CSV, before anything was appended
+    meta.setdefault("base_rows", meta["rows"])
+    meta["rows"] = len(store) + len(frame)
+    meta["source"] = _source_stamp(csv_path)
+    _write_meta(store.directory, meta)
+    return ColumnStore(store.directory)
+
+
+def _kind(name):
+    if name == DATE_COLUMN:
+        return "datetime"
+    if name in CATEGORICAL_COLUMNS:
+        return "categorical"
+    return "numeric"
+
+
+def _encode(series, spec, categories):
+    """Encode one chunk of a column into its storage dtype."""
+    kind = spec["kind"]
+    if kind == "datetime":
+        return pd.to_datetime(series, format=DATE_FORMAT).to_numpy("datetime64[ns]").view("<i8")
+    if kind == "categorical":
+        # Codes follow first appearance, so earlier chunks never need re-encoding
+        seen = categories.setdefault(spec["name"], {})
+        codes, uniques = pd.factorize(series)
+        mapping = np.array([seen.setdefault(value, len(seen)) for value in uniques], dtype="<i4")
+        return mapping[codes] if len(mapping) else codes.astype("<i4")
+    return series.to_numpy(dtype="<f8")
+
+
+def _write_meta(directory, meta):
+    path = os.path.join(directory, "meta.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(path + ".tmp", path)
+
+
+def open_store(csv_path, rebuild=True):
+    """Return the up-to-date store for ``csv_path``, building it if needed.
+
+    Returns ``None`` when the store is stale or missing and ``rebuild`` is False.
+    """
+    directory = store_path(csv_path)
+    try:
+        store = ColumnStore(directory)
+        if store.meta.get("version") == STORE_VERSION and store.meta["source"] == _source_stamp(csv_path):
+            return store
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_store(csv_path, directory) if rebuild else None
+
+
+def dataset_version(csv_path="climate_change_data.csv"):
+    """Cache key that changes whenever the dataset's rows change."""
+    try:
+        return open_store(csv_path).version
+    except Exception:
+        stamp = _source_stamp(csv_path)
+        return f"{stamp['size']}-{stamp['mtime_ns']}"
+
+
+def dataset_build(csv_path="climate_change_data.csv"):
+    """Cache key for state that folds in appended rows itself: changes only when the store is rebuilt."""
+    try:
+        return open_store(csv_path).build
+    except Exception:
+        return dataset_version(csv_path)
+
+
+@timed("dataset.load")
+def load_dataset(csv_path="climate_change_data.csv", columns=None):
+    """Load the dataset as a DataFrame from its store, falling back to the CSV."""
+    try:
+        return open_store(csv_path).to_frame(columns)
+    except Exception:
+        frame = pd.read_csv(csv_path, usecols=columns)
+        if DATE_COLUMN in frame.columns:
+            frame[DATE_COLUMN] = pd.to_datetime(frame[DATE_COLUMN], format=DATE_FORMAT)
+        return frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the climate CSV into a memory-mapped column store.")
+    parser.add_argument("csv", nargs="?", default="climate_change_data.csv")
+    parser.add_argument("--output", help="store directory (default: next to the CSV)")
+    args = parser.parse_args(argv)
+    store = build_store(args.csv, args.output)
+    print(f"Wrote {store.directory}: {len(store):,} rows, {len(store.columns)} columns")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Pre-aggregated summary statistics for ``describe()``-style summaries.
+
+``SummaryCube`` groups rows into buckets by one or more key columns (e.g.
+``Year``, or ``Year`` and ``Country``) and keeps, per bucket and numeric
+column, the count, shifted sum and sum of squares, min, max and a
+fixed-edge histogram. All of these merge by addition (or min/max), so the
+summary of any set of buckets is answered without touching the rows, and
+appending rows only updates the buckets they fall in.
+
+Quantiles are interpolated from the merged histograms; their error is at
+most one bin width (``quantile_error``). Histograms take ``4 * bins`` bytes
+per bucket and column, so fine-grained keys (e.g. Year x Country) call for
+fewer bins.
+"""
+import numpy as np
+import pandas as pd
+
+from climate_impact.timing import timed
+
+DEFAULT_BINS = 1024
+STATISTICS = ("count", "mean", "std", "min", "25%", "50%", "75%", "max")
+_QUANTILES = (0.25, 0.5, 0.75)
+
+
+class SummaryCube:
+    """Mergeable per-bucket statistics of ``frame``'s numeric columns.
+
+    ``keys`` are the bucket columns; ``columns`` defaults to every numeric
+    column that is not a key. Histogram edges span each column's range in
+    the initial frame; later values outside it are counted in the edge bins.
+    """
+
+    def __init__(self, frame, keys, columns=None, bins=DEFAULT_BINS):
+        self.keys = list(keys)
+        if columns is None:
+            columns = [c for c in frame.select_dtypes("number").columns if c not in self.keys]
+        self.columns = list(columns)
+        self.bins = bins
+
+        values = frame[self.columns].to_numpy(dtype=np.float64)
+        with np.errstate(all="ignore"):
+            low, high = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+        low, high = np.nan_to_num(low), np.nan_to_num(high)
+        high = np.where(high > low, high, low + 1.0)
+        self._low = low
+        self._width = (high - low) / bins
+        # Sums are taken around a per-column reference to keep sum-of-squares
+        # variance numerically stable
+        self._shift = (low + high) / 2
+
+        self._bucket_ids = {}
+        self.key_values = np.empty((0, len(self.keys)), dtype=object)
+        n_cols = len(self.columns)
+        self._count = np.zeros((0, n_cols), dtype=np.int64)
+        self._sum = np.zeros((0, n_cols))
+        self._sumsq = np.zeros((0, n_cols))
+        self._min = np.zeros((0, n_cols))
+        self._max = np.zeros((0, n_cols))
+        self._hist = np.zeros((0, n_cols, bins), dtype=np.int32)
+        # Rows added so far, for callers that feed the cube from an append-only source
+        self.rows = 0
+        self.update(frame)
+
+    def __len__(self):
+        """Number of buckets."""
+        return len(self._bucket_ids)
+
+    @property
+    def quantile_error(self):
+        """Upper bound on the quantile error per column (one histogram bin)."""
+        return pd.Series(self._width, index=self.columns)
+
+    def update(self, frame):
+        """Add ``frame``'s rows to the cube, creating buckets for new keys."""
+        if not len(frame):
+            return
+        self.rows += len(frame)
+        codes, uniques = pd.MultiIndex.from_frame(frame[self.keys]).factorize()
+        buckets = self._buckets_for(list(uniques))[codes]
+        n_buckets = len(self)
+        values = frame[self.columns].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        shifted = np.where(valid, values - self._shift, 0.0)
+
+        for j in range(len(self.columns)):
+            self._count[:, j] += np.bincount(buckets, valid[:, j], n_buckets).astype(np.int64)
+            self._sum[:, j] += np.bincount(buckets, shifted[:, j], n_buckets)
+            self._sumsq[:, j] += np.bincount(buckets, shifted[:, j] ** 2, n_buckets)
+            ok = valid[:, j]
+            np.minimum.at(self._min[:, j], buckets[ok], values[ok, j])
+            np.maximum.at(self._max[:, j], buckets[ok], values[ok, j])
+            bins = np.clip(((values[ok, j] - self._low[j]) / self._width[j]).astype(np.int64), 0, self.bins - 1)
+            flat = np.bincount(buckets[ok] * self.bins + bins, minlength=n_buckets * self.bins)
+            self._hist[:, j] += flat.reshape(n_buckets, self.bins).astype(np.int32)
+
+    def _buckets_for(self, keys):
+        """Bucket ids for a list of key tuples, growing the arrays for unseen keys."""
+        new = [k for k in keys if k not in self._bucket_ids]
+        if new:
+            start = len(self)
+            for i, key in enumerate(new):
+                self._bucket_ids[key] = start + i
+            added = np.empty((len(new), len(self.keys)), dtype=object)
+            added[:] = new
+            self.key_values = np.concatenate([self.key_values, added])
+            grow = len(new)
+            n_cols = len(self.columns)
+            self._count = np.concatenate([self._count, np.zeros((grow, n_cols), dtype=np.int64)])
+            self._sum = np.concatenate([self._sum, np.zeros((grow, n_cols))])
+            self._sumsq = np.concatenate([self._sumsq, np.zeros((grow, n_cols))])
+            self._min = np.concatenate([self._min, np.full((grow, n_cols), np.inf)])
+            self._max = np.concatenate([self._max, np.full((grow, n_cols), -np.inf)])
+            self._hist = np.concatenate([self._hist, np.zeros((grow, n_cols, self.bins), dtype=np.int32)])
+        return np.array([self._bucket_ids[k] for k in keys], dtype=np.int64)
+
+    def select(self, **filters):
+        """Boolean mask of buckets matching ``key=(low, high)`` ranges or ``key=[values]`` sets."""
+        mask = np.ones(len(self), dtype=bool)
+        for key, wanted in filters.items():
+            values = self.key_values[:, self.keys.index(key)]
+            if isinstance(wanted, tuple):
+                low, high = wanted
+                mask &= (values >= low) & (values <= high)
+            else:
+                mask &= np.isin(values, list(wanted))
+        return mask
+
+    @timed("dataset.describe")
+    def describe(self, columns=None, **filters):
+        """``DataFrame.describe()`` of the rows in the buckets matching ``filters``."""
+        columns = [c for c in (columns or self.columns) if c in self.columns]
+        idx = [self.columns.index(c) for c in columns]
+        mask = self.select(**filters)
+        count = self._count[mask][:, idx].sum(axis=0)
+        total = self._sum[mask][:, idx].sum(axis=0)
+        total_sq = self._sumsq[mask][:, idx].sum(axis=0)
+        hist = self._hist[mask][:, idx].sum(axis=0, dtype=np.int64)
+        with np.errstate(all="ignore"):
+            mean = total / count
+            std = np.sqrt(np.maximum(total_sq - total * mean, 0.0) / (count - 1))
+            low = np.where(count > 0, self._min[mask][:, idx].min(axis=0, initial=np.inf), np.nan)
+            high = np.where(count > 0, self._max[mask][:, idx].max(axis=0, initial=-np.inf), np.nan)
+        stats = [count.astype(np.float64), mean + self._shift[idx], std, low]
+        stats += [self._quantile(hist, idx, count, q, low, high) for q in _QUANTILES]
+        stats.append(high)
+        return pd.DataFrame(stats, index=list(STATISTICS), columns=columns)
+
+    def _quantile(self, hist, idx, count, q, low, high):
+        """Quantile from merged histograms (``hist`` is columns x bins), interpolated like pandas."""
+        out = np.full(len(idx), np.nan)
+        for i, j in enumerate(idx):
+            if count[i] == 0:
+                continue
+            cumulative = np.cumsum(hist[i])
+            rank = q * (count[i] - 1)
+            below, fraction = int(rank), rank - int(rank)
+            value = self._order_statistic(cumulative, j, below)
+            if fraction:
+                value += fraction * (self._order_statistic(cumulative, j, below + 1) - value)
+            out[i] = min(max(value, low[i]), high[i])
+        return out
+
+    def _order_statistic(self, cumulative, j, k):
+        """Estimate of the ``k``-th smallest value, assuming values spread evenly within a bin."""
+        b = int(np.searchsorted(cumulative, k, side="right"))
+        before = cumulative[b - 1] if b else 0
+        in_bin = cumulative[b] - before
+        return self._low[j] + (b + (k - before + 0.5) / in_bin) * self._width[j]
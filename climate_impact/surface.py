@@ -0,0 +1,262 @@
+"""Precomputed response surfaces for instant what-if queries.
+
+``build_surface`` evaluates a model once over a grid spanning the slider
+bounds of the columns it was fit on and writes the results as a raw
+float32 array (``values.bin``) plus ``meta.json``, next to the model file.
+``ResponseSurface`` memory-maps the array and answers queries by
+multilinear interpolation, which takes microseconds where the model takes
+milliseconds.
+
+Grids are adaptive: the tree ensembles only change value at their split
+thresholds, so each feature gets knots in proportion to how often the
+model splits on it, placed at the quantiles of those thresholds. A model
+on few features gets a dense grid within the budget; a model on all six
+spends its cells where the trees do. Every build is checked against the
+real model on random probes and the observed error is stored with the
+table.
+
+Usage::
+
+    python -m climate_impact.surface model1.npz model1.npz.surface
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from climate_impact.cache import model_digest
+from climate_impact.schema import FEATURE_DTYPE, MODEL_SCHEMAS, ModelSchema
+from climate_impact.scoring import load_model
+
+SURFACE_VERSION = 1
+# Grid cells per table; 2**21 float32 values is 8 MB
+DEFAULT_BUDGET = 2 ** 21
+ERROR_PROBES = 20_000
+# Rows per model evaluation while filling the grid
+_FILL_ROWS = 65_536
+
+
+def surface_path(model_path):
+    """Directory the surface for ``model_path`` lives in."""
+    return model_path + ".surface"
+
+
+def split_thresholds(model, column):
+    """Finite split thresholds ``model`` uses on ``column`` (empty if unknown)."""
+    names = list(getattr(model, "feature_names_in_", ()))
+    if not hasattr(model, "threshold") or column not in names:
+        return np.empty(0, dtype=FEATURE_DTYPE)
+    thresholds = model.threshold[model.feature == names.index(column)]
+    return thresholds[np.isfinite(thresholds)]
+
+
+def allocate_knots(weights, caps, budget):
+    """Knots per feature: start at 2 and grow the most split-heavy feature per knot."""
+    counts = [2] * len(weights)
+    cells = 2 ** len(weights)
+    while True:
+        growable = [j for j in range(len(counts))
+                    if counts[j] < caps[j] and cells // counts[j] * (counts[j] + 1) <= budget]
+        if not growable:
+            return counts
+        j = max(growable, key=lambda j: (weights[j] + 1) / counts[j])
+        cells = cells // counts[j] * (counts[j] + 1)
+        counts[j] += 1
+
+
+def choose_knots(model, features, budget=DEFAULT_BUDGET):
+    """Knot positions for each feature, within its slider bounds."""
+    thresholds = [split_thresholds(model, f.column) for f in features]
+    # Beyond the distinct thresholds extra knots cannot add detail
+    caps = [len(np.unique(t)) + 2 if len(t) else 2 for t in thresholds]
+    counts = allocate_knots([len(t) for t in thresholds], caps, budget)
+    knots = []
+    for feature, t, k in zip(features, thresholds, counts):
+        inside = t[(t > feature.min_value) & (t < feature.max_value)]
+        if len(inside) and k > 3:
+            # The model is flat below its lowest threshold, so a knot just
+            # under it keeps the whole lower plateau exact
+            below = np.nextafter(inside.min(), np.float32(-np.inf))
+            interior = np.concatenate([[below], np.quantile(inside, np.linspace(0, 1, k - 3))])
+        else:
+            interior = np.linspace(feature.min_value, feature.max_value, k)[1:-1]
+        knots.append(np.unique(np.concatenate([[feature.min_value], interior, [feature.max_value]])
+                               .astype(np.float64)))
+    return knots
+
+
+class ResponseSurface:
+    """A memory-mapped grid of model outputs with multilinear interpolation."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.name = self.meta["name"]
+        self.columns = tuple(self.meta["columns"])
+        self.knots = [np.asarray(k, dtype=np.float64) for k in self.meta["knots"]]
+        self.shape = tuple(len(k) for k in self.knots)
+        self.values = np.memmap(os.path.join(directory, "values.bin"), dtype="<f4", mode="r",
+                                shape=self.shape)
+        # A plain ndarray view of the map; indexing np.memmap itself is slower
+        self._flat = np.asarray(self.values).reshape(-1)
+        self._strides = np.array([int(np.prod(self.shape[j + 1:])) for j in range(len(self.shape))])
+        # Knots padded to one (d, max knots) table, so every axis is located in one step
+        self._padded = np.full((len(self.knots), max(self.shape)), np.inf)
+        for j, knots in enumerate(self.knots):
+            self._padded[j, :len(knots)] = knots
+        self._axes = np.arange(len(self.knots))
+        self._lo = self._padded[:, 0]
+        self._hi = np.array([k[-1] for k in self.knots])
+        self._last_cell = np.array(self.shape) - 2
+        # Offsets of the 2**d corners of a cell, and which end of each axis they take
+        corners = np.array(np.meshgrid(*[[0, 1]] * len(self.shape), indexing="ij")).reshape(len(self.shape), -1).T
+        self._corners = corners.astype(bool)
+        self._corner_offsets = corners @ self._strides
+        schema = MODEL_SCHEMAS[self.name]
+        self._schema = ModelSchema(schema.name, schema.target, self.columns)
+
+    @property
+    def error(self):
+        """Interpolation error observed against the model when the table was built."""
+        return self.meta["error"]
+
+    def __call__(self, features):
+        """Interpolated predictions for a full ``(n, len(FEATURES))`` matrix."""
+        return self.interpolate(self._schema.view(np.atleast_2d(features)))
+
+    def interpolate(self, rows):
+        """Interpolated predictions for rows of this surface's own columns."""
+        # Queries outside the slider bounds clamp to the edge of the grid
+        x = np.clip(np.atleast_2d(np.asarray(rows, dtype=np.float64)), self._lo, self._hi)
+        cell = np.minimum((x[:, :, None] >= self._padded).sum(axis=2) - 1, self._last_cell)
+        lower = self._padded[self._axes, cell]
+        upper = (x - lower) / (self._padded[self._axes, cell + 1] - lower)
+        # Weight of each corner is the product of its per-axis weights
+        weights = np.where(self._corners, upper[:, None, :], 1.0 - upper[:, None, :]).prod(axis=2)
+        corner_values = self._flat[(cell @ self._strides)[:, None] + self._corner_offsets]
+        return (weights * corner_values).sum(axis=1).astype(np.float32)
+
+
+def build_surface(model_path, name, directory=None, budget=DEFAULT_BUDGET, probes=ERROR_PROBES, seed=0):
+    """Evaluate the model in ``model_path`` over an adaptive grid and return the surface.
+
+    As with the column store, the table is written to a temporary directory
+    and moved into place, so concurrent readers never see a partial table.
+    """
+    directory = directory or surface_path(model_path)
+    model = load_model(model_path)
+    features = MODEL_SCHEMAS[name].bind(model).features
+    knots = choose_knots(model, features, budget)
+    shape = tuple(len(k) for k in knots)
+    started = time.perf_counter()
+    parent = os.path.dirname(os.path.abspath(directory))
+    tmp = tempfile.mkdtemp(prefix=".surface-", dir=parent)
+    os.chmod(tmp, 0o755)
+    try:
+        values = np.memmap(os.path.join(tmp, "values.bin"), dtype="<f4", mode="w+", shape=shape)
+        flat = values.reshape(-1)
+        for start in range(0, flat.size, _FILL_ROWS):
+            index = np.unravel_index(np.arange(start, min(start + _FILL_ROWS, flat.size)), shape)
+            grid = np.stack([k[i] for k, i in zip(knots, index)], axis=1).astype(FEATURE_DTYPE)
+            flat[start:start + len(grid)] = model.predict(grid)
+        values.flush()
+        del values, flat
+        meta = {
+            "version": SURFACE_VERSION,
+            "name": name,
+            "columns": [f.column for f in features],
+            "knots": [k.tolist() for k in knots],
+            "model": model_digest(model_path),
+            "build_seconds": time.perf_counter() - started,
+        }
+        _write_meta(tmp, meta)
+        meta["error"] = measure_error(ResponseSurface(tmp), model, knots, probes, seed)
+        _write_meta(tmp, meta)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            # Another process finished first; its table is equivalent
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return ResponseSurface(directory)
+
+
+def measure_error(surface, model, knots, probes=ERROR_PROBES, seed=0):
+    """Absolute interpolation error on random probes within the slider bounds.
+
+    Half the probes are uniform over the full bounds; the other half are
+    confined to the span of the interior knots, where the model varies.
+    """
+    rng = np.random.default_rng(seed)
+    lo = np.array([k[0] for k in knots])
+    hi = np.array([k[-1] for k in knots])
+    inner_lo = np.array([k[1] if len(k) > 2 else k[0] for k in knots])
+    inner_hi = np.array([k[-2] if len(k) > 2 else k[-1] for k in knots])
+    half = probes // 2
+    rows = np.concatenate([rng.uniform(lo, hi, (half, len(knots))),
+                           rng.uniform(inner_lo, inner_hi, (probes - half, len(knots)))]).astype(FEATURE_DTYPE)
+    error = np.abs(surface.interpolate(rows) - model.predict(rows))
+    return {
+        "probes": int(probes),
+        "mean": float(error.mean()),
+        "p50": float(np.percentile(error, 50)),
+        "p99": float(np.percentile(error, 99)),
+        "max": float(error.max()),
+    }
+
+
+def _write_meta(directory, meta):
+    path = os.path.join(directory, "meta.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(path + ".tmp", path)
+
+
+def open_surface(model_path, name, rebuild=True):
+    """Return the up-to-date surface for ``model_path``, building it if needed.
+
+    A table built from a different model file is stale. Returns ``None``
+    when the table is stale or missing and ``rebuild`` is False.
+    """
+    directory = surface_path(model_path)
+    try:
+        surface = ResponseSurface(directory)
+        if (surface.meta.get("version") == SURFACE_VERSION and surface.name == name
+                and surface.meta["model"] == model_digest(model_path)):
+            return surface
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_surface(model_path, name, directory) if rebuild else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute a model's response surface for interpolated queries.")
+    parser.add_argument("model", help="model file (.npz or .pkl)")
+    parser.add_argument("output", nargs="?", help="surface directory (default: <model>.surface)")
+    parser.add_argument("--name", choices=sorted(MODEL_SCHEMAS),
+                        help="model schema (default: from the file name)")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="maximum grid cells")
+    args = parser.parse_args(argv)
+    name = args.name or os.path.splitext(os.path.basename(args.model))[0]
+    if name not in MODEL_SCHEMAS:
+        parser.error(f"cannot infer the schema from {args.model}; pass --name")
+    surface = build_surface(args.model, name, args.output, budget=args.budget)
+    error = surface.error
+    print(f"Wrote {surface.directory}: grid {'x'.join(map(str, surface.shape))} over {', '.join(surface.columns)} "
+          f"in {surface.meta['build_seconds']:.1f}s; |error| mean {error['mean']:.3f}, "
+          f"p99 {error['p99']:.3f}, max {error['max']:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
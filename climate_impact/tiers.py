@@ -0,0 +1,233 @@
+"""Multi-resolution time series of every measure, for charts that must stay small.
+
+``Tiers`` pre-aggregates the dataset into daily, weekly (Monday-aligned),
+monthly and yearly sums and counts per country and globally. Every tier
+merges by addition, so appending rows only folds the new rows in and never
+rescans the history. Each tier is stored as sorted ``(group, period)``
+keys, so the buckets of one group in a date range are a contiguous slice
+found by binary search.
+
+``view`` answers a chart request: it picks the finest tier with at most
+``max_points`` buckets in the requested range, so a chart's payload is
+bounded by its width, not by the number of rows. If even the coarsest tier
+is too large, ``lttb`` (Largest-Triangle-Three-Buckets) thins it while
+keeping peaks and troughs.
+
+Usage::
+
+    python -m climate_impact.tiers climate_change_data.csv --parameter Temperature
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from climate_impact.analytics import COUNTRY_COLUMN, GLOBAL, PARAMETERS, with_indices
+from climate_impact.store import DATE_COLUMN
+
+TIERS = ("day", "week", "month", "year")
+# About one point per pixel of a full-width chart
+DEFAULT_POINTS = 800
+READINGS_COLUMN = "Readings"
+# Periods are offset into the low 32 bits of the key, below the group code
+_PERIOD_BITS = 32
+_PERIOD_OFFSET = 1 << 31
+# 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+_WEEK_SHIFT = 3
+
+
+def periods(dates, tier):
+    """Integer period of each of ``dates`` (datetime64) in ``tier``, counted from 1970."""
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    if tier == "day":
+        return dates.astype("datetime64[D]").astype(np.int64)
+    if tier == "week":
+        return (dates.astype("datetime64[D]").astype(np.int64) + _WEEK_SHIFT) // 7
+    if tier == "month":
+        return dates.astype("datetime64[M]").astype(np.int64)
+    if tier == "year":
+        return dates.astype("datetime64[Y]").astype(np.int64)
+    raise ValueError(f"Unknown tier {tier!r}, expected one of {TIERS}")
+
+
+def period_starts(codes, tier):
+    """First instant of each period, the inverse of ``periods``."""
+    codes = np.asarray(codes, dtype=np.int64)
+    if tier == "day":
+        return codes.astype("datetime64[D]").astype("datetime64[ns]")
+    if tier == "week":
+        return (codes * 7 - _WEEK_SHIFT).astype("datetime64[D]").astype("datetime64[ns]")
+    if tier == "month":
+        return codes.astype("datetime64[M]").astype("datetime64[ns]")
+    if tier == "year":
+        return codes.astype("datetime64[Y]").astype("datetime64[ns]")
+    raise ValueError(f"Unknown tier {tier!r}, expected one of {TIERS}")
+
+
+def lttb(x, y, threshold):
+    """Indices of ``threshold`` points of ``(x, y)`` chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; in between, each bucket of
+    points contributes the one forming the largest triangle with the point
+    kept before it and the mean of the next bucket. ``x`` must be sorted.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:max(threshold, 0)], dtype=np.int64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            next_x, next_y = x[stop:edges[i + 2]].mean(), y[stop:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[i + 1] = previous
+    return kept
+
+
+class Tiers:
+    """Per-period sums and counts of ``PARAMETERS`` for every tier, globally and per country.
+
+    Group 0 is ``GLOBAL`` and the others are countries in order of first
+    appearance. Per tier, ``keys`` are sorted ``group << 32 | period``
+    codes, ``sums`` is ``(keys, parameters)`` and ``counts`` is ``(keys,)``.
+    """
+
+    def __init__(self, frame=None):
+        self.groups = [GLOBAL]
+        self._group_codes = {GLOBAL: 0}
+        self._keys = {tier: np.zeros(0, dtype=np.int64) for tier in TIERS}
+        self._sums = {tier: np.zeros((0, len(PARAMETERS))) for tier in TIERS}
+        self._counts = {tier: np.zeros(0, dtype=np.int64) for tier in TIERS}
+        # Rows added so far, for callers that feed the tiers from an append-only source
+        self.rows = 0
+        if frame is not None:
+            self.update(frame)
+
+    def __len__(self):
+        """Buckets across all tiers."""
+        return sum(len(keys) for keys in self._keys.values())
+
+    def _codes_for(self, countries):
+        """Group codes of ``countries``, registering unseen ones."""
+        categorical = pd.Categorical(countries)
+        for name in categorical.categories:
+            if str(name) not in self._group_codes:
+                self._group_codes[str(name)] = len(self.groups)
+                self.groups.append(str(name))
+        lookup = np.array([self._group_codes[str(name)] for name in categorical.categories], dtype=np.int64)
+        return lookup[categorical.codes]
+
+    def update(self, frame):
+        """Fold ``frame``'s rows (a ``Date`` column and the measures) into every tier."""
+        if not len(frame):
+            return
+        self.rows += len(frame)
+        values = with_indices(frame)[list(PARAMETERS)].to_numpy(dtype=np.float64)
+        dates = frame[DATE_COLUMN].to_numpy(dtype="datetime64[ns]")
+        groups = [np.zeros(len(frame), dtype=np.int64)]
+        if COUNTRY_COLUMN in frame.columns:
+            groups.append(self._codes_for(frame[COUNTRY_COLUMN].astype(str).to_numpy()))
+        groups = np.concatenate(groups)
+        values = np.concatenate([values] * (len(groups) // len(frame)))
+        for tier in TIERS:
+            codes = np.tile(periods(dates, tier), len(groups) // len(frame))
+            new_keys, inverse = np.unique((groups << _PERIOD_BITS) | (codes + _PERIOD_OFFSET), return_inverse=True)
+            new_sums = np.stack([np.bincount(inverse, values[:, p], len(new_keys))
+                                 for p in range(len(PARAMETERS))], axis=1)
+            new_counts = np.bincount(inverse, minlength=len(new_keys)).astype(np.int64)
+            keys, sums, counts = self._keys[tier], self._sums[tier], self._counts[tier]
+            # Both key arrays are sorted: existing buckets are added to in
+            # place, and only unseen ones are spliced in
+            at = np.searchsorted(keys, new_keys)
+            found = at < len(keys)
+            found[found] = keys[at[found]] == new_keys[found]
+            sums[at[found]] += new_sums[found]
+            counts[at[found]] += new_counts[found]
+            if not found.all():
+                missing = ~found
+                keys = np.insert(keys, at[missing], new_keys[missing])
+                sums = np.insert(sums, at[missing], new_sums[missing], axis=0)
+                counts = np.insert(counts, at[missing], new_counts[missing])
+                self._keys[tier], self._sums[tier], self._counts[tier] = keys, sums, counts
+
+    def _slice(self, group, tier, start=None, end=None):
+        """``slice`` of ``group``'s buckets in ``tier`` from ``start`` to ``end`` (timestamps, inclusive)."""
+        code = self._group_codes[group]
+        low = periods([start], tier)[0] + _PERIOD_OFFSET if start is not None else 0
+        high = periods([end], tier)[0] + _PERIOD_OFFSET if end is not None else (1 << _PERIOD_BITS) - 1
+        keys = self._keys[tier]
+        first = np.searchsorted(keys, (code << _PERIOD_BITS) | low, side="left")
+        last = np.searchsorted(keys, (code << _PERIOD_BITS) | high, side="right")
+        return slice(int(first), int(last))
+
+    def points(self, group, tier, start=None, end=None):
+        """Number of buckets ``series`` would return."""
+        bounds = self._slice(group, tier, start, end)
+        return bounds.stop - bounds.start
+
+    def series(self, group, parameter, tier, start=None, end=None):
+        """``Date`` (period start), the mean of ``parameter`` and ``Readings`` for one group and tier."""
+        bounds = self._slice(group, tier, start, end)
+        keys = self._keys[tier][bounds]
+        counts = self._counts[tier][bounds]
+        return pd.DataFrame({
+            DATE_COLUMN: period_starts((keys & ((1 << _PERIOD_BITS) - 1)) - _PERIOD_OFFSET, tier),
+            parameter: self._sums[tier][bounds, PARAMETERS.index(parameter)] / counts,
+            READINGS_COLUMN: counts,
+        })
+
+    def choose(self, group, max_points=DEFAULT_POINTS, start=None, end=None):
+        """Finest tier with at most ``max_points`` buckets in the range, else the coarsest."""
+        for tier in TIERS:
+            if self.points(group, tier, start, end) <= max_points:
+                return tier
+        return TIERS[-1]
+
+    def view(self, group, parameter, max_points=DEFAULT_POINTS, start=None, end=None, tier=None):
+        """``(series, tier)`` with at most ``max_points`` rows for a chart of ``parameter``.
+
+        ``tier`` forces a resolution; the series is then thinned with
+        ``lttb`` if it has more buckets than ``max_points``.
+        """
+        tier = tier or self.choose(group, max_points, start, end)
+        frame = self.series(group, parameter, tier, start, end)
+        if len(frame) > max_points:
+            kept = lttb(frame[DATE_COLUMN].to_numpy().astype(np.int64), frame[parameter].to_numpy(), max_points)
+            frame = frame.iloc[kept].reset_index(drop=True)
+        return frame, tier
+
+
+def main(argv=None):
+    from climate_impact.store import load_dataset
+
+    parser = argparse.ArgumentParser(description="Show the size of each tier and the one a chart would use.")
+    parser.add_argument("csv", nargs="?", default="climate_change_data.csv")
+    parser.add_argument("--parameter", choices=PARAMETERS, default="Temperature")
+    parser.add_argument("--country", default=GLOBAL)
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS, help="largest series a chart may draw")
+    args = parser.parse_args(argv)
+    tiers = Tiers(load_dataset(args.csv))
+    print(f"{tiers.rows:,} rows, {len(tiers.groups) - 1:,} countries, {len(tiers):,} buckets")
+    for tier in TIERS:
+        print(f"{tier:>6}: {tiers.points(args.country, tier):>8,} points for {args.country}")
+    frame, tier = tiers.view(args.country, args.parameter, args.points)
+    print(f"\nA chart of at most {args.points:,} points uses the {tier} tier ({len(frame):,} points):")
+    print(frame.head().to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
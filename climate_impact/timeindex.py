@@ -0,0 +1,69 @@
+"""Sorted time index for year-range filtering.
+
+Rows are ordered by ``Date`` once (a no-op for the bundled dataset, which is
+already sorted) and a ``Year`` column is derived. A year range then maps to
+a contiguous row range found with two binary searches, and the result is a
+positional slice of the sorted frame rather than a boolean-mask copy.
+"""
+import numpy as np
+import pandas as pd
+
+from climate_impact.store import DATE_COLUMN
+from climate_impact.timing import timed
+
+YEAR_COLUMN = "Year"
+
+
+class TimeIndex:
+    """``frame`` sorted by date with O(log n) year-range slicing.
+
+    Frames without a ``Date`` column are indexed on an existing ``Year``
+    column instead.
+    """
+
+    def __init__(self, frame, date_column=DATE_COLUMN):
+        if date_column in frame.columns:
+            dates = frame[date_column]
+            if not dates.is_monotonic_increasing:
+                frame = frame.take(np.argsort(dates.to_numpy(), kind="stable"))
+                frame.reset_index(drop=True, inplace=True)
+            years = frame[date_column].dt.year.to_numpy(dtype=np.int32)
+            # Build the indexed frame around the existing columns so they stay
+            # views of the source (memory-mapped) arrays
+            columns = {c: frame[c] for c in frame.columns if c != YEAR_COLUMN}
+            columns[YEAR_COLUMN] = years
+            frame = pd.DataFrame(columns, copy=False)
+        elif YEAR_COLUMN in frame.columns:
+            if not frame[YEAR_COLUMN].is_monotonic_increasing:
+                frame = frame.sort_values(YEAR_COLUMN, kind="stable", ignore_index=True)
+            years = frame[YEAR_COLUMN].to_numpy()
+        else:
+            raise KeyError(f"Frame has neither a {date_column!r} nor a {YEAR_COLUMN!r} column")
+        self.frame = frame
+        self.years = years
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def min_year(self):
+        return int(self.years[0]) if len(self.years) else None
+
+    @property
+    def max_year(self):
+        return int(self.years[-1]) if len(self.years) else None
+
+    def bounds(self, first_year, last_year):
+        """Positional ``(start, stop)`` of the rows dated ``first_year``..``last_year`` inclusive."""
+        # Cast the bounds, not the years: a dtype mismatch makes numpy convert
+        # the whole array on every search
+        year = self.years.dtype.type
+        start = int(np.searchsorted(self.years, year(first_year), side="left"))
+        stop = int(np.searchsorted(self.years, year(last_year), side="right"))
+        return start, max(start, stop)
+
+    @timed("dataset.filter")
+    def between(self, first_year, last_year):
+        """Rows dated ``first_year``..``last_year`` inclusive, as a slice of the sorted frame."""
+        start, stop = self.bounds(first_year, last_year)
+        return self.frame.iloc[start:stop]
@@ -0,0 +1,113 @@
+"""Lightweight timing spans around the app's hot paths.
+
+``span("name")`` is a context manager and ``timed("name")`` a decorator;
+both record the wall time of each call into ``TIMINGS``, a process-wide
+``Timings`` that keeps the last ``MAX_SAMPLES`` durations per name. A span
+costs two ``perf_counter_ns`` calls and a deque append, so it stays on in
+production. ``report`` gives count and percentiles per name and ``to_json``
+the same as a document that ``benchmarks/suite.py --compare`` can diff
+against another release.
+
+Set ``CLIMATE_IMPACT_TIMING=0`` to turn recording off.
+"""
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import functools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+MAX_SAMPLES = 1_000
+PERCENTILES = (50, 90, 99)
+
+
+class Timings:
+    """Thread-safe ring buffers of durations (in seconds) per span name."""
+
+    def __init__(self, max_samples=MAX_SAMPLES, enabled=True):
+        self.max_samples = max_samples
+        self.enabled = enabled
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+                self._counts[name] = 0
+            samples.append(seconds)
+            self._counts[name] += 1
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            # Skip the clock reads too; record would drop the sample anyway
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter_ns() - start) / 1e9)
+
+    def timed(self, name):
+        """Decorator recording every call of the wrapped function as ``name``."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def report(self):
+        """``{name: {"count", "mean_ms", "p50_ms", ..., "max_ms"}}`` over the retained samples."""
+        with self._lock:
+            snapshot = {name: (np.fromiter(samples, dtype=np.float64), self._counts[name])
+                        for name, samples in self._samples.items()}
+        report = {}
+        for name, (samples, count) in sorted(snapshot.items()):
+            stats = {"count": count, "mean_ms": float(samples.mean() * 1e3)}
+            for p, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES)):
+                stats[f"p{p}_ms"] = float(value * 1e3)
+            stats["max_ms"] = float(samples.max() * 1e3)
+            report[name] = stats
+        return report
+
+    def to_json(self, **extra):
+        """The report as a JSON document, with a timestamp and any ``extra`` fields."""
+        document = {"created": datetime.now(timezone.utc).isoformat(timespec="seconds"), **extra,
+                    "spans": self.report()}
+        return json.dumps(document, indent=2)
+
+
+TIMINGS = Timings(enabled=os.environ.get("CLIMATE_IMPACT_TIMING", "1") != "0")
+span = TIMINGS.span
+timed = TIMINGS.timed
+
+
+def compare(current, baseline, threshold=0.2, min_ms=0.5, statistic="p50_ms"):
+    """Spans of ``current`` whose ``statistic`` grew by more than ``threshold`` over ``baseline``.
+
+    Both are ``spans`` mappings as in ``report``; returns ``[(name, before,
+    after)]``. Differences under ``min_ms`` are timer noise and never count.
+    """
+    regressions = []
+    for name, stats in current.items():
+        before = baseline.get(name, {}).get(statistic)
+        if before and stats[statistic] > max(before * (1 + threshold), before + min_ms):
+            regressions.append((name, before, stats[statistic]))
+    return regressions
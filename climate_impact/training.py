@@ -0,0 +1,362 @@
+"""Reproducible training pipeline for the index models.
+
+Replaces the steps of Untitled.ipynb: the targets are the notebook formulas
+(``climate_impact.analytic``), each model is fit on its notebook columns
+(``MODEL_SCHEMAS``) and the defaults are the notebook's hyperparameters.
+
+The dataset is read once into its memory-mapped column store; workers of a
+spawned process pool map the same pages instead of parsing the CSV. Every
+(model, hyperparameters) candidate is one task, so both targets and the
+whole sweep train concurrently, each XGBoost fit limited to
+``threads_per_model`` threads. Candidates are compared on a validation
+split; the winner is refit on training plus validation rows and scored on
+the held-out test rows. Splits and seeds are fixed, so a rerun on the same
+data reproduces the models.
+
+Each run writes ``artifacts/<version>/`` with the pickled and compiled
+models, their interval tables (calibrated on the test rows) and
+``manifest.json`` (feature order and columns, data hash, hyperparameters,
+RMSE/R², training time, the sweep results and the coverage the intervals
+reached on held-out rows), then points ``artifacts/LATEST`` at it. The
+app verifies the manifest before loading the models it lists.
+
+Usage::
+
+    python -m climate_impact.training --sweep
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from climate_impact import analytic
+from climate_impact.schema import FEATURE_COLUMNS, MODEL_SCHEMAS
+
+MANIFEST_VERSION = 1
+ARTIFACTS_DIR = "artifacts"
+MANIFEST = "manifest.json"
+LATEST = "LATEST"
+
+SEED = 42
+TEST_SIZE = 0.2
+VALIDATION_SIZE = 0.2
+# Untitled.ipynb's settings, used when there is no sweep
+DEFAULT_PARAMS = {"n_estimators": 100, "learning_rate": 0.1, "max_depth": 5}
+SWEEP_GRID = {
+    "n_estimators": (100, 200, 400),
+    "learning_rate": (0.05, 0.1, 0.2),
+    "max_depth": (3, 5, 7),
+}
+
+
+@dataclass(frozen=True)
+class TrainTask:
+    """Fit one model with one set of hyperparameters.
+
+    ``final`` fits on training plus validation rows and scores the test
+    rows; otherwise it fits on training rows and scores the validation rows.
+    """
+
+    name: str
+    params: tuple
+    csv_path: str
+    version: str
+    threads: int = 1
+    final: bool = False
+    seed: int = SEED
+
+    @property
+    def settings(self):
+        return dict(self.params)
+
+
+@dataclass
+class TrainResult:
+    name: str
+    params: dict
+    rmse: float
+    r2: float
+    n_train: int
+    n_eval: int
+    seconds: float
+    model: object = field(default=None, repr=False)
+
+
+def file_sha256(path, chunk=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def split_rows(n, seed=SEED, test_size=TEST_SIZE, validation_size=VALIDATION_SIZE):
+    """``(train, validation, test)`` row indices of one seeded permutation."""
+    order = np.random.default_rng(seed).permutation(n)
+    n_test = int(round(n * test_size))
+    n_validation = int(round((n - n_test) * validation_size))
+    return order[n_test + n_validation:], order[n_test:n_test + n_validation], order[:n_test]
+
+
+def regression_metrics(truth, predicted):
+    """``(rmse, r2)`` of ``predicted`` against ``truth``."""
+    truth = np.asarray(truth, dtype=np.float64)
+    residuals = truth - np.asarray(predicted, dtype=np.float64)
+    total = ((truth - truth.mean()) ** 2).sum()
+    r2 = 1.0 - (residuals ** 2).sum() / total if total else 0.0
+    return float(np.sqrt(np.mean(residuals ** 2))), float(r2)
+
+
+def sweep_params(grid=SWEEP_GRID):
+    """Every combination of ``grid`` as a sorted tuple of items."""
+    keys = sorted(grid)
+    return [tuple(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+# Per-worker training data, mapped from the column store on first use
+_worker_data = {}
+
+
+def _init_worker(threads):
+    # Must be set before xgboost loads its OpenMP runtime
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+
+
+def training_data(csv_path, version=""):
+    """``(features, targets)``: the float32 feature matrix and both notebook indices."""
+    key = (csv_path, version)
+    data = _worker_data.get(key)
+    if data is None:
+        from climate_impact.scoring import feature_matrix
+        from climate_impact.store import load_dataset
+
+        rows = feature_matrix(load_dataset(csv_path, columns=list(FEATURE_COLUMNS)))
+        risk, severity = analytic.predict_indices(rows)
+        data = _worker_data[key] = (rows, dict(zip(analytic.INDEX_NAMES, (risk, severity))))
+    return data
+
+
+def fit_candidate(task):
+    """Run ``task`` and return its ``TrainResult``; the fitted model only for final fits."""
+    import pandas as pd
+    import xgboost as xgb
+
+    rows, targets = training_data(task.csv_path, task.version)
+    schema = MODEL_SCHEMAS[task.name]
+    train, validation, test = split_rows(len(rows), task.seed)
+    if task.final:
+        train, evaluate = np.concatenate([train, validation]), test
+    else:
+        evaluate = validation
+    features = pd.DataFrame(schema.view(rows), columns=list(schema.columns))
+    target = targets[schema.target]
+    model = xgb.XGBRegressor(**task.settings, n_jobs=task.threads, random_state=task.seed)
+    start = time.perf_counter()
+    model.fit(features.iloc[train], target[train])
+    seconds = time.perf_counter() - start
+    rmse, r2 = regression_metrics(target[evaluate], model.predict(features.iloc[evaluate]))
+    return TrainResult(task.name, task.settings, rmse, r2, len(train), len(evaluate), seconds,
+                       model if task.final else None)
+
+
+def train(csv_path="climate_change_data.csv", output=ARTIFACTS_DIR, sweep=False, workers=None,
+          threads_per_model=None, seed=SEED, log=print):
+    """Train both models, write a versioned artifact directory and return its path."""
+    from climate_impact.store import open_store
+
+    started = time.perf_counter()
+    store = open_store(csv_path)
+    data_version = store.version
+    candidates = sweep_params() if sweep else [tuple(sorted(DEFAULT_PARAMS.items()))]
+    workers = workers or min(os.cpu_count() or 1, len(MODEL_SCHEMAS) * len(candidates))
+    threads = threads_per_model or max(1, (os.cpu_count() or 1) // workers)
+    log(f"Training {', '.join(MODEL_SCHEMAS)} on {len(store):,} rows: {len(candidates)} candidate(s) each, "
+        f"{workers} workers x {threads} threads")
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(threads,)) as pool:
+        best = {}
+        sweeps = {name: [] for name in MODEL_SCHEMAS}
+        if sweep:
+            tasks = [TrainTask(name, params, csv_path, data_version, threads, seed=seed)
+                     for name in MODEL_SCHEMAS for params in candidates]
+            for result in pool.map(fit_candidate, tasks):
+                sweeps[result.name].append(result)
+            for name, results in sweeps.items():
+                best[name] = min(results, key=lambda r: r.rmse).params
+                log(f"  {name}: best of {len(results)} on validation {best[name]} "
+                    f"(RMSE {min(r.rmse for r in results):.4f})")
+        else:
+            best = {name: dict(candidates[0]) for name in MODEL_SCHEMAS}
+        finals = list(pool.map(fit_candidate, [
+            TrainTask(name, tuple(sorted(best[name].items())), csv_path, data_version, threads, final=True, seed=seed)
+            for name in MODEL_SCHEMAS
+        ]))
+
+    # Intervals are calibrated on the test rows the final models never saw
+    rows, _ = training_data(csv_path, data_version)
+    train_rows, validation_rows, test_rows = split_rows(len(rows), seed)
+    calibration = (rows[np.concatenate([train_rows, validation_rows])], rows[test_rows])
+    data_hash = file_sha256(csv_path)
+    version = f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{data_hash[:8]}"
+    directory = write_artifacts(output, version, csv_path, data_hash, len(store), finals, sweeps, seed,
+                                time.perf_counter() - started, calibration)
+    for result in finals:
+        log(f"  {result.name}: test RMSE {result.rmse:.4f}, R² {result.r2:.5f}, "
+            f"fit in {result.seconds:.1f}s")
+    return directory
+
+
+def write_artifacts(output, version, csv_path, data_hash, rows, finals, sweeps, seed, seconds, calibration,
+                    parent=None):
+    """Write models, interval tables and the manifest, then point ``LATEST`` at them.
+
+    ``calibration`` is ``(fit_rows, held_out)``: full feature rows the
+    models were fit on, and rows none of them saw, which calibrate the
+    interval tables. ``parent`` names the version the models were continued
+    from, if any.
+
+    Files go to a temporary directory that is renamed into place, so a
+    reader never sees a partial version.
+    """
+    import joblib
+    import numpy
+    import xgboost
+
+    from climate_impact.forest import TreeEnsemble
+    from climate_impact.intervals import build_intervals, intervals_path
+
+    os.makedirs(output, exist_ok=True)
+    directory = os.path.join(output, version)
+    tmp = tempfile.mkdtemp(prefix=".artifacts-", dir=output)
+    os.chmod(tmp, 0o755)
+    try:
+        models = {}
+        for result in finals:
+            schema = MODEL_SCHEMAS[result.name]
+            pickled, compiled = f"{result.name}.pkl", f"{result.name}.npz"
+            joblib.dump(result.model, os.path.join(tmp, pickled))
+            TreeEnsemble.from_xgboost(result.model).save(os.path.join(tmp, compiled))
+            intervals = build_intervals(os.path.join(tmp, compiled), result.name, fit_rows=calibration[0],
+                                        held_out=calibration[1])
+            files = {kind: {"path": path, "sha256": file_sha256(os.path.join(tmp, path))} for kind, path in
+                     (("pkl", pickled), ("npz", compiled),
+                      ("intervals", os.path.basename(intervals_path(compiled))))}
+            models[result.name] = {
+                "target": schema.target,
+                "columns": [str(c) for c in result.model.feature_names_in_],
+                "params": result.params,
+                "files": files,
+                "metrics": {"rmse": result.rmse, "r2": result.r2, "n_train": result.n_train, "n_test": result.n_eval},
+                "train_seconds": result.seconds,
+                "intervals": {
+                    "held_out_rows": len(calibration[1]),
+                    "target_coverage": intervals.coverage,
+                    "measured": {group: {"coverage": covered, "mean_width": width, "rows": n}
+                                 for group, (covered, width, n) in intervals.calibration.items()},
+                },
+                "sweep": [{"params": r.params, "rmse": r.rmse, "r2": r.r2, "seconds": r.seconds}
+                          for r in sweeps.get(result.name, [])],
+            }
+        manifest = {
+            "manifest_version": MANIFEST_VERSION,
+            "version": version,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "data": {"path": os.path.basename(csv_path), "sha256": data_hash, "rows": rows},
+            "feature_order": list(FEATURE_COLUMNS),
+            "split": {"seed": seed, "test": TEST_SIZE, "validation": VALIDATION_SIZE},
+            "libraries": {"xgboost": xgboost.__version__, "numpy": numpy.__version__},
+            "pipeline_seconds": seconds,
+            "parent": parent,
+            "models": models,
+        }
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, directory)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    with open(os.path.join(output, LATEST + ".tmp"), "w") as f:
+        f.write(version + "\n")
+    os.replace(os.path.join(output, LATEST + ".tmp"), os.path.join(output, LATEST))
+    return directory
+
+
+def latest_artifacts(output=ARTIFACTS_DIR):
+    """Directory ``LATEST`` points at, or None when nothing has been trained."""
+    try:
+        with open(os.path.join(output, LATEST)) as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(output, version) if version else None
+
+
+def verify_artifacts(directory, csv_path=None):
+    """Check a manifest against its files and the app's schema.
+
+    Returns ``(manifest, model paths by name, warnings)``. Raises
+    ``ValueError`` when a file is missing or altered or the feature schema
+    differs; training on a different dataset than ``csv_path`` is only a
+    warning.
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"{directory}: unreadable manifest ({e})") from None
+    if manifest.get("manifest_version") != MANIFEST_VERSION:
+        raise ValueError(f"{directory}: unsupported manifest version {manifest.get('manifest_version')}")
+    if manifest["feature_order"] != list(FEATURE_COLUMNS):
+        raise ValueError(f"{directory}: feature order {manifest['feature_order']} does not match the app")
+    paths = {}
+    for name in MODEL_SCHEMAS:
+        entry = manifest["models"].get(name)
+        if entry is None:
+            raise ValueError(f"{directory}: no {name} in the manifest")
+        unknown = [c for c in entry["columns"] if c not in FEATURE_COLUMNS]
+        if unknown or entry["target"] != MODEL_SCHEMAS[name].target:
+            raise ValueError(f"{directory}: {name} schema does not match the app")
+        for kind, file in entry["files"].items():
+            path = os.path.join(directory, file["path"])
+            if not os.path.exists(path):
+                raise ValueError(f"{directory}: {name} {kind} file {file['path']} is missing")
+            if file_sha256(path) != file["sha256"]:
+                raise ValueError(f"{directory}: {name} {kind} file {file['path']} does not match its hash")
+        paths[name] = os.path.join(directory, entry["files"]["npz"]["path"])
+    warnings = []
+    if csv_path is not None and os.path.exists(csv_path) and file_sha256(csv_path) != manifest["data"]["sha256"]:
+        warnings.append(f"Models {manifest['version']} were trained on a different version of {csv_path}")
+    return manifest, paths, warnings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the Climate Risk and Weather Severity models.")
+    parser.add_argument("csv", nargs="?", default="climate_change_data.csv")
+    parser.add_argument("--output", default=ARTIFACTS_DIR, help="artifact root (default: artifacts)")
+    parser.add_argument("--sweep", action="store_true", help="search SWEEP_GRID on a validation split")
+    parser.add_argument("--workers", type=int, help="training processes (default: one per task, up to the CPUs)")
+    parser.add_argument("--threads-per-model", type=int, help="XGBoost threads per fit (default: CPUs / workers)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.csv):
+        parser.error(f"{args.csv} does not exist")
+    directory = train(args.csv, args.output, args.sweep, args.workers, args.threads_per_model, args.seed)
+    manifest, _, _ = verify_artifacts(directory)
+    print(f"Wrote {directory} in {manifest['pipeline_seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
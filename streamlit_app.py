@@ -1,12 +1,33 @@
 import streamlit as st
-import joblib
 import numpy as np
 import pandas as pd
 import os
-import matplotlib.pyplot as plt
-import altair as alt
+import io
+import threading
+import time
 from datetime import datetime
 
+from climate_impact import scoring
+from climate_impact.scoring import (
+    RISK_BOUNDS,
+    SEVERITY_BOUNDS,
+    classify,
+    feature_matrix,
+    iter_scored,
+    predict_indices,
+)
+from climate_impact.analytic import INDEX_NAMES
+from climate_impact.startup import ModelLoader
+from climate_impact.store import dataset_build, dataset_version
+from climate_impact.timing import TIMINGS, span
+from climate_impact.training import latest_artifacts
+
+# Anything else is imported by the page that uses it, so a page's first
+# paint only pays for its own modules (`python -m climate_impact.startup`)
+
+# Recorded as the "app.rerun" span once the page has rendered
+rerun_start = time.perf_counter()
+
 # Page configuration
 st.set_page_config(
     page_title="Climate Impact Predictor",
@@ -72,29 +93,245 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load models safely
+# The latest `python -m climate_impact.training` run, checked once against its
+# manifest; None, None, [] and the error if any file or the schema is off
 @st.cache_resource
-def load_model(path):
+def load_artifacts(directory):
+    from climate_impact.training import verify_artifacts
+
+    try:
+        return verify_artifacts(directory, "climate_change_data.csv") + (None,)
+    except ValueError as e:
+        return None, None, [], str(e)
+
+# Verified trained artifacts if there are any, else the bundled models compiled
+# with `python -m climate_impact.forest model1.pkl model1.npz`.
+# Only the pages that predict load them, on first use; replacing a model
+# file reloads it. Set CLIMATE_IMPACT_WARM_MODELS=1 to load them on a
+# background thread from the first visit to any page instead.
+BUNDLED_MODEL_PATHS = {"model1": "model1.npz", "model2": "model2.npz"}
+artifacts_dir = latest_artifacts()
+manifest, artifact_paths, artifact_warnings, artifact_error = (
+    load_artifacts(artifacts_dir) if artifacts_dir else (None, None, [], None))
+MODEL_PATHS = artifact_paths or BUNDLED_MODEL_PATHS
+MODEL_PAGES = ("🏠 Home", "📦 Batch Scoring")
+
+@st.cache_resource(max_entries=1)
+def load_model_loader(paths):
+    loader = ModelLoader(dict(paths))
+    if os.environ.get("CLIMATE_IMPACT_WARM_MODELS") == "1":
+        loader.warm()
+    return loader
+
+# Load models safely
+def load_models():
+    models, versions = [], {}
+    for name in MODEL_PATHS:
+        try:
+            model, versions[name] = load_model_loader(tuple(MODEL_PATHS.items())).get(name)
+        except Exception as e:
+            st.error(f"Error loading model: {e}")
+            model, versions[name] = None, None
+        models.append(model)
+    return models[0], models[1], versions
+
+# Shared across sessions: compares a sample of analytic scores with the models.
+# Keyed on the model versions, so a retrained or refreshed model gets a new monitor
+@st.cache_resource(max_entries=1)
+def load_drift_monitor(versions):
+    return scoring.drift_monitor(model1, model2, sample_rate=0.05)
+
+# cache_resource hands every session the same memory-mapped frame;
+# cache_data would pickle a private copy per rerun. Keyed on the dataset
+# version so rows appended by `python -m climate_impact.ingest` show up;
+# sessions still holding the previous frame keep it until they rerun
+@st.cache_resource(max_entries=1)
+def load_data(version):
+    from climate_impact.store import load_dataset
+
     try:
-        return joblib.load(path)
+        return load_dataset("climate_change_data.csv")
     except Exception as e:
-        st.error(f"Error loading model: {e}")
+        # Not cached: the next rerun tries again
+        st.error(f"Could not load climate_change_data.csv: {e}")
+        st.stop()
+
+# Learned predictions (with their intervals, when the tables exist) for
+# quantized inputs, shared by all sessions and warmed with the dataset's
+# rows; a new model digest drops stale entries
+@st.cache_resource
+def load_prediction_cache():
+    from climate_impact.cache import PredictionCache
+
+    cache = PredictionCache()
+    if model1 and model2:
+        try:
+            rows = feature_matrix(load_data(dataset_version("climate_change_data.csv")))
+        except KeyError:
+            rows = None
+        if rows is not None:
+            for name, model in (("model1", model1), ("model2", model2)):
+                cache.warm(name, model, model_versions[name], rows, load_intervals(name, model_versions[name]))
+    return cache
+
+# Interpolation tables for live estimates, built offline with
+# `python -m climate_impact.surface model1.npz`; None if missing or stale
+@st.cache_resource
+def load_surface(name, version):
+    from climate_impact.surface import open_surface
+
+    try:
+        return open_surface(MODEL_PATHS[name], name, rebuild=False)
+    except Exception:
         return None
 
-model1 = load_model("model1.pkl")
-model2 = load_model("model2.pkl")
+# Interval tables calibrated on held-out rows, built with `python -m climate_impact.intervals
+# model1.npz`; None if missing or calibrated against another model file
+@st.cache_resource
+def load_intervals(name, version):
+    from climate_impact.intervals import open_intervals
+
+    try:
+        return open_intervals(MODEL_PATHS[name], name, rebuild=False)
+    except Exception:
+        return None
+
+# Per-country and per-location means and percentiles of every measure and
+# index, built with `python -m climate_impact.baselines`; rebuilt when the data changes
+@st.cache_resource(max_entries=1)
+def load_baselines(version):
+    from climate_impact.baselines import open_baselines
+
+    try:
+        return open_baselines("climate_change_data.csv")
+    except Exception:
+        return None
+
+# Contributions and sensitivity sweeps per input row; the sweep is one
+# batched prediction per model, and repeated inputs are served from here
+@st.cache_data(max_entries=256, show_spinner=False)
+def explain_inputs(engine, versions, values):
+    from climate_impact.explain import explain, sensitivity
+
+    return explain(model1, model2, values, engine), sensitivity(model1, model2, values, engine)
+
+# Gauge bands drawn once; each prediction only composites its markers
+@st.cache_resource
+def load_gauges():
+    from climate_impact.charts import GaugeStrip
+
+    return GaugeStrip()
+
+# Rows sorted by date with a derived Year column, for binary-search filtering
+@st.cache_resource(max_entries=1)
+def load_time_index(version):
+    from climate_impact.timeindex import TimeIndex
+
+    return TimeIndex(load_data(version))
+
+# Per-year statistics, so the summary never rescans the rows; built once and
+# then only folds in rows ingested since (see summary_catch_up)
+@st.cache_resource(max_entries=1)
+def load_summary_cube(build):
+    from climate_impact.summary import SummaryCube
+
+    return SummaryCube(load_time_index(dataset_version("climate_change_data.csv")).frame, keys=["Year"])
+
+# Day/week/month/year means for the Analytics charts, caught up the same way.
+# Both are keyed on the store's build, so a rebuilt or replaced dataset starts
+# them afresh while appends keep folding in
+@st.cache_resource(max_entries=1)
+def load_tiers(build):
+    from climate_impact.tiers import Tiers
+
+    return Tiers(load_time_index(dataset_version("climate_change_data.csv")).frame)
+
+# Serializes folding appended rows into the summary cube and the tiers
+@st.cache_resource
+def load_summary_lock():
+    return threading.Lock()
+
+# Sort permutations are computed once per column and shared by all sessions
+@st.cache_resource(max_entries=1)
+def load_paged_view(version):
+    from climate_impact.paging import PagedView
+
+    return PagedView(load_time_index(version).frame)
+
+# Yearly trends for every parameter and country, refitted when the data changes
+@st.cache_resource(max_entries=1)
+def load_trends(version):
+    from climate_impact.analytics import compute_trends
+
+    return compute_trends(load_time_index(version).frame)
+
+# One process pool and result cache for Custom Analytics, shared by all sessions
+@st.cache_resource
+def load_job_runner():
+    from climate_impact.jobs import JobRunner
+
+    return JobRunner()
+
+# Monte Carlo projections from the fitted trends, run in the shared process
+# pool and cached per request; the workers load the models from MODEL_PATHS
+@st.cache_data(max_entries=32, show_spinner=False)
+def run_scenario(region, years, trajectories, engine, model_digests, data_version):
+    from climate_impact.scenarios import ScenarioBasis, simulate
+
+    basis = ScenarioBasis.fit(load_time_index(data_version).frame, region, load_trends(data_version))
+    return simulate(basis, years, trajectories, engine=engine, model_paths=tuple(MODEL_PATHS.values()),
+                    executor=load_job_runner())
 
 # Sidebar with improved navigation
 with st.sidebar:
     st.image("https://via.placeholder.com/150x150.png?text=Climate+App", width=150)
     st.markdown("### 📌 Navigation")
-    page = st.radio("", ["🏠 Home", "📊 Dataset", "ℹ️ About", "📈 Analytics"])
+    pages = ["🏠 Home", "📊 Dataset", "📦 Batch Scoring", "ℹ️ About", "📈 Analytics"]
+    # Hidden unless the URL carries ?admin=1
+    if st.query_params.get("admin") == "1":
+        pages.append("🛠 Performance")
+    page = st.radio("", pages)
     
     st.markdown("---")
     st.markdown("### 🌐 Current Status")
     current_date = datetime.now().strftime("%B %d, %Y")
     st.markdown(f"**Date:** {current_date}")
     
+    st.markdown("### ⚙️ Scoring Engine")
+    engine_label = st.selectbox("Engine", ["Learned models", "Analytic formulas"],
+                                help="Analytic formulas compute the indices directly from their definitions; "
+                                     "a sample of requests is also scored by the models to track drift.")
+    engine = "analytic" if engine_label == "Analytic formulas" else "learned"
+    if page in MODEL_PAGES:
+        model1, model2, model_versions = load_models()
+    else:
+        model1 = model2 = None
+        model_versions = dict.fromkeys(MODEL_PATHS)
+    monitor = load_drift_monitor(tuple(model_versions.items())) if engine == "analytic" and model1 and model2 else None
+    if monitor is not None:
+        with st.expander("📉 Model drift"):
+            drift = monitor.report()
+            st.caption(f"{drift['compared']:,} of {drift['observed']:,} scored rows compared (analytic − learned)")
+            drift_rows = {name: drift[name] for name in INDEX_NAMES if drift[name]}
+            if drift_rows:
+                st.dataframe(pd.DataFrame(drift_rows).T.round(3), use_container_width=True)
+    elif model1 and model2:
+        with st.expander("🗃️ Prediction cache"):
+            cache_stats = load_prediction_cache().stats()
+            st.caption(f"{cache_stats['entries']:,} entries · {cache_stats['hit_rate']:.0%} hit rate")
+            st.json(cache_stats, expanded=False)
+    
+    if manifest is not None or artifact_error:
+        with st.expander("🧪 Trained models"):
+            if artifact_error:
+                st.error(f"{artifact_error}. Using the bundled models instead.")
+            else:
+                st.caption(f"Version {manifest['version']}, trained on {manifest['data']['rows']:,} rows")
+                for warning in artifact_warnings:
+                    st.warning(warning)
+                st.dataframe(pd.DataFrame({name: entry["metrics"] for name, entry in manifest["models"].items()}).T,
+                             use_container_width=True)
+    
     # Example of a sidebar info panel
     with st.expander("ℹ️ How to use"):
         st.write("""
@@ -103,8 +340,11 @@ with st.sidebar:
         3. View visualizations and insights
         """)
 
-# Main content
-if page == "🏠 Home":
+# Main content: one function per page, called at the end of the script
+def render_home():
+    from climate_impact.charts import COMPARISON_SPEC, comparison_data
+    from climate_impact.schema import FEATURES, as_rows
+    
     # Header
     st.markdown("""
     <div class="header-container">
@@ -121,23 +361,38 @@ if page == "🏠 Home":
         st.subheader("📝 Input Features")
         
         # Use sliders for better UX
-        feature1 = st.slider("Temperature (°C)", min_value=-20.0, max_value=50.0, value=0.0, step=0.1,
-                             help="Average temperature in Celsius")
-        feature2 = st.slider("CO₂ Emissions (ppm)", min_value=0.0, max_value=1000.0, value=0.0, step=0.1,
-                             help="Carbon dioxide levels in parts per million")
-        feature3 = st.slider("Sea Level Rise (mm)", min_value=0.0, max_value=500.0, value=0.0, step=0.1,
-                             help="Sea level rise in millimeters")
+        # Slider bounds and help text come from the shared feature schema
+        def feature_slider(feature):
+            return st.slider(feature.label, min_value=feature.min_value, max_value=feature.max_value,
+                             value=feature.default, step=feature.step, help=feature.help)
+        
+        feature1, feature2, feature3 = [feature_slider(f) for f in FEATURES[:3]]
         
         # Add collapsible section for advanced parameters
         with st.expander("Advanced Parameters"):
-            feature4 = st.slider("Precipitation (mm)", min_value=0.0, max_value=500.0, value=0.0, step=0.1,
-                                help="Average precipitation in millimeters")
-            feature5 = st.slider("Humidity (%)", min_value=0.0, max_value=100.0, value=0.0, step=0.1,
-                                help="Relative humidity percentage")
-            feature6 = st.slider("Wind Speed (km/h)", min_value=0.0, max_value=200.0, value=0.0, step=0.1,
-                                help="Average wind speed in kilometers per hour")
-        
-        features = np.array([[feature1, feature2, feature3, feature4, feature5, feature6]])
+            feature4, feature5, feature6 = [feature_slider(f) for f in FEATURES[3:]]
+        
+        features = as_rows([feature1, feature2, feature3, feature4, feature5, feature6])
+        
+        # Predictions are compared with the chosen place's own history
+        baselines = load_baselines(dataset_version("climate_change_data.csv"))
+        baseline_group, baseline_name = 0, "Global"
+        if baselines is not None:
+            country = st.selectbox("📍 Compare with", ["All locations"] + sorted(baselines.countries))
+            if country != "All locations":
+                location = st.selectbox("Location", ["Whole country"] + sorted(baselines.locations_in(country)))
+                baseline_group = baselines.group(country, location)
+                baseline_name = baselines.describe(baseline_group)
+                if location != "Whole country" and baseline_name == country:
+                    st.caption(f"{location} has too few readings for its own baseline; comparing with {country}.")
+        
+        # Live estimate from the precomputed surfaces, updated as the sliders move
+        surface1 = load_surface("model1", model_versions["model1"])
+        surface2 = load_surface("model2", model_versions["model2"])
+        if engine == "learned" and surface1 and surface2:
+            st.caption(f"Live estimate: Climate Risk ≈ {surface1(features)[0]:.1f} "
+                       f"(±{surface1.error['p99']:.1f}), Weather Severity ≈ {surface2(features)[0]:.1f} "
+                       f"(±{surface2.error['p99']:.1f}); click Predict for the exact values")
         
         # Center the button and make it more prominent
         col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
@@ -152,30 +407,16 @@ if page == "🏠 Home":
         # Create simple comparison chart
         parameter_names = ['Temperature', 'CO₂', 'Sea Level', 'Precipitation', 'Humidity', 'Wind']
         current_values = [feature1, feature2, feature3, feature4, feature5, feature6]
-        global_avg = [15.0, 415.0, 3.3, 100.0, 60.0, 15.0]  # Example global averages
-        
-        comparison_df = pd.DataFrame({
-            'Parameter': parameter_names,
-            'Your Input': current_values,
-            'Global Average': global_avg
-        })
-        
-        chart = alt.Chart(pd.melt(
-            comparison_df, 
-            id_vars=['Parameter'], 
-            value_vars=['Your Input', 'Global Average']
-        )).mark_bar().encode(
-            x=alt.X('value:Q', title='Value'),
-            y=alt.Y('Parameter:N', title=None),
-            color=alt.Color('variable:N', legend=alt.Legend(title=None)),
-            row=alt.Row('Parameter:N', header=alt.Header(labelAngle=0))
-        ).properties(
-            height=40
-        ).resolve_scale(
-            y='independent'
-        )
+        if baselines is not None:
+            baseline_avg = baselines.means[baseline_group, :len(FEATURES)]
+        else:
+            baseline_avg = [15.0, 415.0, 3.3, 100.0, 60.0, 15.0]  # Example global averages
         
-        st.altair_chart(chart, use_container_width=True)
+        # The chart spec is a constant; only the long-form data is rebuilt
+        with span("chart.comparison"):
+            st.vega_lite_chart(comparison_data(parameter_names, current_values, baseline_avg,
+                                               ("Your Input", f"{baseline_name} Average")),
+                               COMPARISON_SPEC, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
@@ -184,79 +425,74 @@ if page == "🏠 Home":
         
         if predict_button and model1 and model2:
             # Create a progress indicator
-            with st.spinner('Calculating impact...'):
-                # simulate processing delay
-                import time
-                time.sleep(0.5)
-                
-                prediction1 = model1.predict(features)[0]
-                prediction2 = model2.predict(features)[0]
+            with st.spinner('Calculating impact...'), span("app.predict"):
+                intervals = (load_intervals("model1", model_versions["model1"]),
+                             load_intervals("model2", model_versions["model2"]))
+                bands = None
+                if engine == "learned" and all(intervals):
+                    # The intervals come from the same tree traversal as the point estimate, and
+                    # both are cached together
+                    bands = load_prediction_cache().predict_indices(model1, model2, model_versions, features,
+                                                                    intervals)
+                    predictions1, predictions2 = bands[0][0], bands[1][0]
+                elif engine == "learned":
+                    predictions1, predictions2 = load_prediction_cache().predict_indices(
+                        model1, model2, model_versions, features)
+                else:
+                    predictions1, predictions2 = predict_indices(model1, model2, features, engine, monitor)
+                prediction1, prediction2 = predictions1[0], predictions2[0]
             
-            # Show metrics
+            # Show metrics against the chosen baseline's mean indices
+            baseline_risk, baseline_severity = (150.0, 50.0) if baselines is None else \
+                baselines.means[baseline_group, len(FEATURES):]
             metric_col1, metric_col2 = st.columns(2)
             with metric_col1:
-                st.metric(label="Climate Risk Index", value=f"{prediction1:.1f}", delta=f"{prediction1-150:.1f} from baseline")
+                st.metric(label="Climate Risk Index", value=f"{prediction1:.1f}",
+                          delta=f"{prediction1 - baseline_risk:.1f} from {baseline_name} mean")
             with metric_col2:
-                st.metric(label="Weather Severity Index", value=f"{prediction2:.1f}", delta=f"{prediction2-50:.1f} from baseline")
+                st.metric(label="Weather Severity Index", value=f"{prediction2:.1f}",
+                          delta=f"{prediction2 - baseline_severity:.1f} from {baseline_name} mean")
+            if baselines is not None:
+                risk_pct = baselines.percentile(prediction1, baseline_group, "Climate_Risk_Index")[0]
+                severity_pct = baselines.percentile(prediction2, baseline_group, "Weather_Severity_Index")[0]
+                st.caption(f"Against {baseline_name} ({baselines.counts[baseline_group]:,} readings): Climate Risk "
+                           f"higher than {risk_pct:.0f}% and Weather Severity higher than {severity_pct:.0f}% of them")
+            if bands is not None:
+                (_, risk_low, risk_high), (_, severity_low, severity_high) = bands
+                risk_inside = intervals[0].inside(model1, features)[0]
+                severity_inside = intervals[1].inside(model2, features)[0]
+                # Report the coverage measured on held-out rows, not the calibration target
+                risk_coverage = intervals[0].measured_coverage("inside" if risk_inside else "outside")
+                severity_coverage = intervals[1].measured_coverage("inside" if severity_inside else "outside")
+                st.caption(f"Intervals: Climate Risk {risk_low[0]:.1f}–{risk_high[0]:.1f}, "
+                           f"Weather Severity {severity_low[0]:.1f}–{severity_high[0]:.1f} "
+                           f"(they covered {risk_coverage or 0:.0%} and {severity_coverage or 0:.0%} of held-out "
+                           "readings like these)")
+                if not (risk_inside and severity_inside):
+                    st.caption("These inputs lie outside the range of the data the models were trained on, "
+                               "so the models are extrapolating and the intervals are wide.")
             
             # Visualization of results with gauges
-            fig, ax = plt.subplots(1, 2, figsize=(10, 3))
-            
-            # Climate Risk Gauge
-            risk_colors = ['green', 'yellow', 'orange', 'red']
-            risk_bounds = [0, 100, 150, 200, 250]
-            for i in range(len(risk_bounds)-1):
-                ax[0].barh([0], [risk_bounds[i+1] - risk_bounds[i]], left=risk_bounds[i], color=risk_colors[i], height=0.5)
-            ax[0].plot([prediction1, prediction1], [-0.25, 0.75], 'k-', linewidth=2)
-            ax[0].set_xlim(0, 250)
-            ax[0].set_ylim(-0.5, 1)
-            ax[0].set_title('Climate Risk Index')
-            ax[0].axis('off')
-            
-            # Weather Severity Gauge
-            severity_colors = ['green', 'yellow', 'orange', 'red']
-            severity_bounds = [0, 25, 50, 75, 100]
-            for i in range(len(severity_bounds)-1):
-                ax[1].barh([0], [severity_bounds[i+1] - severity_bounds[i]], left=severity_bounds[i], color=severity_colors[i], height=0.5)
-            ax[1].plot([prediction2, prediction2], [-0.25, 0.75], 'k-', linewidth=2)
-            ax[1].set_xlim(0, 100)
-            ax[1].set_ylim(-0.5, 1)
-            ax[1].set_title('Weather Severity Index')
-            ax[1].axis('off')
-            
-            plt.tight_layout()
-            st.pyplot(fig)
+            st.image(load_gauges().png([prediction1, prediction2]), use_container_width=True)
             
             # Classification with styled messages
-            risk_class = ""
-            risk_message = ""
-            if prediction1 <= 100:
-                risk_class = "risk-low"
-                risk_message = "🟢 **Low Risk:** Climate impact is minimal."
-            elif prediction1 <= 150:
-                risk_class = "risk-moderate"
-                risk_message = "🟡 **Moderate Risk:** Some climate changes, mild disruptions."
-            elif prediction1 <= 200:
-                risk_class = "risk-high"
-                risk_message = "🟠 **High Risk:** Significant environmental shifts."
-            else:
-                risk_class = "risk-severe"
-                risk_message = "🔴 **Severe Risk:** Major instability, increasing severe weather events."
-            
-            severity_class = ""
-            severity_message = ""
-            if prediction2 <= 25:
-                severity_class = "risk-low"
-                severity_message = "🟢 **Mild:** Calm weather, no significant risks."
-            elif prediction2 <= 50:
-                severity_class = "risk-moderate"
-                severity_message = "🟡 **Moderate:** Occasional storms, manageable conditions."
-            elif prediction2 <= 75:
-                severity_class = "risk-high"
-                severity_message = "🟠 **Severe:** Frequent storms, strong winds, possible disruptions."
-            else:
-                severity_class = "risk-severe"
-                severity_message = "🔴 **Very Severe:** High risk of flooding and damaging storms."
+            band_classes = ["risk-low", "risk-moderate", "risk-high", "risk-severe"]
+            risk_messages = [
+                "🟢 **Low Risk:** Climate impact is minimal.",
+                "🟡 **Moderate Risk:** Some climate changes, mild disruptions.",
+                "🟠 **High Risk:** Significant environmental shifts.",
+                "🔴 **Severe Risk:** Major instability, increasing severe weather events.",
+            ]
+            severity_messages = [
+                "🟢 **Mild:** Calm weather, no significant risks.",
+                "🟡 **Moderate:** Occasional storms, manageable conditions.",
+                "🟠 **Severe:** Frequent storms, strong winds, possible disruptions.",
+                "🔴 **Very Severe:** High risk of flooding and damaging storms.",
+            ]
+            risk_band = classify(prediction1, RISK_BOUNDS)
+            severity_band = classify(prediction2, SEVERITY_BOUNDS)
+            risk_class, risk_message = band_classes[risk_band], risk_messages[risk_band]
+            severity_class, severity_message = band_classes[severity_band], severity_messages[severity_band]
             
             st.markdown(f'<div class="risk-card {risk_class}">{risk_message}</div>', unsafe_allow_html=True)
             st.markdown(f'<div class="risk-card {severity_class}">{severity_message}</div>', unsafe_allow_html=True)
@@ -276,6 +512,30 @@ if page == "🏠 Home":
                 
             for i, rec in enumerate(recommendations):
                 st.markdown(f"- {rec}")
+            
+            with st.expander("🧭 What drives this score"):
+                from climate_impact.charts import CONTRIBUTION_SPEC, SENSITIVITY_SPEC
+                
+                try:
+                    drivers, sweep = explain_inputs(engine, tuple(model_versions.items()),
+                                                    tuple(float(v) for v in features[0]))
+                except ValueError as e:
+                    st.caption(f"Explanations are unavailable: {e}")
+                else:
+                    st.caption("How far each input moves the prediction from the models' average "
+                               "(Baseline); red raises the index, green lowers it.")
+                    st.vega_lite_chart(drivers[drivers["Parameter"] != "Baseline"], CONTRIBUTION_SPEC,
+                                       use_container_width=True)
+                    st.caption("Each index as one input moves across its slider range, the others held fixed.")
+                    st.vega_lite_chart(sweep, SENSITIVITY_SPEC)
+            
+            if baselines is not None:
+                with st.expander("🌐 Compare with every country and location"):
+                    # One vectorized pass over every baseline
+                    ranked = baselines.rank_everywhere({"Climate_Risk_Index": prediction1,
+                                                        "Weather_Severity_Index": prediction2})
+                    st.dataframe(ranked.sort_values("Climate_Risk_Index percentile", ascending=False),
+                                 use_container_width=True, hide_index=True)
                 
         else:
             # Placeholder for results
@@ -287,7 +547,9 @@ if page == "🏠 Home":
         
         st.markdown('</div>', unsafe_allow_html=True)
 
-elif page == "📊 Dataset":
+def render_dataset():
+    from climate_impact.paging import page_count
+    
     st.markdown("""
     <div class="header-container">
         <h1 style='text-align: center;'>📊 Climate Insights Dataset</h1>
@@ -298,34 +560,18 @@ elif page == "📊 Dataset":
     # Data exploration section
     st.markdown('<div class="card">', unsafe_allow_html=True)
     
-    @st.cache_data
-    def load_data():
-        try:
-            return pd.read_csv("climate_change_data.csv")
-        except Exception as e:
-            # If file doesn't exist, create sample data
-            sample_data = pd.DataFrame({
-                'Year': range(2000, 2025),
-                'Temperature': np.random.normal(15, 0.5, 25) + np.linspace(0, 1.2, 25),
-                'CO2_Emissions': np.random.normal(380, 5, 25) + np.linspace(0, 40, 25),
-                'Sea_Level_Rise': np.random.normal(0, 0.5, 25) + np.linspace(0, 10, 25),
-                'Precipitation': np.random.normal(100, 10, 25),
-                'Humidity': np.random.normal(60, 5, 25),
-                'Wind_Speed': np.random.normal(15, 3, 25),
-                'Climate_Risk_Index': np.random.normal(120, 20, 25) + np.linspace(0, 40, 25),
-                'Weather_Severity_Index': np.random.normal(40, 10, 25) + np.linspace(0, 20, 25)
-            })
-            return sample_data
-
-    df = load_data()
+    data_version = dataset_version("climate_change_data.csv")
+    time_index = load_time_index(data_version)
+    paged_view = load_paged_view(data_version)
+    df = time_index.frame
     
     # Add filtering options
     col1, col2 = st.columns([1, 3])
     
     with col1:
         st.subheader("Filter Data")
-        min_year = int(df['Year'].min()) if 'Year' in df.columns else 2000
-        max_year = int(df['Year'].max()) if 'Year' in df.columns else 2025
+        min_year = time_index.min_year
+        max_year = time_index.max_year
         year_range = st.slider("Year Range", min_year, max_year, (min_year, max_year))
         
         # Allow column selection
@@ -333,27 +579,99 @@ elif page == "📊 Dataset":
             all_columns = df.columns.tolist()
             selected_columns = st.multiselect("Select Columns", all_columns, default=all_columns[:5])
         
+        st.subheader("Sort & Pages")
+        sort_column = st.selectbox("Sort by", ["Date order"] + all_columns)
+        sort_descending = st.checkbox("Descending")
+        page_size = st.selectbox("Rows per page", [50, 100, 500, 1000], index=1)
+        
     with col2:
         st.subheader("Dataset Preview")
         if df is not None:
             # Filter by selected year range
-            if 'Year' in df.columns:
-                filtered_df = df[(df['Year'] >= year_range[0]) & (df['Year'] <= year_range[1])]
-            else:
-                filtered_df = df
+            filtered_df = time_index.between(*year_range)
+            row_start, row_stop = time_index.bounds(*year_range)
                 
             # Show only selected columns
-            if selected_columns:
-                filtered_df = filtered_df[selected_columns]
-                
-            st.dataframe(filtered_df, use_container_width=True)
+            visible_columns = selected_columns or all_columns
+            
+            # Only the current page is sliced out and sent to the browser
+            total_rows = row_stop - row_start
+            n_pages = page_count(total_rows, page_size)
+            page_number = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1)
+            page_df, total_rows = paged_view.page(
+                page_number - 1, page_size, row_start, row_stop,
+                sort_by=None if sort_column == "Date order" else sort_column,
+                ascending=not sort_descending, columns=visible_columns,
+            )
+            st.dataframe(page_df, use_container_width=True)
+            first_row = (page_number - 1) * page_size
+            st.caption(f"Rows {min(first_row + 1, total_rows):,}–{first_row + len(page_df):,} of {total_rows:,}")
             
             # Show data summary
             with st.expander("Data Summary"):
-                st.write(filtered_df.describe())
+                from climate_impact.ingest import summary_catch_up
+
+                summary_cube = load_summary_cube(dataset_build("climate_change_data.csv"))
+                summary_catch_up(summary_cube, "climate_change_data.csv", load_summary_lock())
+                summary_columns = [c for c in visible_columns if c in summary_cube.columns]
+                if summary_columns:
+                    st.write(summary_cube.describe(summary_columns, Year=tuple(year_range)))
+                    st.caption("Quartiles are estimated from pre-aggregated histograms.")
+                else:
+                    st.write(filtered_df[visible_columns].describe())
     
 
-elif page == "ℹ️ About":
+def render_batch_scoring():
+    st.markdown("""
+    <div class="header-container">
+        <h1 style='text-align: center;'>📦 Batch Scoring</h1>
+        <p style='text-align: center;'>Score a whole CSV of climate parameters at once</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.markdown("""
+    Upload a CSV with the same columns as the bundled dataset
+    (`Temperature`, `CO2 Emissions`, `Sea Level Rise`, `Precipitation`, `Humidity`, `Wind Speed`).
+    Any other columns are kept in the output.
+    """)
+    uploaded = st.file_uploader("Parameter file", type=["csv"])
+    output_format = st.radio("Output format", ["CSV", "Parquet"], horizontal=True)
+    intervals = None
+    if engine == "learned":
+        intervals = (load_intervals("model1", model_versions["model1"]),
+                     load_intervals("model2", model_versions["model2"]))
+        with_intervals = st.checkbox("Add prediction intervals (_Low/_High columns)", disabled=not all(intervals))
+        intervals = intervals if with_intervals and all(intervals) else None
+    baselines = load_baselines(dataset_version("climate_change_data.csv"))
+    with_percentiles = st.checkbox("Add percentiles against each row's Location/Country (_Percentile columns)",
+                                   disabled=baselines is None)
+    baselines = baselines if with_percentiles else None
+    
+    if uploaded is not None and model1 and model2:
+        with st.spinner("Scoring rows..."):
+            start = time.perf_counter()
+            try:
+                scored_df = pd.concat(iter_scored(uploaded, model1, model2, engine=engine, monitor=monitor,
+                                                  intervals=intervals, baselines=baselines), ignore_index=True)
+            except KeyError as e:
+                st.error(f"Invalid file: {e}")
+                scored_df = None
+            elapsed = time.perf_counter() - start
+        
+        if scored_df is not None:
+            st.success(f"Scored {len(scored_df):,} rows in {elapsed:.2f}s ({len(scored_df) / max(elapsed, 1e-9):,.0f} rows/sec)")
+            st.dataframe(scored_df.head(100), use_container_width=True)
+            
+            if output_format == "Parquet":
+                buffer = io.BytesIO()
+                scored_df.to_parquet(buffer, index=False)
+                st.download_button("Download scored file", buffer.getvalue(), "scored.parquet", "application/octet-stream")
+            else:
+                st.download_button("Download scored file", scored_df.to_csv(index=False), "scored.csv", "text/csv")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def render_about():
     st.markdown("""
     <div class="header-container">
         <h1 style='text-align: center;'>ℹ️ About This App</h1>
@@ -406,7 +724,13 @@ elif page == "ℹ️ About":
        
         st.markdown('</div>', unsafe_allow_html=True)
 
-elif page == "📈 Analytics":
+def render_analytics():
+    import altair as alt
+    from climate_impact.analytics import GLOBAL, PARAMETER_LABELS
+    from climate_impact.ingest import summary_catch_up
+    from climate_impact.jobs import CorrelationRequest
+    from climate_impact.tiers import DEFAULT_POINTS
+    
     st.markdown("""
     <div class="header-container">
         <h1 style='text-align: center;'>📈 Climate Analytics</h1>
@@ -414,116 +738,121 @@ elif page == "📈 Analytics":
     </div>
     """, unsafe_allow_html=True)
     
-    # Create sample data for demonstration
-    years = list(range(2000, 2025))
-    temp_data = np.random.normal(15, 0.5, 25) + np.linspace(0, 1.2, 25)
-    co2_data = np.random.normal(380, 5, 25) + np.linspace(0, 40, 25)
-    sea_level_data = np.random.normal(0, 0.5, 25) + np.linspace(0, 10, 25)
+    # Trends fitted from the dataset, cached until the data changes
+    trends = load_trends(dataset_version("climate_change_data.csv"))
     
     # Trends analysis
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("🔍 Climate Trends Analysis")
     
-    trend_tabs = st.tabs(["Temperature", "CO₂ Emissions", "Sea Level"])
+    trend_views = [
+        # (tab, parameter, axis title, color, chart title, unit)
+        ("Temperature", "Temperature", "Temperature (°C)", "#FF5733", "Global Temperature Trend", "°C"),
+        ("CO₂ Emissions", "CO2 Emissions", "CO₂ (ppm)", "#33CC33", "CO₂ Emissions Trend", "ppm"),
+        ("Sea Level", "Sea Level Rise", "Sea Level Rise (mm)", "#3399FF", "Sea Level Rise Trend", "mm"),
+    ]
+    # The charts draw the finest pre-aggregated tier that fits in DEFAULT_POINTS,
+    # so zooming in shows more detail without sending more points
+    zoom_col, resolution_col = st.columns([3, 1])
+    zoom = zoom_col.slider("Years shown", int(trends.years[0]), int(trends.years[-1]),
+                           (int(trends.years[0]), int(trends.years[-1])))
+    resolution = resolution_col.selectbox("Resolution", ["Auto", "Day", "Week", "Month", "Year"])
+    tiers = load_tiers(dataset_build("climate_change_data.csv"))
+    summary_catch_up(tiers, "climate_change_data.csv", load_summary_lock())
+    view_start, view_end = pd.Timestamp(zoom[0], 1, 1), pd.Timestamp(zoom[1], 12, 31)
     
-    with trend_tabs[0]:
-        # Temperature trend chart
-        temp_df = pd.DataFrame({
-            'Year': years,
-            'Temperature': temp_data,
-            'Trend': np.poly1d(np.polyfit(range(len(years)), temp_data, 1))(range(len(years)))
-        })
-        
-        temp_chart = alt.Chart(temp_df).mark_line().encode(
-            x=alt.X('Year:O', title='Year'),
-            y=alt.Y('Temperature:Q', title='Temperature (°C)'),
-            color=alt.value('#FF5733')
-        ).properties(
-            title='Global Temperature Trend'
-        )
-        
-        trend_line = alt.Chart(temp_df).mark_line(strokeDash=[5, 5]).encode(
-            x=alt.X('Year:O', title='Year'),
-            y=alt.Y('Trend:Q'),
-            color=alt.value('#3366FF')
-        )
-        
-        st.altair_chart(temp_chart + trend_line, use_container_width=True)
-        
-        # Temperature insights
-        st.markdown("""
-        **Temperature Insights:**
-        - Annual average temperature increase: 0.048°C per year
-        - Total change over period: +1.2°C
-        - Rate of change is accelerating in recent years
-        """)
+    trend_tabs = st.tabs([view[0] for view in trend_views])
     
-    with trend_tabs[1]:
-        # CO2 trend chart
-        co2_df = pd.DataFrame({
-            'Year': years,
-            'CO2': co2_data,
-            'Trend': np.poly1d(np.polyfit(range(len(years)), co2_data, 1))(range(len(years)))
-        })
-        
-        co2_chart = alt.Chart(co2_df).mark_line().encode(
-            x=alt.X('Year:O', title='Year'),
-            y=alt.Y('CO2:Q', title='CO₂ (ppm)'),
-            color=alt.value('#33CC33')
-        ).properties(
-            title='CO₂ Emissions Trend'
-        )
-        
-        co2_trend_line = alt.Chart(co2_df).mark_line(strokeDash=[5, 5]).encode(
-            x=alt.X('Year:O', title='Year'),
-            y=alt.Y('Trend:Q'),
-            color=alt.value('#3366FF')
-        )
-        
-        st.altair_chart(co2_chart + co2_trend_line, use_container_width=True)
-        
-        # CO2 insights
-        st.markdown("""
-        **CO₂ Insights:**
-        - Annual increase: ~1.6 ppm per year
-        - Total change over period: +40 ppm
-        - Current rate exceeds historical averages
-        """)
-        
-    with trend_tabs[2]:
-        # Sea level trend chart
-        sea_df = pd.DataFrame({
-            'Year': years,
-            'Sea_Level': sea_level_data,
-            'Trend': np.poly1d(np.polyfit(range(len(years)), sea_level_data, 1))(range(len(years)))
-        })
-        
-        sea_chart = alt.Chart(sea_df).mark_line().encode(
-            x=alt.X('Year:O', title='Year'),
-            y=alt.Y('Sea_Level:Q', title='Sea Level Rise (mm)'),
-            color=alt.value('#3399FF')
-        ).properties(
-            title='Sea Level Rise Trend'
-        )
-        
-        sea_trend_line = alt.Chart(sea_df).mark_line(strokeDash=[5, 5]).encode(
-            x=alt.X('Year:O', title='Year'),
-            y=alt.Y('Trend:Q'),
-            color=alt.value('#3366FF')
-        )
-        
-        st.altair_chart(sea_chart + sea_trend_line, use_container_width=True)
-        
-        # Sea level insights
-        st.markdown("""
-        **Sea Level Insights:**
-        - Annual rise: ~0.4 mm per year
-        - Total change over period: +10 mm
-        - Acceleration observed in recent measurements
-        """)
+    for tab, (label, parameter, axis_title, color, chart_title, unit) in zip(trend_tabs, trend_views):
+        with tab:
+            trend_df = trends.series(GLOBAL, parameter)
+            trend_df = trend_df[trend_df["Year"].between(*zoom)]
+            # A yearly mean sits in the middle of its year
+            trend_df = trend_df.assign(Date=pd.to_datetime(trend_df["Year"].astype(str)) + pd.DateOffset(months=6))
+            
+            with span("chart.trend"):
+                series, tier = tiers.view(GLOBAL, parameter, DEFAULT_POINTS, view_start, view_end,
+                                          tier=None if resolution == "Auto" else resolution.lower())
+                value_chart = alt.Chart(series).mark_line().encode(
+                    x=alt.X('Date:T', title='Date'),
+                    y=alt.Y(f'{parameter}:Q', title=axis_title, scale=alt.Scale(zero=False)),
+                    color=alt.value(color),
+                    tooltip=['Date:T', f'{parameter}:Q', 'Readings:Q']
+                ).properties(
+                    title=chart_title
+                )
+                
+                trend_line = alt.Chart(trend_df).mark_line(strokeDash=[5, 5]).encode(
+                    x=alt.X('Date:T', title='Date'),
+                    y=alt.Y('Trend:Q'),
+                    color=alt.value('#3366FF')
+                )
+                
+                st.altair_chart(value_chart + trend_line, use_container_width=True)
+            st.caption(f"{tier.capitalize()} means, {len(series):,} points")
+            
+            # Insights from the fitted lines
+            trend = trends.summary(GLOBAL, parameter)
+            pace = "accelerating" if abs(trend["recent_slope"]) > abs(trend["slope"]) else "slowing"
+            st.markdown(f"""
+            **{label} Insights:**
+            - Annual change: {trend["slope"]:+.3f} {unit} per year
+            - Total change over {trend["first_year"]}–{trend["last_year"]}: {trend["total_change"]:+.2f} {unit}
+            - Rate of change is {pace} in recent years ({trend["recent_slope"]:+.3f} {unit} per year)
+            """)
     
     st.markdown('</div>', unsafe_allow_html=True)
     
+    # Scenario simulation
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.subheader("🔮 Scenario Simulation")
+    st.markdown("""
+    Projects every measure forward along its fitted trend, with the uncertainty of the trend and the
+    year-to-year scatter of the readings, and scores thousands of sampled futures with the selected engine.
+    """)
+    
+    scenario_col1, scenario_col2, scenario_col3 = st.columns(3)
+    scenario_region = scenario_col1.selectbox("Region", trends.groups, key="scenario_region")
+    scenario_years = scenario_col2.slider("Years ahead", 5, 50, 30, step=5)
+    scenario_trajectories = scenario_col3.select_slider("Trajectories", options=[1_000, 10_000, 50_000, 100_000],
+                                                        value=10_000)
+    
+    if st.button("Run Simulation", key="scenario_run"):
+        from climate_impact.cache import model_digest
+        from climate_impact.scenarios import BANDS
+        
+        with st.spinner(f"Simulating {scenario_trajectories:,} futures..."):
+            scenario = run_scenario(scenario_region, scenario_years, scenario_trajectories, engine,
+                                    tuple(model_digest(path) for path in MODEL_PATHS.values()),
+                                    dataset_version("climate_change_data.csv"))
+        st.caption(f"{scenario.trajectories:,} trajectories × {len(scenario.years)} years in "
+                   f"{scenario.seconds:.1f}s ({scenario.trajectories_per_sec:,.0f} trajectories/sec)")
+        
+        band_colors = ["#2e7d32", "#f9a825", "#ef6c00", "#c62828"]
+        scenario_tabs = st.tabs(["Climate Risk", "Weather Severity"])
+        for tab, index in zip(scenario_tabs, BANDS):
+            with tab:
+                shares = scenario.band_shares(index)
+                labels = list(shares.columns)
+                long_shares = shares.reset_index().melt("Year", var_name="Band", value_name="Share")
+                band_chart = alt.Chart(long_shares).mark_area().encode(
+                    x=alt.X('Year:O', title='Year'),
+                    y=alt.Y('Share:Q', stack='normalize', axis=alt.Axis(format='%'), title='Share of futures'),
+                    color=alt.Color('Band:N', scale=alt.Scale(domain=labels, range=band_colors), sort=labels),
+                    order=alt.Order('band_order:Q'),
+                ).transform_calculate(
+                    band_order=f"indexof({labels!r}, datum.Band)"
+                )
+                st.altair_chart(band_chart, use_container_width=True)
+                quantiles = scenario.quantiles(index)
+                first, last = quantiles.index[0], quantiles.index[-1]
+                st.markdown(f"""
+                - Median {quantiles.loc[first, 'p50']:.1f} in {first}, {quantiles.loc[last, 'p50']:.1f} in {last}
+                - 90% of futures between {quantiles.loc[last, 'p5']:.1f} and {quantiles.loc[last, 'p95']:.1f} by {last}
+                - {shares.loc[last, labels[-1]]:.1%} of futures in the {labels[-1]} band by {last}
+                """)
+    st.markdown('</div>', unsafe_allow_html=True)
+    
     # Global Impact Map (Placeholder)
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("🗺️ Global Impact Map")
@@ -554,21 +883,96 @@ elif page == "📈 Analytics":
         param1 = st.selectbox("Primary Parameter", ["Temperature", "CO₂ Emissions", "Sea Level", "Precipitation"])
         param2 = st.selectbox("Secondary Parameter", ["Humidity", "Wind Speed", "Weather Severity", "Climate Risk"])
         time_period = st.select_slider("Time Period", options=["5 Years", "10 Years", "15 Years", "20 Years"])
-        region = st.selectbox("Region", ["Global", "North America", "Europe", "Asia", "Africa", "Australia"])
+        region = st.selectbox("Region", trends.groups)
     
     with custom_col2:
         st.markdown("**Custom Analysis Output**")
         st.info("Select parameters and click 'Generate Analysis' to create a custom report")
         
         if st.button("Generate Analysis", key="custom_analysis"):
+            column1, column2 = PARAMETER_LABELS[param1], PARAMETER_LABELS[param2]
+            request = CorrelationRequest(column1, column2, int(time_period.split()[0]), region,
+                                         version=dataset_version("climate_change_data.csv"))
+            
+            # Runs in the shared process pool; repeated requests come from its cache
+            job_runner = load_job_runner()
+            analysis = job_runner.cached(request)
+            if analysis is None:
+                job = job_runner.submit(request)
+                progress = st.progress(0.0, text="Aggregating readings...")
+                while not job.done():
+                    progress.progress(job.progress, text=f"Aggregating readings... {job.progress:.0%}")
+                    # Wakes as soon as another year is in, rather than on a fixed tick
+                    job.wait(timeout=1.0)
+                progress.empty()
+                try:
+                    analysis = job.result()
+                except Exception as error:
+                    st.error(f"The analysis failed ({error}). Please try again.")
+                    st.stop()
+            
             st.success("Analysis generated successfully!")
-            st.write(f"Analysis for {param1} and {param2} over {time_period} in {region}")
+            st.write(f"Analysis for {param1} and {param2} over {time_period} in {region} "
+                     f"({analysis['readings']:,} readings)")
+            
+            metric_col1, metric_col2, metric_col3 = st.columns(3)
+            metric_col1.metric(f"{param1} trend", f"{analysis['slope1']:+.3f}/yr")
+            metric_col2.metric(f"{param2} trend", f"{analysis['slope2']:+.3f}/yr")
+            correlation = analysis["correlation"]
+            metric_col3.metric("Correlation", "n/a" if np.isnan(correlation) else f"{correlation:.2f}")
             
-            # Placeholder chart
-            st.image("https://via.placeholder.com/600x300.png?text=Custom+Analysis+Chart", use_container_width=True)
+            base = alt.Chart(analysis["yearly"]).encode(x=alt.X('Year:O', title='Year'))
+            custom_chart = alt.layer(
+                base.mark_line(color='#FF5733').encode(y=alt.Y(f'{column1}:Q', title=param1, scale=alt.Scale(zero=False))),
+                base.mark_line(color='#3366FF').encode(y=alt.Y(f'{column2}:Q', title=param2, scale=alt.Scale(zero=False))),
+            ).resolve_scale(y='independent')
+            st.altair_chart(custom_chart, use_container_width=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+def render_performance():
+    st.markdown("""
+    <div class="header-container">
+        <h1 style='text-align: center;'>🛠 Performance</h1>
+        <p style='text-align: center;'>Timing spans recorded by this server process</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    timing_report = TIMINGS.report()
+    if not TIMINGS.enabled:
+        st.warning("Timing is turned off (CLIMATE_IMPACT_TIMING=0).")
+    elif not timing_report:
+        st.info("No spans recorded yet; use the other pages first.")
+    else:
+        st.caption(f"Percentiles over the last {TIMINGS.max_samples:,} calls of each span, in milliseconds. "
+                   "Compare an export with `python benchmarks/suite.py --compare`.")
+        st.dataframe(pd.DataFrame(timing_report).T.round(3), use_container_width=True)
+    export_col, reset_col = st.columns(2)
+    export_col.download_button("Export JSON", TIMINGS.to_json(source="app"),
+                               file_name=f"timings-{datetime.now():%Y%m%d-%H%M%S}.json", mime="application/json")
+    if reset_col.button("Reset timings"):
+        TIMINGS.reset()
+        st.rerun()
+    st.markdown('</div>', unsafe_allow_html=True)
+
+PAGE_RENDERERS = {
+    "🏠 Home": render_home,
+    "📊 Dataset": render_dataset,
+    "📦 Batch Scoring": render_batch_scoring,
+    "ℹ️ About": render_about,
+    "📈 Analytics": render_analytics,
+    "🛠 Performance": render_performance,
+}
+
+# The finally still records a page that ends early with st.stop() or st.rerun()
+page_start = time.perf_counter()
+try:
+    PAGE_RENDERERS[page]()
+finally:
+    TIMINGS.record(f"app.rerun.{page.split()[-1].lower()}", time.perf_counter() - page_start)
+    TIMINGS.record("app.rerun", time.perf_counter() - rerun_start)
+
 # Footer
 st.markdown("""
 <div style="background-color: #1e3d59; padding: 10px; border-radius: 10px; margin-top: 20px;">
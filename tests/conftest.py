@@ -0,0 +1,31 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Copy of the bundled CSV in a temporary directory, with its store built."""
+    from climate_impact.store import open_store
+
+    path = str(tmp_path / "climate_change_data.csv")
+    shutil.copy(os.path.join(ROOT, "climate_change_data.csv"), path)
+    open_store(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def root():
+    """The repository root, where the bundled models and dataset are."""
+    return ROOT
+
+
+@pytest.fixture
+def in_repository(monkeypatch):
+    """Run from the repository root, where the bundled models are."""
+    monkeypatch.chdir(ROOT)
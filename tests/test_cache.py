@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+from climate_impact.cache import PredictionCache
+from climate_impact.intervals import open_intervals
+from climate_impact.scoring import load_model, predict_with_intervals
+
+VERSIONS = {"model1": "v1", "model2": "v1"}
+
+
+@pytest.fixture(scope="module")
+def models(root):
+    paths = [os.path.join(root, f"model{i}.npz") for i in (1, 2)]
+    models = [load_model(path) for path in paths]
+    intervals = [open_intervals(path, f"model{i}", rebuild=False) for i, path in enumerate(paths, 1)]
+    if not all(intervals):
+        pytest.skip("interval tables are stale")
+    return models, intervals
+
+
+def slider_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.round(np.column_stack([rng.normal(15, 5, n), rng.normal(400, 50, n), rng.normal(0, 1, n),
+                                     rng.uniform(0, 100, (n, 2)), rng.uniform(0, 50, n)]), 1)
+
+
+def test_points_match_the_models_and_repeat_as_hits(models):
+    (model1, model2), _ = models
+    cache = PredictionCache()
+    rows = slider_rows(200)
+    risk, severity = cache.predict_indices(model1, model2, VERSIONS, rows)
+    np.testing.assert_allclose(risk, model1.predict(rows.astype(np.float32)), atol=1e-4)
+    again = cache.predict_indices(model1, model2, VERSIONS, rows)
+    np.testing.assert_array_equal(again[0], risk)
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"]) == (400, 400)
+
+
+def test_interval_triples_are_cached_apart_from_points(models):
+    (model1, model2), intervals = models
+    cache = PredictionCache()
+    rows = slider_rows(200, seed=1)
+    bands = cache.predict_indices(model1, model2, VERSIONS, rows, intervals)
+    expected = predict_with_intervals(model1, model2, intervals, rows)
+    for got, want in zip(bands, expected):
+        for a, b in zip(got, want):
+            np.testing.assert_allclose(a, b, atol=1e-3)
+    cache.predict_indices(model1, model2, VERSIONS, rows, intervals)
+    assert cache.stats()["hits"] == 400
+    # Bare predictions of the same rows are separate entries
+    cache.predict_indices(model1, model2, VERSIONS, rows)
+    assert cache.stats()["misses"] == 800
+
+
+def test_warm_fills_without_counting_and_new_versions_invalidate(models):
+    (model1, _), intervals = models
+    cache = PredictionCache()
+    rows = slider_rows(50, seed=2)
+    cache.warm("model1", model1, "v1", rows, intervals[0])
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+    cache.predict_with_intervals("model1", model1, "v1", intervals[0], rows)
+    assert cache.stats()["hits"] == 50
+    cache.predict_with_intervals("model1", model1, "v2", intervals[0], rows)
+    assert cache.stats()["invalidations"] == 50
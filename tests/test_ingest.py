@@ -0,0 +1,130 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from climate_impact import store
+from climate_impact.ingest import Ingestor, ModelRefresher, summary_catch_up, validate
+from climate_impact.schema import FEATURE_COLUMNS
+from climate_impact.summary import SummaryCube
+from climate_impact.tiers import Tiers
+
+BASE_ROWS = 10_000
+
+
+def readings(n, seed=0, country="Latvia", location="New Williamtown"):
+    """``n`` valid readings in 2023 for one location."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Date": pd.date_range("2023-01-01", periods=n, freq="h"),
+        "Location": location,
+        "Country": country,
+        "Temperature": rng.normal(15, 5, n),
+        "CO2 Emissions": rng.normal(400, 50, n),
+        "Sea Level Rise": rng.normal(0, 1, n),
+        "Precipitation": rng.uniform(0, 100, n),
+        "Humidity": rng.uniform(0, 100, n),
+        "Wind Speed": rng.uniform(0, 50, n),
+    })
+
+
+def test_append_round_trips_through_reopen(dataset):
+    rows = readings(50)
+    Ingestor(dataset, batch_size=10).submit(rows)
+    reopened = store.open_store(dataset, rebuild=False)
+    assert reopened is not None
+    tail = reopened.to_frame(start=BASE_ROWS)
+    pd.testing.assert_frame_equal(tail[list(FEATURE_COLUMNS)], rows[list(FEATURE_COLUMNS)])
+    assert (tail["Date"].to_numpy() == rows["Date"].to_numpy()).all()
+    assert list(tail["Country"].astype(str)) == list(rows["Country"])
+    # A store rebuilt from the appended CSV holds the same rows
+    rebuilt = store.build_store(dataset, str(store.store_path(dataset)) + ".rebuilt").to_frame()
+    pd.testing.assert_frame_equal(rebuilt[list(FEATURE_COLUMNS)], reopened.to_frame()[list(FEATURE_COLUMNS)])
+    assert (rebuilt["Location"].astype(str) == reopened.to_frame()["Location"].astype(str)).all()
+
+
+def test_new_categories_extend_the_codes(dataset):
+    before = store.open_store(dataset)
+    countries = list(before.categories("Country"))
+    codes = before.raw("Country").copy()
+    store.append_rows(dataset, readings(3, country="Atlantis", location="Poseidonia"))
+    after = store.open_store(dataset, rebuild=False)
+    assert after.categories("Country")[:len(countries)] == countries
+    assert after.categories("Country")[len(countries):] == ["Atlantis"]
+    assert "Poseidonia" in after.categories("Location")
+    assert (after.raw("Country")[:len(codes)] == codes).all()
+    assert list(after.to_frame(["Country"], start=BASE_ROWS)["Country"].astype(str)) == ["Atlantis"] * 3
+
+
+def test_rejected_rows_are_counted_and_dropped(dataset):
+    rows = readings(5).astype({"Date": object, "Location": object})
+    rows.loc[0, "Date"] = "not a date"
+    rows.loc[1, "Location"] = None
+    rows.loc[2, "Temperature"] = 1e6
+    valid, rejected = validate(rows)
+    assert len(valid) == 2
+    assert rejected == {"date": 1, "location": 1, "out of range": 1}
+
+    ingestor = Ingestor(dataset, batch_size=100)
+    ingestor.submit(rows)
+    ingestor.flush()
+    assert ingestor.stats()["appended"] == 2
+    assert ingestor.stats()["rejected"] == rejected
+    assert len(store.open_store(dataset)) == BASE_ROWS + 2
+
+
+def test_base_rows_stay_put_while_rows_grow(dataset):
+    assert "base_rows" not in store.open_store(dataset).meta
+    store.append_rows(dataset, readings(7))
+    store.append_rows(dataset, readings(4, seed=1))
+    meta = store.open_store(dataset, rebuild=False).meta
+    assert meta["base_rows"] == BASE_ROWS
+    assert meta["rows"] == BASE_ROWS + 11
+
+
+def test_catch_up_folds_in_only_new_rows(dataset):
+    frame = store.load_dataset(dataset)
+    cube = SummaryCube(frame.assign(Year=frame["Date"].dt.year), keys=["Year"])
+    tiers = Tiers(frame)
+    assert summary_catch_up(cube, dataset) == 0
+    store.append_rows(dataset, readings(24))
+    lock = threading.Lock()
+    assert summary_catch_up(cube, dataset, lock) == 24
+    assert summary_catch_up(tiers, dataset, lock) == 24
+    assert summary_catch_up(cube, dataset, lock) == 0
+    assert cube.rows == tiers.rows == BASE_ROWS + 24
+    assert tiers.series("Latvia", "Temperature", "year", start=pd.Timestamp("2023-01-01"))["Readings"].tolist() == [24]
+
+
+def test_concurrent_catch_ups_add_rows_once(dataset):
+    frame = store.load_dataset(dataset)
+    tiers = Tiers(frame)
+    store.append_rows(dataset, readings(100))
+    added = []
+    threads = [threading.Thread(target=lambda: added.append(summary_catch_up(tiers, dataset))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(added) == [0] * 7 + [100]
+    assert tiers.rows == BASE_ROWS + 100
+
+
+def test_refresh_publishes_when_a_model_improves(dataset, tmp_path, in_repository):
+    pytest.importorskip("xgboost")
+    from climate_impact.training import verify_artifacts
+
+    ingestor = Ingestor(dataset)
+    ingestor.submit(readings(1_000, seed=2))
+    ingestor.flush()
+    refresher = ModelRefresher(dataset, output=str(tmp_path / "artifacts"), min_rows=1_000, log=lambda _: None)
+    directory = refresher.refresh()
+    assert directory is not None
+    manifest, _, _ = verify_artifacts(directory)
+    assert manifest["data"]["rows"] == BASE_ROWS + 1_000
+    improved = [entry for entry in manifest["models"].values() if not entry["params"]["kept_previous"]]
+    assert improved
+    for entry in improved:
+        assert entry["metrics"]["rmse"] < entry["params"]["holdout_rmse_before"]
+        assert entry["intervals"]["held_out_rows"] == 200
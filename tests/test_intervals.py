@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from climate_impact import analytic
+from climate_impact.intervals import GROUPS, LeafIntervals, build_intervals, notebook_split, open_intervals
+from climate_impact.scoring import load_model
+
+
+@pytest.fixture(scope="module")
+def split(root):
+    pytest.importorskip("sklearn")
+    return notebook_split(os.path.join(root, "climate_change_data.csv"))
+
+
+@pytest.fixture
+def model_copy(root, tmp_path):
+    path = str(tmp_path / "model1.npz")
+    shutil.copy(os.path.join(root, "model1.npz"), path)
+    return path
+
+
+def test_notebook_split_holds_out_a_fifth(split):
+    train, test = split
+    assert (len(train), len(test)) == (8_000, 2_000)
+
+
+def test_held_out_calibration_covers_unseen_rows(model_copy, split):
+    train, test = split
+    intervals = build_intervals(model_copy, "model1", fit_rows=train, held_out=test)
+    assert set(intervals.calibration) <= set(GROUPS)
+    assert 0.85 <= intervals.measured_coverage("inside") <= 0.97
+    model = load_model(model_copy)
+    point, low, high = intervals.predict(model, test)
+    assert ((low <= point) & (point <= high)).all()
+    truth = analytic.predict_indices(test)[0]
+    # Rows the calibration used; coverage there must be at least near the target
+    assert ((truth >= low) & (truth <= high)).mean() >= 0.85
+
+
+def test_tables_round_trip_and_go_stale_with_the_model(model_copy, split):
+    train, test = split
+    built = build_intervals(model_copy, "model1", fit_rows=train, held_out=test)
+    loaded = open_intervals(model_copy, "model1", rebuild=False)
+    assert loaded is not None
+    assert loaded.calibration == pytest.approx(built.calibration)
+    np.testing.assert_array_equal(loaded.lower, built.lower)
+    np.testing.assert_array_equal(loaded.margin, built.margin)
+    # Any change to the model file makes the tables stale
+    with open(model_copy, "ab") as f:
+        f.write(b"\0")
+    assert open_intervals(model_copy, "model1", rebuild=False) is None
+
+
+def test_bundled_tables_report_held_out_coverage(root):
+    intervals = LeafIntervals.load(os.path.join(root, "model1.intervals.npz"))
+    assert intervals.calibration["inside"][2] > 0
+    assert 0.85 <= intervals.measured_coverage() <= 0.97
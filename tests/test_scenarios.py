@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pytest
+
+from climate_impact.scenarios import BANDS, ScenarioBasis, plan, simulate, simulate_chunk
+from climate_impact.schema import FEATURES
+from climate_impact.store import load_dataset
+
+
+@pytest.fixture(scope="module")
+def basis(root):
+    frame = load_dataset(os.path.join(root, "climate_change_data.csv"))
+    return ScenarioBasis.fit(frame.assign(Year=frame["Date"].dt.year))
+
+
+def test_plan_splits_trajectories_into_seeded_chunks(basis):
+    tasks = plan(basis, years=5, trajectories=2_500, chunk=1_000)
+    assert [t.trajectories for t in tasks] == [1_000, 1_000, 500]
+    assert tasks[0].years == tuple(range(basis.last_year + 1, basis.last_year + 6))
+    assert len({t.seed.spawn_key for t in tasks}) == 3
+
+
+def test_samples_stay_within_the_slider_bounds(basis):
+    states = basis.sample(np.random.default_rng(0), 200, range(2030, 2040))
+    assert states.shape == (200, 10, len(FEATURES))
+    for i, feature in enumerate(FEATURES):
+        assert feature.min_value <= states[..., i].min() and states[..., i].max() <= feature.max_value
+
+
+def test_simulation_counts_every_trajectory_and_repeats_with_its_seed(basis):
+    result = simulate(basis, years=4, trajectories=1_500, chunk=500, engine="analytic", workers=1)
+    for index in BANDS:
+        assert (result.counts[index].sum(axis=1) == 1_500).all()
+        assert (result.histograms[index].sum(axis=1) == 1_500).all()
+        shares = result.band_shares(index)
+        np.testing.assert_allclose(shares.sum(axis=1), 1.0)
+        quantiles = result.quantiles(index)
+        assert (quantiles["p5"] <= quantiles["p50"]).all() and (quantiles["p50"] <= quantiles["p95"]).all()
+    again = simulate(basis, years=4, trajectories=1_500, chunk=500, engine="analytic", workers=1)
+    for index in BANDS:
+        np.testing.assert_array_equal(again.counts[index], result.counts[index])
+
+
+def test_chunks_merge_by_addition(basis):
+    tasks = plan(basis, years=3, trajectories=900, chunk=300, engine="analytic")
+    partials = [simulate_chunk(task) for task in tasks]
+    result = simulate(basis, years=3, trajectories=900, chunk=300, engine="analytic", workers=1)
+    for index in BANDS:
+        np.testing.assert_array_equal(sum(p[0][index] for p in partials), result.counts[index])
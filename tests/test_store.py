@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from climate_impact import store
+from climate_impact.schema import FEATURE_COLUMNS
+
+
+def readings(n):
+    return pd.DataFrame({
+        "Date": pd.date_range("2023-01-01", periods=n, freq="D"),
+        "Location": "New Williamtown",
+        "Country": "Latvia",
+        **{column: np.full(n, 10.0) for column in FEATURE_COLUMNS},
+    })
+
+
+def test_build_survives_appends_and_changes_on_rebuild(dataset):
+    build, version = store.dataset_build(dataset), store.dataset_version(dataset)
+    store.append_rows(dataset, readings(3))
+    assert store.dataset_build(dataset) == build
+    assert store.dataset_version(dataset) != version
+    # Replacing the CSV makes the next open rebuild the store
+    frame = pd.read_csv(dataset)
+    frame.iloc[:100].to_csv(dataset, index=False)
+    assert len(store.open_store(dataset)) == 100
+    assert store.dataset_build(dataset) != build
+
+
+def test_store_matches_the_csv(dataset):
+    frame = store.open_store(dataset).to_frame()
+    csv = pd.read_csv(dataset)
+    assert len(frame) == len(csv)
+    np.testing.assert_allclose(frame[list(FEATURE_COLUMNS)].to_numpy(), csv[list(FEATURE_COLUMNS)].to_numpy())
+    assert (frame["Country"].astype(str).to_numpy() == csv["Country"].to_numpy()).all()
+    assert (frame["Date"] == pd.to_datetime(csv["Date"], format=store.DATE_FORMAT)).all()
+    assert os.path.isdir(store.store_path(dataset))
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from climate_impact.tiers import TIERS, Tiers, lttb, period_starts, periods
+
+
+def readings(dates, country, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(dates)
+    return pd.DataFrame({
+        "Date": pd.to_datetime(dates),
+        "Country": country,
+        "Temperature": rng.normal(15, 5, n),
+        "CO2 Emissions": rng.normal(400, 50, n),
+        "Sea Level Rise": rng.normal(0, 1, n),
+        "Precipitation": rng.uniform(0, 100, n),
+        "Humidity": rng.uniform(0, 100, n),
+        "Wind Speed": rng.uniform(0, 50, n),
+    })
+
+
+def assert_same_tiers(a, b):
+    assert sorted(a.groups) == sorted(b.groups)
+    for group in a.groups:
+        for tier in TIERS:
+            for parameter in ("Temperature", "Climate_Risk_Index"):
+                pd.testing.assert_frame_equal(a.series(group, parameter, tier), b.series(group, parameter, tier),
+                                              check_exact=False, rtol=1e-9)
+
+
+def test_update_matches_building_from_every_row():
+    first = readings(pd.date_range("2001-01-01", "2001-12-31", periods=500), "Latvia")
+    # Existing buckets, earlier and later new ones, and a new country
+    second = pd.concat([
+        readings(pd.date_range("2001-03-01", "2001-06-30", periods=200), "Latvia", seed=1),
+        readings(pd.date_range("1999-06-01", "1999-06-30", periods=30), "Latvia", seed=2),
+        readings(pd.date_range("2003-01-01", "2003-02-01", periods=40), "Chile", seed=3),
+    ], ignore_index=True)
+    tiers = Tiers(first)
+    tiers.update(second)
+    assert tiers.rows == len(first) + len(second)
+    assert_same_tiers(tiers, Tiers(pd.concat([first, second], ignore_index=True)))
+
+
+def test_update_adds_into_existing_buckets():
+    tiers = Tiers(readings(["2001-05-01", "2001-05-20"], "Latvia"))
+    tiers.update(readings(["2001-05-10"], "Latvia", seed=1))
+    month = tiers.series("Latvia", "Temperature", "month")
+    assert month["Readings"].tolist() == [3]
+    assert tiers.points("Global", "day") == 3
+    assert tiers.series("Global", "Temperature", "year")["Readings"].tolist() == [3]
+
+
+def test_weeks_start_on_monday():
+    dates = pd.to_datetime(["2024-01-01", "2024-01-07", "2024-01-08"])
+    codes = periods(dates.to_numpy(), "week")
+    assert codes[0] == codes[1] != codes[2]
+    assert pd.Timestamp(period_starts(codes[:1], "week")[0]) == pd.Timestamp("2024-01-01")
+
+
+def test_view_picks_the_finest_tier_that_fits():
+    tiers = Tiers(readings(pd.date_range("2000-01-01", "2004-12-31", freq="D"), "Latvia"))
+    frame, tier = tiers.view("Latvia", "Temperature", max_points=100)
+    assert tier == "month" and len(frame) == 60
+    frame, tier = tiers.view("Latvia", "Temperature", max_points=100, tier="day")
+    assert tier == "day" and len(frame) == 100
+
+
+@pytest.mark.parametrize("n, threshold", [(1000, 50), (101, 3), (10, 9)])
+def test_lttb_keeps_endpoints_and_the_requested_count(n, threshold):
+    y = np.sin(np.linspace(0, 20, n))
+    kept = lttb(np.arange(n), y, threshold)
+    assert len(kept) == threshold
+    assert kept[0] == 0 and kept[-1] == n - 1
+    assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_keeps_a_spike_and_passes_short_series_through():
+    y = np.zeros(1000)
+    y[437] = 50.0
+    assert 437 in lttb(np.arange(1000), y, 20)
+    assert lttb(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb(np.arange(5), np.arange(5), 2).tolist() == [0, 4]